@@ -1,24 +1,32 @@
 from flask import Flask, render_template, request, jsonify, send_file, redirect, url_for, session
 import os
-from datetime import datetime, timezone, timedelta
+import gzip
+from datetime import datetime
 import tempfile
 from openpyxl import Workbook, load_workbook
 from openpyxl.styles import Font, Alignment, PatternFill
 import werkzeug
-import csv
+from itertools import islice
 
 # Importar configuración
 from config import Config
 
-# Importar psycopg2 para PostgreSQL o sqlite3 como fallback
+# Importar psycopg2 para PostgreSQL; sin él se usa SQLite (ver conexiones_db.py)
 try:
     import psycopg2
     import psycopg2.extras
     DATABASE_TYPE = Config.DATABASE_TYPE
 except ImportError:
-    import sqlite3
     DATABASE_TYPE = 'sqlite'
 
+from conexiones_db import PoolConexiones, PoolSQLite, perfil_sqlite
+from escritura_agrupada import EscritorAgrupado
+from repositorio_registros import (
+    RepositorioRegistros, RepositorioInventario, COLUMNAS_EDITABLES, ZONA_HORARIA, ORDENES_REGISTROS,
+    ORDEN_PREDETERMINADO, ORDEN_RELEVANCIA, codificar_cursor, decodificar_cursor
+)
+from migraciones import aplicar_migraciones
+
 # Configuración de farmacias
 FARMACIAS = Config.FARMACIAS
 
@@ -28,11 +36,24 @@ FARMACIA_DEFAULT = Config.FARMACIA_DEFAULT
 # Contraseña de administrador para eliminar registros
 ADMIN_PASSWORD = Config.ADMIN_PASSWORD
 
+# Campos de cada registro que devuelve /api/registros
+CAMPOS_API_REGISTROS = (
+    'id', 'laboratorio', 'medicamento', 'cantidad', 'fecha', 'fecha_ingreso', 'observaciones',
+    'fecha_vencimiento', 'lote', 'medico', 'junta_vigilancia', 'numero_inscripcion_clinica',
+    'numero_factura', 'codigo_empleado', 'tipo_movimiento'
+)
+
+# Filas por página de /api/registros (predeterminadas y máximas)
+REGISTROS_POR_PAGINA = 100
+MAX_REGISTROS_POR_PAGINA = 500
+
+# Movimientos por solicitud de /api/registros/lote
+MAX_REGISTROS_POR_LOTE = 500
+
 def get_local_datetime():
     """Obtener la fecha y hora local en formato ISO"""
     # Obtener la hora local (UTC-6 para El Salvador)
-    local_tz = timezone(timedelta(hours=-6))
-    return datetime.now(local_tz).isoformat()
+    return datetime.now(ZONA_HORARIA).isoformat()
 
 app = Flask(__name__)
 app.secret_key = Config.SECRET_KEY  # Necesario para las sesiones
@@ -43,106 +64,87 @@ if DATABASE_TYPE == 'postgresql':
     DATABASE_URL = Config.DATABASE_URL
     if DATABASE_URL and DATABASE_URL.startswith('postgres://'):
         DATABASE_URL = DATABASE_URL.replace('postgres://', 'postgresql://', 1)
+    
+    # Las conexiones se abren solo cuando se necesitan y se reutilizan
+    POOL_DB = PoolConexiones(
+        lambda: psycopg2.connect(
+            DATABASE_URL,
+            connect_timeout=10,
+            options='-c statement_timeout=30000'
+        ),
+        maximo=Config.DB_POOL_MAXIMO,
+        max_vida=Config.DB_POOL_MAX_VIDA,
+        espera_maxima=Config.DB_POOL_ESPERA,
+        verificar_despues=Config.DB_POOL_VERIFICAR
+    )
 else:
-    # Configuración para SQLite (local)
+    # Configuración para SQLite (local): pool acotado compartido entre hilos,
+    # porque el servidor atiende cada solicitud en un hilo nuevo
     DATABASE = Config.DATABASE
+    POOL_DB = PoolSQLite(
+        DATABASE,
+        maximo=Config.DB_POOL_MAXIMO,
+        max_vida=Config.DB_POOL_MAX_VIDA,
+        espera_maxima=Config.DB_POOL_ESPERA,
+        perfil=perfil_sqlite(
+            wal=Config.SQLITE_WAL,
+            busy_timeout_ms=Config.SQLITE_BUSY_TIMEOUT_MS,
+            cache_mb=Config.SQLITE_CACHE_MB,
+            mmap_mb=Config.SQLITE_MMAP_MB
+        ),
+        checkpoint_cada=Config.SQLITE_CHECKPOINT_SEGUNDOS
+    )
 
 def get_db_connection():
-    """Obtener conexión a la base de datos"""
+    """Obtener conexión a la base de datos
+
+    La conexión viene del pool (PostgreSQL o SQLite); close() la devuelve
+    para la siguiente solicitud en lugar de cerrarla.
+    """
     if DATABASE_TYPE == 'postgresql':
         if not DATABASE_URL:
             raise Exception("DATABASE_URL no configurada")
         try:
-            # Configurar timeout y reintentos
-            return psycopg2.connect(
-                DATABASE_URL,
-                connect_timeout=10,
-                options='-c statement_timeout=30000'
-            )
+            return POOL_DB.obtener()
         except Exception as e:
             print(f"Error de conexión a PostgreSQL: {e}")
             raise
     else:
-        return sqlite3.connect(DATABASE)
+        return POOL_DB.obtener()
+
+def get_repositorio():
+    """Repositorio de la tabla registros sobre una conexión del pool
+
+    Usar con 'with': al salir la conexión se devuelve al pool.
+    """
+    return RepositorioRegistros(get_db_connection(), DATABASE_TYPE)
+
+def get_repositorio_inventario():
+    """Repositorio de la tabla inventario heredada (usar con 'with')"""
+    return RepositorioInventario(get_db_connection(), DATABASE_TYPE)
+
+# Escritura agrupada de registros (opcional, ver escritura_agrupada.py)
+ESCRITOR_REGISTROS = None
+if Config.ESCRITURA_AGRUPADA:
+    ESCRITOR_REGISTROS = EscritorAgrupado(
+        get_repositorio,
+        espera_maxima=Config.ESCRITURA_AGRUPADA_ESPERA_MS / 1000,
+        lote_maximo=Config.ESCRITURA_AGRUPADA_LOTE
+    ).iniciar()
 
 def init_db():
-    """Inicializar la base de datos y crear solo tabla de registros"""
+    """Aplicar las migraciones pendientes del esquema (solo tabla de registros)
+
+    Se llama una vez al arrancar el proceso; las solicitudes no ejecutan DDL.
+    """
     conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    if DATABASE_TYPE == 'postgresql':
-        # Crear tabla de registros para PostgreSQL (inventario se lee desde CSV)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS registros (
-                id SERIAL PRIMARY KEY,
-                medicamento TEXT NOT NULL,
-                cantidad INTEGER NOT NULL,
-                precio REAL DEFAULT 0.0,
-                fecha TEXT NOT NULL,
-                fecha_ingreso TEXT NOT NULL,
-                observaciones TEXT,
-                laboratorio TEXT NOT NULL,
-                tipo_movimiento TEXT DEFAULT 'VENTA',
-                fecha_vencimiento TEXT,
-                lote TEXT,
-                medico TEXT,
-                junta_vigilancia TEXT,
-                numero_inscripcion_clinica TEXT,
-                numero_factura TEXT,
-                codigo_empleado TEXT,
-                farmacia TEXT DEFAULT 'farmacia1'
-            )
-        ''')
-        
-        # Agregar columna numero_factura si no existe (para tablas existentes)
-        try:
-            cursor.execute('ALTER TABLE registros ADD COLUMN numero_factura TEXT')
-        except:
-            pass  # La columna ya existe
-        
-        # Agregar columna codigo_empleado si no existe (para tablas existentes)
-        try:
-            cursor.execute('ALTER TABLE registros ADD COLUMN codigo_empleado TEXT')
-        except:
-            pass  # La columna ya existe
-    else:
-        # Crear tabla de registros para SQLite (inventario se lee desde CSV)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS registros (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                medicamento TEXT NOT NULL,
-                cantidad INTEGER NOT NULL,
-                precio REAL DEFAULT 0.0,
-                fecha TEXT NOT NULL,
-                fecha_ingreso TEXT NOT NULL,
-                observaciones TEXT,
-                laboratorio TEXT NOT NULL,
-                tipo_movimiento TEXT DEFAULT 'VENTA',
-                fecha_vencimiento TEXT,
-                lote TEXT,
-                medico TEXT,
-                junta_vigilancia TEXT,
-                numero_inscripcion_clinica TEXT,
-                numero_factura TEXT,
-                codigo_empleado TEXT,
-                farmacia TEXT DEFAULT 'farmacia1'
-            )
-        ''')
-        
-        # Agregar columna numero_factura si no existe (para tablas existentes)
-        try:
-            cursor.execute('ALTER TABLE registros ADD COLUMN numero_factura TEXT')
-        except:
-            pass  # La columna ya existe
-        
-        # Agregar columna codigo_empleado si no existe (para tablas existentes)
-        try:
-            cursor.execute('ALTER TABLE registros ADD COLUMN codigo_empleado TEXT')
-        except:
-            pass  # La columna ya existe
-    
-    conn.commit()
-    conn.close()
+    try:
+        aplicadas = aplicar_migraciones(conn, DATABASE_TYPE)
+    finally:
+        conn.close()
+    if aplicadas:
+        print(f"Migraciones aplicadas: {aplicadas}")
+    return aplicadas
 
 def load_inventory_from_csv():
     """Cargar inventario desde archivo CSV usando el script dedicado"""
@@ -202,56 +204,17 @@ def parse_inventory_file():
         if not os.path.exists(csv_path):
             return []
         
+        from parser_inventario import leer_productos
         productos = []
-        with open(csv_path, 'r', encoding='utf-8-sig') as file:
-            lines = file.readlines()
-            
-            # Buscar la línea de encabezados
-            header_found = False
-            for i, line in enumerate(lines):
-                line = line.strip()
-                
-                # Detectar línea de encabezados (más flexible)
-                if 'Codigo' in line and 'Nombre' in line:
-                    header_found = True
-                    print(f"Encabezados encontrados en línea {i+1}: {line}")
-                    continue
-                
-                # Procesar líneas de datos después de encontrar encabezados
-                if header_found and line and not line.startswith('"Listado') and not line.startswith('"Reportes'):
-                    # Limpiar la línea de comillas extra y espacios
-                    line = line.replace('"', '')
-                    # Dividir por tabulaciones y limpiar espacios extra
-                    parts = [part.strip() for part in line.split('\t') if part.strip()]
-                    
-                    if len(parts) >= 3:  # Cambiado de 4 a 3
-                        codigo = parts[0]
-                        nombre = parts[1]
-                        modelo_marca = parts[2]  # Modelo y marca están juntos
-                        
-                        # Extraer marca/laboratorio del tercer campo
-                        # Buscar la última coma para separar modelo de marca
-                        if ',' in modelo_marca:
-                            modelo, marca = modelo_marca.rsplit(',', 1)
-                            modelo = modelo.strip()
-                            marca = marca.strip()
-                        else:
-                            modelo = modelo_marca.strip()
-                            marca = 'Sin especificar'
-                        
-                        # Solo agregar si tiene código y nombre válidos (no solo espacios)
-                        if codigo and nombre and len(codigo.strip()) > 3 and len(nombre.strip()) > 3:
-                            productos.append({
-                                'codigo': codigo.strip(),
-                                'nombre': nombre.strip(),
-                                'modelo': modelo,
-                                'marca': marca,
-                                'laboratorio': marca if marca else 'Sin especificar'
-                            })
-                        else:
-                            print(f"Línea descartada - código: '{codigo}', nombre: '{nombre}'")
-                    else:
-                        print(f"Línea con menos de 3 partes: {parts}")
+        for registro in leer_productos(csv_path):
+            marca = registro.laboratorio or 'Sin especificar'
+            productos.append({
+                'codigo': registro.codigo,
+                'nombre': registro.nombre,
+                'modelo': registro.modelo,
+                'marca': marca,
+                'laboratorio': marca
+            })
         
         print(f"Productos parseados: {len(productos)}")
         return productos
@@ -287,68 +250,19 @@ def get_medicamentos_by_laboratorio(laboratorio):
         return []
 
 def buscar_productos(termino):
-    """Buscar productos por nombre o presentación desde CSV"""
+    """Buscar productos por nombre en el inventario en memoria"""
     try:
-        if not os.path.exists('INVENTARIO PARA TRABAJO.csv'):
-            return []
-        
-        termino = termino.lower()
-        productos = []
-        with open('INVENTARIO PARA TRABAJO.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                medicamento = row.get('medicamento', '').lower()
-                presentacion = row.get('presentacion', '').lower()
-                
-                if termino in medicamento or termino in presentacion:
-                    productos.append({
-                        'laboratorio': row.get('laboratorio', ''),
-                        'medicamento': row.get('medicamento', ''),
-                        'presentacion': row.get('presentacion', ''),
-                        'precio': float(row.get('precio', 0)),
-                        'stock': int(row.get('stock', 0))
-                    })
-        
-        return productos
+        from inventario_simple import buscar_productos as buscar_simple
+        return buscar_simple(termino)
     except Exception as e:
         print(f"Error al buscar productos: {e}")
         return []
 
 def get_estadisticas():
-    """Obtener estadísticas del inventario desde CSV"""
+    """Obtener estadísticas del inventario en memoria"""
     try:
-        if not os.path.exists('INVENTARIO PARA TRABAJO.csv'):
-            return {
-                'total_productos': 0,
-                'total_laboratorios': 0,
-                'stock_bajo': 0,
-                'sin_stock': 0
-            }
-        
-        total_productos = 0
-        laboratorios = set()
-        stock_bajo = 0
-        sin_stock = 0
-        
-        with open('INVENTARIO PARA TRABAJO.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                total_productos += 1
-                if row.get('laboratorio'):
-                    laboratorios.add(row['laboratorio'])
-                
-                stock = int(row.get('stock', 0))
-                if stock == 0:
-                    sin_stock += 1
-                elif stock < 10:
-                    stock_bajo += 1
-        
-        return {
-            'total_productos': total_productos,
-            'total_laboratorios': len(laboratorios),
-            'stock_bajo': stock_bajo,
-            'sin_stock': sin_stock
-        }
+        from inventario_simple import get_estadisticas as get_estadisticas_simple
+        return get_estadisticas_simple()
     except Exception as e:
         print(f"Error al obtener estadísticas: {e}")
         return {
@@ -366,20 +280,37 @@ def get_farmacia_info(farmacia_id):
     """Obtener información de una farmacia específica"""
     return FARMACIAS.get(farmacia_id, FARMACIAS[FARMACIA_DEFAULT])
 
-# Inicializar base de datos (solo para registros, no inventario)
-init_db()
+# Migrar el esquema al arrancar (solo registros, no inventario). Si el despliegue
+# ya ejecuta 'python migraciones.py' se puede desactivar con MIGRAR_AL_INICIAR=false
+if Config.MIGRAR_AL_INICIAR:
+    init_db()
+
+# Vigilar el archivo de inventario y recargar el catálogo en segundo plano.
+# Se inicia con la primera solicitud y no al importar app: los scripts que
+# importan de aquí (migraciones, actualizar_db, pruebas) no deben dejar un
+# hilo escribiendo catalogo.snapshot
+_VIGILANTE_PENDIENTE = Config.VIGILANTE_CATALOGO
+
+@app.before_request
+def iniciar_vigilante_catalogo():
+    """Iniciar el vigilante del catálogo la primera vez que se atiende una solicitud"""
+    global _VIGILANTE_PENDIENTE
+    if not _VIGILANTE_PENDIENTE:
+        return
+    _VIGILANTE_PENDIENTE = False
+    try:
+        from vigilante_catalogo import iniciar_vigilante
+        iniciar_vigilante(Config.VIGILANTE_INTERVALO)
+    except Exception as e:
+        print(f"Error al iniciar vigilante de catálogo: {e}")
 
 @app.route('/')
 def index():
     """Página principal"""
-    # Inicializar base de datos si es necesario
-    initialize_database()
-    
-    # Verificar que el inventario esté cargado
+    # Verificar que el inventario esté cargado (solo se relee si el archivo cambió)
     try:
-        from inventario_simple import cargar_inventario
-        cargar_inventario()
-        print("Inventario cargado en la página principal")
+        from inventario_simple import asegurar_inventario
+        asegurar_inventario()
     except Exception as e:
         print(f"Error al cargar inventario en página principal: {e}")
     
@@ -397,11 +328,10 @@ def index():
 @app.route('/api/laboratorios')
 def api_laboratorios():
     """API para obtener lista de laboratorios"""
-    # Verificar que el inventario esté cargado
+    # Verificar que el inventario esté cargado (solo se relee si el archivo cambió)
     try:
-        from inventario_simple import cargar_inventario
-        cargar_inventario()
-        print("Inventario cargado en API laboratorios")
+        from inventario_simple import asegurar_inventario
+        asegurar_inventario()
     except Exception as e:
         print(f"Error al cargar inventario en API laboratorios: {e}")
     
@@ -417,11 +347,10 @@ def api_medicamentos(laboratorio):
     print(f"API: Tipo de laboratorio: {type(laboratorio)}")
     print(f"API: Longitud del laboratorio: {len(laboratorio)}")
     
-    # Verificar que el inventario esté cargado
+    # Verificar que el inventario esté cargado (solo se relee si el archivo cambió)
     try:
-        from inventario_simple import cargar_inventario
-        cargar_inventario()
-        print("Inventario cargado en API medicamentos")
+        from inventario_simple import asegurar_inventario
+        asegurar_inventario()
     except Exception as e:
         print(f"Error al cargar inventario en API medicamentos: {e}")
     
@@ -445,6 +374,134 @@ def api_medicamentos(laboratorio):
         traceback.print_exc()
         return jsonify([])
 
+@app.route('/api/catalogo/estado')
+def api_catalogo_estado():
+    """API para consultar la generación y la última carga del catálogo"""
+    from inventario_simple import asegurar_inventario, get_estado_cache
+    from vigilante_catalogo import get_estado as get_estado_vigilante
+    asegurar_inventario()
+    estado = get_estado_cache()
+    estado['vigilante'] = get_estado_vigilante()
+    return jsonify(estado)
+
+@app.route('/api/db/estado')
+def api_db_estado():
+    """API con el estado del pool de conexiones (reutilización y tiempos de espera)
+    y de la escritura agrupada (histogramas de tamaño de lote y de espera)"""
+    estado = POOL_DB.get_estado()
+    estado['motor'] = DATABASE_TYPE
+    if ESCRITOR_REGISTROS is not None:
+        estado['escritura_agrupada'] = ESCRITOR_REGISTROS.get_estado()
+    return jsonify(estado)
+
+@app.route('/api/catalogo')
+def api_catalogo():
+    """API con el catálogo completo para filtrar y buscar en el navegador
+
+    Se envía comprimido con gzip (comprimido una sola vez por versión) y con
+    un ETag fuerte: si el navegador ya tiene la versión actual recibe un 304
+    sin cuerpo.
+    """
+    from inventario_simple import get_catalogo_comprimido
+    paquete = get_catalogo_comprimido()
+    if paquete is None:
+        return jsonify({'success': False, 'message': 'Catálogo no disponible'}), 503
+    
+    version, comprimido = paquete
+    usar_gzip = bool(request.accept_encodings['gzip'])
+    # Cada codificación es una representación distinta con su propio ETag
+    etag = f"{version}-gzip" if usar_gzip else version
+    
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    elif usar_gzip:
+        response = app.response_class(comprimido, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = app.response_class(gzip.decompress(comprimido), mimetype='application/json')
+    
+    response.set_etag(etag)
+    # El navegador lo guarda pero siempre confirma la versión con el servidor
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+@app.route('/api/catalogo/cambios')
+def api_catalogo_cambios():
+    """API para obtener los cambios del catálogo desde una versión conocida
+
+    ?desde=<versión>: devuelve los productos agregados y modificados y los
+    códigos eliminados. Si la versión ya no está en el historial, 'completo'
+    es True y el cliente debe descargar el catálogo entero.
+    """
+    from inventario_simple import get_cambios_catalogo
+    desde = request.args.get('desde', '').strip()
+    cambios = get_cambios_catalogo(desde or None)
+    if cambios['version'] is None:
+        return jsonify({'success': False, 'message': 'Catálogo no disponible'}), 503
+    cambios['success'] = True
+    return jsonify(cambios)
+
+@app.route('/api/producto/<codigo>')
+def api_producto(codigo):
+    """API para obtener un producto por su código (lectura con escáner)"""
+    from inventario_simple import get_producto_por_codigo
+    producto = get_producto_por_codigo(codigo)
+    if producto is None:
+        return jsonify({'success': False, 'message': f'Producto {codigo} no encontrado'}), 404
+    return jsonify(producto)
+
+@app.route('/api/productos/lote', methods=['GET', 'POST'])
+def api_productos_lote():
+    """API para obtener varios productos por código en una sola consulta
+
+    GET: ?codigos=010101001,010101002
+    POST: {"codigos": ["010101001", "010101002"]}
+    """
+    from inventario_simple import get_productos_por_codigos
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        codigos = data.get('codigos') or []
+    else:
+        codigos = [c for c in request.args.get('codigos', '').split(',') if c.strip()]
+
+    if not isinstance(codigos, list) or not all(isinstance(c, str) for c in codigos):
+        return jsonify({'success': False, 'message': 'codigos debe ser una lista de textos'}), 400
+    if len(codigos) > 500:
+        return jsonify({'success': False, 'message': 'Máximo 500 códigos por consulta'}), 400
+
+    return jsonify(get_productos_por_codigos(codigos))
+
+@app.route('/api/categorias')
+def api_categorias():
+    """API para obtener el árbol de categorías del inventario"""
+    from inventario_simple import get_categorias
+    return jsonify(get_categorias())
+
+@app.route('/api/categorias/<codigo>/productos')
+def api_categoria_productos(codigo):
+    """API para obtener los productos de una categoría (por prefijo de código)"""
+    from inventario_simple import get_productos_por_categoria
+    desde = request.args.get('desde', 0, type=int)
+    limite = request.args.get('limite', 500, type=int)
+
+    resultado = get_productos_por_categoria(codigo.strip(), desde=desde, limite=limite)
+    if resultado is None:
+        return jsonify({'success': False, 'message': 'Categoría no encontrada'}), 404
+
+    resultado['desde'] = desde
+    resultado['limite'] = limite
+    return jsonify(resultado)
+
+@app.route('/api/typeahead')
+def api_typeahead():
+    """API de autocompletado: productos cuyo nombre o alguna palabra empieza con q"""
+    from inventario_simple import typeahead, TYPEAHEAD_K_MAX
+    termino = request.args.get('q', '')
+    # Solo se acota por arriba: con k <= 0 buscar_prefijo no devuelve resultados
+    k = min(request.args.get('k', 10, type=int), TYPEAHEAD_K_MAX)
+    return jsonify(typeahead(termino, k))
+
 @app.route('/api/buscar_simple')
 def api_buscar_simple():
     """API de búsqueda simplificada para debug"""
@@ -510,6 +567,42 @@ def api_buscar():
     
     return jsonify(productos_formateados)
 
+# Campos obligatorios de un movimiento
+CAMPOS_REQUERIDOS_REGISTRO = ('laboratorio', 'medicamento', 'cantidad', 'fecha')
+
+def validar_registro(data):
+    """Devolver el mensaje de error de un movimiento o None si es válido"""
+    if not isinstance(data, dict):
+        return 'El movimiento debe ser un objeto'
+    for field in CAMPOS_REQUERIDOS_REGISTRO:
+        if not data.get(field):
+            return f'Campo {field} es requerido'
+    try:
+        int(data['cantidad'])
+    except (TypeError, ValueError):
+        return 'Campo cantidad debe ser un número entero'
+    return None
+
+def datos_registro(data, fecha_ingreso, farmacia):
+    """Columnas a insertar de un movimiento ya validado"""
+    return {
+        'laboratorio': data['laboratorio'],
+        'medicamento': data['medicamento'],
+        'cantidad': int(data['cantidad']),
+        'fecha': data['fecha'],
+        'fecha_ingreso': fecha_ingreso,
+        'observaciones': data.get('observaciones', ''),
+        'tipo_movimiento': data.get('tipo_movimiento', 'VENTA'),
+        'fecha_vencimiento': data.get('fecha_vencimiento', ''),
+        'lote': data.get('lote', ''),
+        'medico': data.get('medico', ''),
+        'junta_vigilancia': data.get('junta_vigilancia', ''),
+        'numero_inscripcion_clinica': data.get('numero_inscripcion_clinica', ''),
+        'numero_factura': data.get('numero_factura', ''),
+        'codigo_empleado': data.get('codigo_empleado', ''),
+        'farmacia': farmacia
+    }
+
 @app.route('/guardar_registro', methods=['POST'])
 def guardar_registro():
     """Guardar un nuevo registro"""
@@ -517,72 +610,72 @@ def guardar_registro():
         data = request.get_json()
         
         # Validar datos requeridos
-        required_fields = ['laboratorio', 'medicamento', 'cantidad', 'fecha']
-        for field in required_fields:
-            if not data.get(field):
-                return jsonify({'success': False, 'message': f'Campo {field} es requerido'})
-        
-        # Insertar registro
-        conn = get_db_connection()
-        cursor = conn.cursor()
+        error = validar_registro(data)
+        if error:
+            return jsonify({'success': False, 'message': error})
+        
+        # Insertar registro (con escritura agrupada, espera el commit compartido)
+        datos = datos_registro(data, get_local_datetime(), get_farmacia_actual())
+        if ESCRITOR_REGISTROS is not None:
+            ESCRITOR_REGISTROS.insertar(datos)
+        else:
+            with get_repositorio() as registros:
+                registros.insertar(datos)
+                registros.commit()
         
-        farmacia_actual = get_farmacia_actual()
+        return jsonify({
+            'success': True, 
+            'message': 'Registrado exitosamente'
+        })
         
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('''
-                INSERT INTO registros (laboratorio, medicamento, cantidad, fecha, fecha_ingreso, observaciones, tipo_movimiento, 
-                                     fecha_vencimiento, lote, medico, junta_vigilancia, numero_inscripcion_clinica, numero_factura, codigo_empleado, farmacia)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ''', (
-                data['laboratorio'],
-                data['medicamento'],
-                data['cantidad'],
-                data['fecha'],
-                get_local_datetime(),
-                data.get('observaciones', ''),
-                data.get('tipo_movimiento', 'VENTA'),
-                data.get('fecha_vencimiento', ''),
-                data.get('lote', ''),
-                data.get('medico', ''),
-                data.get('junta_vigilancia', ''),
-                data.get('numero_inscripcion_clinica', ''),
-                data.get('numero_factura', ''),
-                data.get('codigo_empleado', ''),
-                farmacia_actual
-            ))
-            
+    except Exception as e:
+        return jsonify({'success': False, 'message': f'Error: {str(e)}'})
 
-        else:
-            cursor.execute('''
-                INSERT INTO registros (laboratorio, medicamento, cantidad, fecha, fecha_ingreso, observaciones, tipo_movimiento, 
-                                 fecha_vencimiento, lote, medico, junta_vigilancia, numero_inscripcion_clinica, numero_factura, codigo_empleado, farmacia)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                data['laboratorio'],
-                data['medicamento'],
-                data['cantidad'],
-                data['fecha'],
-                get_local_datetime(),
-                data.get('observaciones', ''),
-                data.get('tipo_movimiento', 'VENTA'),
-                data.get('fecha_vencimiento', ''),
-                data.get('lote', ''),
-                data.get('medico', ''),
-                data.get('junta_vigilancia', ''),
-                data.get('numero_inscripcion_clinica', ''),
-                data.get('numero_factura', ''),
-                data.get('codigo_empleado', ''),
-                farmacia_actual
-            ))
-            
+@app.route('/api/registros/lote', methods=['POST'])
+def guardar_registros_lote():
+    """Guardar varios movimientos (p. ej. las líneas de una factura) a la vez
 
+    Recibe {'registros': [...]} o directamente la lista. Se validan todos
+    antes de escribir: si alguno no es válido no se guarda ninguno (400). Los
+    válidos se insertan en una sola transacción con una sola sentencia.
+    'resultados' trae, en el orden recibido, el id o el error de cada uno.
+    """
+    try:
+        data = request.get_json(silent=True)
+        movimientos = data.get('registros') if isinstance(data, dict) else data
+        if not isinstance(movimientos, list) or not movimientos:
+            return jsonify({'success': False, 'message': 'Se requiere una lista de registros'}), 400
+        if len(movimientos) > MAX_REGISTROS_POR_LOTE:
+            return jsonify({
+                'success': False,
+                'message': f'Máximo {MAX_REGISTROS_POR_LOTE} registros por lote'
+            }), 400
         
-        conn.commit()
-        conn.close()
+        errores = [validar_registro(movimiento) for movimiento in movimientos]
+        if any(errores):
+            return jsonify({
+                'success': False,
+                'message': f'{sum(1 for error in errores if error)} registros no son válidos; no se guardó ninguno',
+                'resultados': [
+                    {'indice': indice, 'success': not error, **({'message': error} if error else {})}
+                    for indice, error in enumerate(errores)
+                ]
+            }), 400
+        
+        # Todas las líneas del lote comparten la hora de ingreso
+        fecha_ingreso = get_local_datetime()
+        farmacia = get_farmacia_actual()
+        with get_repositorio() as registros:
+            ids = registros.insertar_varios(
+                [datos_registro(movimiento, fecha_ingreso, farmacia) for movimiento in movimientos]
+            )
+            registros.commit()
         
         return jsonify({
-            'success': True, 
-            'message': 'Registrado exitosamente'
+            'success': True,
+            'message': f'{len(ids)} registros guardados exitosamente',
+            'resultados': [{'indice': indice, 'success': True, 'id': registro_id}
+                           for indice, registro_id in enumerate(ids)]
         })
         
     except Exception as e:
@@ -595,73 +688,59 @@ def historial():
 
 @app.route('/api/registros')
 def api_registros():
-    """API para obtener registros con filtros"""
+    """API para obtener registros con filtros, por páginas
+
+    Parámetros: filtros (fecha_inicio, fecha_fin, laboratorio, medicamento),
+    orden (ver ORDENES_REGISTROS, o 'relevancia' con filtros de texto), limite
+    (filas por página) y cursor (el 'siguiente' de la página anterior). El
+    total solo se calcula en la primera página y es exacto hasta MAX_CONTEO
+    filas.
+    """
     try:
         # Parámetros de filtro
-        fecha_inicio = request.args.get('fecha_inicio', '')
-        fecha_fin = request.args.get('fecha_fin', '')
-        laboratorio = request.args.get('laboratorio', '')
-        medicamento = request.args.get('medicamento', '')
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Obtener farmacia actual
-        farmacia_actual = get_farmacia_actual()
-        
-        # Construir consulta con filtros
-        query = '''
-            SELECT id, laboratorio, medicamento, cantidad, fecha, fecha_ingreso, observaciones,
-                   fecha_vencimiento, lote, medico, junta_vigilancia, numero_inscripcion_clinica, numero_factura, codigo_empleado, tipo_movimiento
-            FROM registros 
-            WHERE farmacia = %s
-        '''
-        params = [farmacia_actual]
-        
-        if fecha_inicio:
-            query += ' AND fecha_ingreso >= %s'
-            params.append(fecha_inicio + 'T00:00:00')
-        
-        if fecha_fin:
-            query += ' AND fecha_ingreso <= %s'
-            params.append(fecha_fin + 'T23:59:59')
-        
-        if laboratorio:
-            query += ' AND laboratorio LIKE %s'
-            params.append(f'%{laboratorio}%')
-        
-        if medicamento:
-            query += ' AND medicamento LIKE %s'
-            params.append(f'%{medicamento}%')
-        
-        query += ' ORDER BY fecha_ingreso DESC LIMIT 1000'
-        
-        cursor.execute(query, params)
-        registros = cursor.fetchall()
-        conn.close()
+        filtros = {
+            'fecha_inicio': request.args.get('fecha_inicio', ''),
+            'fecha_fin': request.args.get('fecha_fin', ''),
+            'laboratorio': request.args.get('laboratorio', ''),
+            'medicamento': request.args.get('medicamento', '')
+        }
+        orden = request.args.get('orden', ORDEN_PREDETERMINADO)
+        cursor = request.args.get('cursor', '')
         
-        # Formatear registros
-        registros_formateados = []
-        for reg in registros:
-            registros_formateados.append({
-                'id': reg[0],
-                'laboratorio': reg[1],
-                'medicamento': reg[2],
-                'cantidad': reg[3],
-                'fecha': reg[4],
-                'fecha_ingreso': reg[5],
-                'observaciones': reg[6],
-                'fecha_vencimiento': reg[7] if len(reg) > 7 else '',
-                'lote': reg[8] if len(reg) > 8 else '',
-                'medico': reg[9] if len(reg) > 9 else '',
-                'junta_vigilancia': reg[10] if len(reg) > 10 else '',
-                'numero_inscripcion_clinica': reg[11] if len(reg) > 11 else '',
-                'numero_factura': reg[12] if len(reg) > 12 else '',
-                'codigo_empleado': reg[13] if len(reg) > 13 else '',
-                'tipo_movimiento': reg[14] if len(reg) > 14 else 'VENTA'
-            })
+        try:
+            limite = min(max(int(request.args.get('limite', REGISTROS_POR_PAGINA)), 1), MAX_REGISTROS_POR_PAGINA)
+            despues_de = None
+            if cursor:
+                orden, despues_de = decodificar_cursor(cursor)
+            elif orden not in ORDENES_REGISTROS and orden != ORDEN_RELEVANCIA:
+                raise ValueError(f'Orden no válido: {orden}')
+            for campo in ('fecha_inicio', 'fecha_fin'):
+                if filtros[campo]:
+                    datetime.strptime(filtros[campo], '%Y-%m-%d')
+        except ValueError as e:
+            return jsonify({'success': False, 'message': str(e)}), 400
+        
+        with get_repositorio() as registros:
+            resultado, siguiente, total = registros.buscar_pagina(
+                get_farmacia_actual(),
+                orden=orden,
+                despues_de=despues_de,
+                limite=limite,
+                contar=not cursor,
+                **filtros
+            )
         
-        return jsonify(registros_formateados)
+        respuesta = {
+            'registros': [
+                {campo: getattr(registro, campo) for campo in CAMPOS_API_REGISTROS}
+                for registro in resultado
+            ],
+            'orden': orden,
+            'siguiente': codificar_cursor(orden, siguiente) if siguiente else None
+        }
+        if total is not None:
+            respuesta['total'], respuesta['total_exacto'] = total
+        return jsonify(respuesta)
         
     except Exception as e:
         return jsonify({'error': str(e)})
@@ -678,66 +757,12 @@ def actualizar_registro(registro_id):
             if not data.get(field):
                 return jsonify({'success': False, 'message': f'Campo {field} es requerido'})
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verificar que el registro existe
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('SELECT id FROM registros WHERE id = %s', (registro_id,))
-        else:
-            cursor.execute('SELECT id FROM registros WHERE id = ?', (registro_id,))
-        registro_existe = cursor.fetchone()
-        
-        if not registro_existe:
-            conn.close()
-            return jsonify({'success': False, 'message': 'Registro no encontrado'})
-        
         # Actualizar el registro (sin modificar inventario - se maneja desde CSV)
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('''
-                UPDATE registros 
-                SET laboratorio = %s, medicamento = %s, cantidad = %s, fecha = %s, 
-                    observaciones = %s, fecha_vencimiento = %s, lote = %s, medico = %s, junta_vigilancia = %s, numero_inscripcion_clinica = %s, numero_factura = %s, codigo_empleado = %s
-                WHERE id = %s
-            ''', (
-                data['laboratorio'],
-                data['medicamento'],
-                data['cantidad'],
-                data['fecha'],
-                data.get('observaciones', ''),
-                data.get('fecha_vencimiento', ''),
-                data.get('lote', ''),
-                data.get('medico', ''),
-                data.get('junta_vigilancia', ''),
-                data.get('numero_inscripcion_clinica', ''),
-                data.get('numero_factura', ''),
-                data.get('codigo_empleado', ''),
-                registro_id
-            ))
-        else:
-            cursor.execute('''
-                UPDATE registros 
-                SET laboratorio = ?, medicamento = ?, cantidad = ?, fecha = ?, 
-                    observaciones = ?, fecha_vencimiento = ?, lote = ?, medico = ?, junta_vigilancia = ?, numero_inscripcion_clinica = ?, numero_factura = ?, codigo_empleado = ?
-                WHERE id = ?
-            ''', (
-                data['laboratorio'],
-                data['medicamento'],
-                data['cantidad'],
-                data['fecha'],
-                data.get('observaciones', ''),
-                data.get('fecha_vencimiento', ''),
-                data.get('lote', ''),
-                data.get('medico', ''),
-                data.get('junta_vigilancia', ''),
-                data.get('numero_inscripcion_clinica', ''),
-                data.get('numero_factura', ''),
-                data.get('codigo_empleado', ''),
-                registro_id
-            ))
-        
-        conn.commit()
-        conn.close()
+        with get_repositorio() as registros:
+            datos = {campo: data.get(campo, '') for campo in COLUMNAS_EDITABLES}
+            if not registros.actualizar(registro_id, datos):
+                return jsonify({'success': False, 'message': 'Registro no encontrado'})
+            registros.commit()
         
         return jsonify({
             'success': True, 
@@ -760,28 +785,11 @@ def eliminar_registro(registro_id):
         if password != ADMIN_PASSWORD:
             return jsonify({'success': False, 'message': 'Contraseña de administrador incorrecta'})
         
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Verificar que el registro existe
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('SELECT id FROM registros WHERE id = %s', (registro_id,))
-        else:
-            cursor.execute('SELECT id FROM registros WHERE id = ?', (registro_id,))
-        registro = cursor.fetchone()
-        
-        if not registro:
-            conn.close()
-            return jsonify({'success': False, 'message': 'Registro no encontrado'})
-        
         # Eliminar el registro (sin modificar inventario - se maneja desde CSV)
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('DELETE FROM registros WHERE id = %s', (registro_id,))
-        else:
-            cursor.execute('DELETE FROM registros WHERE id = ?', (registro_id,))
-        
-        conn.commit()
-        conn.close()
+        with get_repositorio() as registros:
+            if not registros.eliminar(registro_id):
+                return jsonify({'success': False, 'message': 'Registro no encontrado'})
+            registros.commit()
         
         return jsonify({
             'success': True, 
@@ -799,28 +807,8 @@ def exportar_excel():
         farmacia_actual = get_farmacia_actual()
         
         # Obtener registros
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('''
-                SELECT laboratorio, medicamento, cantidad, fecha, fecha_ingreso, observaciones,
-                       fecha_vencimiento, lote, medico, junta_vigilancia, numero_inscripcion_clinica,
-                       numero_factura, codigo_empleado, tipo_movimiento
-                FROM registros 
-                WHERE farmacia = %s
-                ORDER BY fecha_ingreso DESC
-            ''', (farmacia_actual,))
-        else:
-            cursor.execute('''
-                SELECT laboratorio, medicamento, cantidad, fecha, fecha_ingreso, observaciones,
-                       fecha_vencimiento, lote, medico, junta_vigilancia, numero_inscripcion_clinica,
-                       numero_factura, codigo_empleado, tipo_movimiento
-                FROM registros 
-                WHERE farmacia = ?
-                ORDER BY fecha_ingreso DESC
-            ''', (farmacia_actual,))
-        registros = cursor.fetchall()
-        conn.close()
+        with get_repositorio() as repositorio:
+            registros = repositorio.buscar(farmacia_actual)
         
         # Crear archivo Excel
         wb = Workbook()
@@ -842,7 +830,7 @@ def exportar_excel():
         # Datos
         for row, registro in enumerate(registros, 2):
             # Formatear fecha de ingreso para que sea más legible
-            fecha_ingreso = registro[4]
+            fecha_ingreso = registro.fecha_ingreso
             if fecha_ingreso:
                 try:
                     fecha_obj = datetime.fromisoformat(fecha_ingreso.replace('Z', '+00:00'))
@@ -853,20 +841,19 @@ def exportar_excel():
                 fecha_formateada = ''
             
             ws.cell(row=row, column=1, value=fecha_formateada)  # Fecha Ingreso
-            ws.cell(row=row, column=2, value=registro[1])  # Medicamento
-            ws.cell(row=row, column=3, value=registro[0])  # Laboratorio
-            ws.cell(row=row, column=4, value=registro[2])  # Cantidad
-            ws.cell(row=row, column=5, value=registro[3])  # Fecha
-            ws.cell(row=row, column=6, value=registro[13] if len(registro) > 13 else 'VENTA')  # Tipo Movimiento
-            ws.cell(row=row, column=7, value=registro[11] if len(registro) > 11 else '')  # N° Factura/Devolución
-            ws.cell(row=row, column=8, value=registro[6] if len(registro) > 6 else '')  # Fecha Vencimiento
-            ws.cell(row=row, column=9, value=registro[7] if len(registro) > 7 else '')  # Lote
-            ws.cell(row=row, column=10, value=registro[8] if len(registro) > 8 else '')  # Médico
-            ws.cell(row=row, column=11, value=registro[9] if len(registro) > 9 else '')  # Junta Vigilancia
-            ws.cell(row=row, column=12, value=registro[10] if len(registro) > 10 else '')  # Número Inscripción Clínica
-            ws.cell(row=row, column=13, value=registro[12] if len(registro) > 12 else '')  # Código Empleado
-            ws.cell(row=row, column=14, value=registro[5])  # Observaciones
-
+            ws.cell(row=row, column=2, value=registro.medicamento)
+            ws.cell(row=row, column=3, value=registro.laboratorio)
+            ws.cell(row=row, column=4, value=registro.cantidad)
+            ws.cell(row=row, column=5, value=registro.fecha)
+            ws.cell(row=row, column=6, value=registro.tipo_movimiento)
+            ws.cell(row=row, column=7, value=registro.numero_factura)  # N° Factura/Devolución
+            ws.cell(row=row, column=8, value=registro.fecha_vencimiento)
+            ws.cell(row=row, column=9, value=registro.lote)
+            ws.cell(row=row, column=10, value=registro.medico)
+            ws.cell(row=row, column=11, value=registro.junta_vigilancia)
+            ws.cell(row=row, column=12, value=registro.numero_inscripcion_clinica)
+            ws.cell(row=row, column=13, value=registro.codigo_empleado)
+            ws.cell(row=row, column=14, value=registro.observaciones)
         
         # Ajustar ancho de columnas
         for column in ws.columns:
@@ -899,42 +886,39 @@ def inventario():
 
 @app.route('/api/inventario')
 def api_inventario():
-    """API para obtener inventario con filtros"""
+    """API para obtener inventario con filtros (sobre el catálogo en memoria)"""
     try:
         laboratorio = request.args.get('laboratorio', '')
         stock_bajo = request.args.get('stock_bajo', 'false') == 'true'
         sin_stock = request.args.get('sin_stock', 'false') == 'true'
-        
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        query = 'SELECT laboratorio, medicamento, presentacion, precio, stock FROM inventario WHERE 1=1'
-        params = []
-        
-        if laboratorio:
-            query += ' AND laboratorio LIKE %s'
-            params.append(f'%{laboratorio}%')
-        
-        if stock_bajo:
-            query += ' AND stock < 10 AND stock > 0'
-        
-        if sin_stock:
-            query += ' AND stock = 0'
-        
-        query += ' ORDER BY laboratorio, medicamento LIMIT 1000'
-        
-        cursor.execute(query, params)
-        inventario = cursor.fetchall()
-        conn.close()
+        precio_min = request.args.get('precio_min', type=float)
+        precio_max = request.args.get('precio_max', type=float)
+        
+        # Stock bajo: 0 < stock < 10 (el stock puede tener decimales)
+        stock_mayor_que, stock_menor_que = (0, 10) if stock_bajo else (None, None)
+        # Sin stock: exactamente 0 (un stock negativo es un descuadre, no "sin stock")
+        stock_min, stock_max = (0, 0) if sin_stock else (None, None)
+        
+        from inventario_simple import filtrar_productos
+        productos = filtrar_productos(
+            laboratorio=laboratorio,
+            stock_min=stock_min,
+            stock_max=stock_max,
+            stock_mayor_que=stock_mayor_que,
+            stock_menor_que=stock_menor_que,
+            precio_min=precio_min,
+            precio_max=precio_max,
+            limite=1000
+        )
         
         inventario_formateado = []
-        for item in inventario:
+        for producto in productos:
             inventario_formateado.append({
-                'laboratorio': item[0],
-                'medicamento': item[1],
-                'presentacion': item[2],
-                'precio': item[3],
-                'stock': item[4]
+                'laboratorio': producto['laboratorio'],
+                'medicamento': producto['nombre'],
+                'presentacion': producto['modelo'],
+                'precio': producto['precio'],
+                'stock': producto['stock']
             })
         
         return jsonify(inventario_formateado)
@@ -1056,6 +1040,18 @@ def actualizar_inventario_csv():
         # Guardar el nuevo archivo
         archivo.save('INVENTARIO PARA TRABAJO.csv')
         
+        # Con el vigilante activo el catálogo y su snapshot se reconstruyen en
+        # segundo plano; si no, se regenera el snapshot aquí mismo
+        from vigilante_catalogo import vigilante_activo, notificar_cambio
+        if vigilante_activo():
+            notificar_cambio()
+        else:
+            try:
+                from snapshot_catalogo import generar_snapshot
+                generar_snapshot()
+            except Exception as e:
+                print(f"Error al generar snapshot del catálogo: {e}")
+        
         return jsonify({
             'success': True, 
             'message': 'Inventario CSV actualizado exitosamente'
@@ -1166,7 +1162,7 @@ def debug_busqueda():
 def debug_inventario():
     """Debug específico para el módulo de inventario simple"""
     try:
-        from inventario_simple import cargar_inventario, get_laboratorios, get_estadisticas, debug_inventario as debug_inv
+        from inventario_simple import cargar_inventario, get_laboratorios, get_estadisticas, get_estado_cache, debug_inventario as debug_inv
         
         result = {
             'modulo_cargado': True,
@@ -1202,6 +1198,9 @@ def debug_inventario():
         except Exception as e:
             result['error_debug'] = str(e)
         
+        # Estado de la caché del catálogo
+        result['estado_cache'] = get_estado_cache()
+        
         # Análisis de formato
         try:
             from inventario_simple import analizar_formato_linea
@@ -1228,9 +1227,9 @@ def debug_analyze():
         
         if os.path.exists(csv_path):
             with open(csv_path, 'r', encoding='utf-8-sig') as file:
-                lines = file.readlines()
+                lines = list(islice(file, 20))  # Solo las primeras 20 líneas
                 
-                for i, line in enumerate(lines[:20]):  # Solo las primeras 20 líneas
+                for i, line in enumerate(lines):
                     line_clean = line.strip()
                     if line_clean:
                         parts = [part.strip() for part in line_clean.split('\t') if part.strip()]
@@ -1297,19 +1296,18 @@ def debug_csv():
 def debug_med_pharma():
     """Debug específico para med pharma"""
     try:
-        from inventario_simple import debug_inventario, cargar_inventario
+        from inventario_simple import debug_inventario, get_catalogo
         
         # Cargar inventario
-        cargar_inventario()
+        catalogo = get_catalogo()
         
         # Obtener información de debug
         debug_info = debug_inventario()
         
         # Buscar específicamente productos de "med pharma"
         med_pharma_productos = []
-        from inventario_simple import INVENTARIO_MEMORIA
         
-        for producto in INVENTARIO_MEMORIA:
+        for producto in catalogo.productos:
             if 'med pharma' in producto['laboratorio'].lower():
                 med_pharma_productos.append({
                     'nombre': producto['nombre'],
@@ -1328,14 +1326,3 @@ def debug_med_pharma():
 
 # Para Vercel
 app.debug = False
-
-# Inicializar base de datos solo cuando sea necesario
-def initialize_database():
-    """Inicializar la base de datos solo cuando sea necesario"""
-    try:
-        init_db()
-        print("Base de datos inicializada correctamente")
-        return True
-    except Exception as e:
-        print(f"Error al inicializar la base de datos: {e}")
-        return False 
\ No newline at end of file
@@ -9,6 +9,8 @@ import os
 from datetime import datetime
 import zipfile
 
+from conexiones_db import copiar_sqlite
+
 def hacer_backup():
     """Crear backup de la base de datos"""
     
@@ -32,8 +34,8 @@ def hacer_backup():
             print(f"❌ Error: No se encontró '{db_original}'")
             return False
         
-        # Crear backup
-        shutil.copy2(db_original, backup_path)
+        # Crear backup (incluye lo que aún está en el WAL)
+        copiar_sqlite(db_original, backup_path)
         
         # Crear backup comprimido
         zip_file = f"farmacia_backup_{timestamp}.zip"
@@ -82,10 +84,10 @@ def restaurar_backup(backup_file):
                 os.makedirs('backups')
             
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            shutil.copy2('farmacia.db', f'backups/farmacia_antes_restauracion_{timestamp}.db')
+            copiar_sqlite('farmacia.db', f'backups/farmacia_antes_restauracion_{timestamp}.db')
         
-        # Restaurar
-        shutil.copy2(db_file, 'farmacia.db')
+        # Restaurar (sobre la base abierta: no deja un -wal viejo a medias)
+        copiar_sqlite(db_file, 'farmacia.db')
         
         # Limpiar archivos temporales
         shutil.rmtree('temp_backup')
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Benchmark del parser de inventario compartido contra los parsers anteriores
+
+Compara tiempo (mejor de varias corridas) y memoria pico de:
+- parser_inventario.leer_productos (streaming, un solo csv.reader)
+- el parser anterior de inventario_simple (readlines + csv.reader por línea)
+- el parser anterior de app.parse_inventory_file (readlines + split por tabulaciones)
+- el DictReader anterior de app.buscar_productos / get_estadisticas
+
+Uso:
+    python benchmark_parser_inventario.py
+"""
+import csv
+import time
+import tracemalloc
+from io import StringIO
+
+from parser_inventario import CSV_PATH, leer_productos
+
+REPETICIONES = 5
+
+
+def parser_compartido():
+    """Parser actual: genera ProductoInventario fila por fila"""
+    return list(leer_productos(CSV_PATH))
+
+
+def anterior_csv_por_linea():
+    """Parser anterior de inventario_simple.cargar_inventario()"""
+    with open(CSV_PATH, 'r', encoding='utf-8-sig') as file:
+        lines = file.readlines()
+
+    productos = []
+    header_found = False
+    for line in lines:
+        line = line.strip()
+        if 'Codigo' in line and 'Nombre' in line:
+            header_found = True
+            continue
+        if header_found and line and not line.startswith('"Listado') and not line.startswith('"Reportes'):
+            parts = next(csv.reader(StringIO(line)))
+            if len(parts) >= 4:
+                codigo, nombre, modelo, laboratorio = [p.strip() for p in parts[:4]]
+                if codigo and nombre and len(codigo) > 3 and len(nombre) > 3:
+                    productos.append((codigo, nombre, modelo, laboratorio))
+    return productos
+
+
+def anterior_split_tabulaciones():
+    """Parser anterior de app.parse_inventory_file()"""
+    with open(CSV_PATH, 'r', encoding='utf-8-sig') as file:
+        lines = file.readlines()
+
+    productos = []
+    header_found = False
+    for line in lines:
+        line = line.strip()
+        if 'Codigo' in line and 'Nombre' in line:
+            header_found = True
+            continue
+        if header_found and line and not line.startswith('"Listado') and not line.startswith('"Reportes'):
+            line = line.replace('"', '')
+            parts = [part.strip() for part in line.split('\t') if part.strip()]
+            if len(parts) >= 3:
+                modelo_marca = parts[2]
+                if ',' in modelo_marca:
+                    modelo, marca = modelo_marca.rsplit(',', 1)
+                else:
+                    modelo, marca = modelo_marca, 'Sin especificar'
+                if len(parts[0]) > 3 and len(parts[1]) > 3:
+                    productos.append((parts[0], parts[1], modelo.strip(), marca.strip()))
+    return productos
+
+
+def anterior_dictreader():
+    """Lectura anterior de app.buscar_productos() / get_estadisticas()"""
+    with open(CSV_PATH, 'r', encoding='utf-8') as file:
+        return [row for row in csv.DictReader(file)]
+
+
+def medir(funcion):
+    """Medir el mejor tiempo y la memoria pico de una función"""
+    mejor = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        duracion = time.perf_counter() - inicio
+        mejor = duracion if mejor is None else min(mejor, duracion)
+
+    tracemalloc.start()
+    funcion()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return mejor, pico, len(resultado)
+
+
+def main():
+    """Ejecutar el benchmark e imprimir la comparación"""
+    print("📊 BENCHMARK DEL PARSER DE INVENTARIO")
+    print("=" * 70)
+    print(f"{'Parser':<32}{'Tiempo (ms)':>12}{'Memoria pico (KB)':>18}{'Filas':>8}")
+
+    for nombre, funcion in (
+        ('parser_inventario (streaming)', parser_compartido),
+        ('csv.reader por línea', anterior_csv_por_linea),
+        ('split por tabulaciones', anterior_split_tabulaciones),
+        ('DictReader', anterior_dictreader),
+    ):
+        duracion, pico, filas = medir(funcion)
+        print(f"{nombre:<32}{duracion * 1000:>12.1f}{pico / 1024:>18.0f}{filas:>8}")
+
+    # Resultado del parser anterior que ya era correcto frente al nuevo
+    nuevos = [tuple(p[:4]) for p in parser_compartido()]
+    print("=" * 70)
+    print(f"Coincide con el csv.reader por línea: {nuevos == anterior_csv_por_linea()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Benchmark de las consultas de registros con y sin sus índices
+
+Crea una base SQLite temporal con el esquema de migraciones.py y FILAS
+registros repartidos entre dos farmacias y tres años, y mide (mejor de varias
+corridas) cada consulta antes y después de crear los índices, mostrando el
+plan de SQLite en ambos casos.
+
+Las consultas son las que hace la aplicación:
+- /api/registros: farmacia, orden por fecha_ingreso_ts DESC, LIMIT 1000
+- /api/registros con rango de un mes (días locales, -06:00)
+- exportar_excel: todos los registros de una farmacia, ordenados
+- búsquedas puntuales por numero_factura, lote y codigo_empleado
+
+La exportación devuelve la mitad de la tabla: el índice le ahorra el ordenamiento
+pero no la lectura de cada fila, así que ahí la diferencia es pequeña.
+
+Uso:
+    python benchmark_registros.py [filas]
+"""
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from migraciones import aplicar_migraciones
+from repositorio_registros import COLUMNAS_INSERCION, ZONA_HORARIA, inicio_dia, valor_instante
+
+FILAS = 1_000_000
+REPETICIONES = 3
+
+ORDEN = 'ORDER BY fecha_ingreso_ts DESC, id DESC'
+
+CONSULTAS = (
+    ('api_registros', f"SELECT * FROM registros WHERE farmacia = ? {ORDEN} LIMIT 1000", ('farmacia1',)),
+    ('api_registros (un mes)', "SELECT * FROM registros WHERE farmacia = ? AND fecha_ingreso_ts >= ? "
+     f"AND fecha_ingreso_ts < ? {ORDEN} LIMIT 1000",
+     ('farmacia2', valor_instante(inicio_dia('2024-03-01'), 'sqlite'),
+      valor_instante(inicio_dia('2024-04-01'), 'sqlite'))),
+    ('exportar_excel', f"SELECT * FROM registros WHERE farmacia = ? {ORDEN}", ('farmacia1',)),
+    ('numero_factura', "SELECT * FROM registros WHERE numero_factura = ?", ('F-123456',)),
+    ('lote', "SELECT * FROM registros WHERE lote = ?", ('L7777',)),
+    ('codigo_empleado', "SELECT * FROM registros WHERE codigo_empleado = ?", ('E042',)),
+)
+
+
+def generar_registros(filas):
+    """Generar filas de registros con valores plausibles (semilla fija)"""
+    aleatorio = random.Random(42)
+    inicio = datetime(2023, 1, 1, tzinfo=ZONA_HORARIA)
+    segundos = 3 * 365 * 24 * 3600
+    for i in range(filas):
+        fecha = inicio + timedelta(seconds=aleatorio.randrange(segundos))
+        valores = {
+            'laboratorio': f'LAB {aleatorio.randrange(300)}',
+            'medicamento': f'MEDICAMENTO {aleatorio.randrange(5000)}',
+            'cantidad': aleatorio.randrange(1, 20),
+            'precio': 0.0,
+            'fecha': fecha.strftime('%Y-%m-%d'),
+            'fecha_ingreso': fecha.isoformat(),
+            'tipo_movimiento': 'VENTA',
+            'lote': f'L{aleatorio.randrange(20000)}',
+            'numero_factura': f'F-{i}',
+            'codigo_empleado': f'E{aleatorio.randrange(100):03d}',
+            'farmacia': aleatorio.choice(('farmacia1', 'farmacia2'))
+        }
+        yield tuple(valores.get(columna) for columna in COLUMNAS_INSERCION) + (int(fecha.timestamp()),)
+
+
+def medir(conn, sql, parametros):
+    """Mejor tiempo en ms y filas devueltas de una consulta"""
+    mejor = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        filas = conn.execute(sql, parametros).fetchall()
+        duracion = (time.perf_counter() - inicio) * 1000
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor, len(filas)
+
+
+def plan(conn, sql, parametros):
+    """Plan de ejecución de SQLite en una línea"""
+    return '; '.join(fila[3] for fila in conn.execute('EXPLAIN QUERY PLAN ' + sql, parametros))
+
+
+def main():
+    """Ejecutar el benchmark e imprimir la comparación"""
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else FILAS
+    descriptor, ruta = tempfile.mkstemp(suffix='.db')
+    os.close(descriptor)
+
+    try:
+        conn = sqlite3.connect(ruta)
+        aplicar_migraciones(conn, 'sqlite')
+        # Se quitan los índices para medir el antes y se recrean después
+        indices = conn.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index' "
+                               "AND name LIKE 'idx_registros_%'").fetchall()
+        for nombre, _ in indices:
+            conn.execute(f'DROP INDEX {nombre}')
+
+        print(f"📊 BENCHMARK DE CONSULTAS DE REGISTROS ({filas:,} filas)")
+        inicio = time.perf_counter()
+        columnas = COLUMNAS_INSERCION + ('fecha_ingreso_ts',)
+        marcas = ', '.join('?' * len(columnas))
+        conn.executemany(f"INSERT INTO registros ({', '.join(columnas)}) VALUES ({marcas})",
+                         generar_registros(filas))
+        conn.commit()
+        print(f"Carga: {time.perf_counter() - inicio:.1f} s")
+
+        antes = {nombre: (medir(conn, sql, p), plan(conn, sql, p)) for nombre, sql, p in CONSULTAS}
+
+        inicio = time.perf_counter()
+        for _, sql in indices:
+            conn.execute(sql)
+        conn.execute('ANALYZE registros')
+        conn.commit()
+        print(f"Creación de índices: {time.perf_counter() - inicio:.1f} s")
+
+        print("=" * 78)
+        print(f"{'Consulta':<26}{'Sin índices (ms)':>18}{'Con índices (ms)':>18}{'Filas':>10}")
+        for nombre, sql, parametros in CONSULTAS:
+            (sin_indices, filas_antes), plan_antes = antes[nombre]
+            con_indices, filas_despues = medir(conn, sql, parametros)
+            assert filas_antes == filas_despues
+            print(f"{nombre:<26}{sin_indices:>18.1f}{con_indices:>18.1f}{filas_despues:>10}")
+            print(f"    antes:   {plan_antes}")
+            print(f"    después: {plan(conn, sql, parametros)}")
+        conn.close()
+    finally:
+        os.remove(ruta)
+
+
+if __name__ == "__main__":
+    main()
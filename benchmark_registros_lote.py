@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /api/registros/lote contra N llamadas a /guardar_registro
+
+Usa el cliente de pruebas de Flask sobre una base SQLite temporal (la base
+de la aplicación no se toca) y mide, para varios tamaños de factura, el mejor
+tiempo de guardar N movimientos uno por uno (una solicitud, una transacción y
+un commit por movimiento) frente a una sola solicitud con el lote.
+
+Uso:
+    python benchmark_registros_lote.py
+"""
+import os
+import sqlite3
+import tempfile
+import time
+
+# La aplicación no debe migrar farmacia.db ni vigilar el inventario
+os.environ['MIGRAR_AL_INICIAR'] = 'false'
+os.environ['VIGILANTE_CATALOGO'] = 'false'
+
+import app as aplicacion
+from conexiones_db import ConexionesPorHilo
+from migraciones import aplicar_migraciones
+
+TAMANOS = (1, 10, 50, 200)
+REPETICIONES = 3
+
+
+def movimiento(i):
+    """Una línea de factura de ejemplo"""
+    return {
+        'laboratorio': 'GENFAR', 'medicamento': f'ACETAMINOFEN {i}', 'cantidad': 1 + i % 5,
+        'fecha': '2025-01-15', 'numero_factura': 'F-1001', 'codigo_empleado': 'E001'
+    }
+
+
+def uno_por_uno(cliente, movimientos):
+    for datos in movimientos:
+        assert cliente.post('/guardar_registro', json=datos).get_json()['success']
+
+
+def en_lote(cliente, movimientos):
+    respuesta = cliente.post('/api/registros/lote', json={'registros': movimientos}).get_json()
+    assert respuesta['success'] and len(respuesta['resultados']) == len(movimientos)
+
+
+def medir(funcion, cliente, movimientos):
+    """Mejor tiempo en ms"""
+    mejor = None
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion(cliente, movimientos)
+        duracion = (time.perf_counter() - inicio) * 1000
+        mejor = duracion if mejor is None else min(mejor, duracion)
+    return mejor
+
+
+def main():
+    """Ejecutar el benchmark e imprimir la comparación"""
+    descriptor, ruta = tempfile.mkstemp(suffix='.db')
+    os.close(descriptor)
+
+    try:
+        conn = sqlite3.connect(ruta)
+        aplicar_migraciones(conn, 'sqlite')
+        conn.close()
+        aplicacion.POOL_DB = ConexionesPorHilo(ruta)
+        cliente = aplicacion.app.test_client()
+
+        print("📊 BENCHMARK DE INGRESO DE REGISTROS (SQLite)")
+        print("=" * 66)
+        print(f"{'Movimientos':>12}{'Uno por uno (ms)':>20}{'Lote (ms)':>14}{'Mejora':>10}")
+        for tamano in TAMANOS:
+            movimientos = [movimiento(i) for i in range(tamano)]
+            individual = medir(uno_por_uno, cliente, movimientos)
+            lote = medir(en_lote, cliente, movimientos)
+            print(f"{tamano:>12}{individual:>20.1f}{lote:>14.1f}{individual / lote:>9.1f}x")
+
+        total = sqlite3.connect(ruta).execute('SELECT COUNT(*) FROM registros').fetchone()[0]
+        print("=" * 66)
+        print(f"Registros guardados: {total}")
+        aplicacion.POOL_DB.cerrar()
+    finally:
+        for sufijo in ('', '-wal', '-shm'):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+
+
+if __name__ == "__main__":
+    main()
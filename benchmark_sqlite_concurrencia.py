@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark de lecturas y escrituras concurrentes en SQLite: diario clásico
+(rollback journal, como abría las conexiones la aplicación antes) contra el
+perfil de conectar_sqlite() (WAL, synchronous=NORMAL, caché y mmap)
+
+Sobre una base temporal con FILAS registros corren a la vez, durante DURACION
+segundos:
+- CAJAS hilos que guardan ventas (un INSERT y un commit cada una)
+- LECTORES hilos que piden la primera página del historial con su total
+- un hilo que exporta todos los registros de una farmacia una y otra vez
+
+Para cada perfil se muestran operaciones por segundo, latencia (p50, p95 y
+máxima) y cuántas operaciones fallaron con 'database is locked'.
+
+Uso:
+    python benchmark_sqlite_concurrencia.py [filas] [segundos]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+from benchmark_registros import generar_registros
+from conexiones_db import ConexionesPorHilo, conectar_sqlite, perfil_sqlite
+from migraciones import aplicar_migraciones
+from repositorio_registros import COLUMNAS_INSERCION, RepositorioRegistros
+
+FILAS = 100_000
+DURACION = 5.0
+CAJAS = 4
+LECTORES = 2
+
+PERFILES = (
+    # sqlite3.connect() sin más: espera 5 s ante un bloqueo, diario DELETE
+    ('rollback journal', [('busy_timeout', 5000), ('journal_mode', 'DELETE'), ('synchronous', 'FULL')]),
+    ('WAL (perfil)', perfil_sqlite()),
+)
+
+
+def preparar_base(ruta, perfil, filas):
+    """Crear el esquema, cargar los registros y dejar la base en el modo del perfil"""
+    conn = conectar_sqlite(ruta, perfil)
+    aplicar_migraciones(conn, 'sqlite')
+    columnas = COLUMNAS_INSERCION + ('fecha_ingreso_ts',)
+    conn.executemany(
+        f"INSERT INTO registros ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})",
+        generar_registros(filas)
+    )
+    conn.commit()
+    conn.close()
+
+
+def percentil(valores, fraccion):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(int(len(ordenados) * fraccion), len(ordenados) - 1)]
+
+
+def correr(ruta, perfil, duracion):
+    """Correr la carga mixta y devolver {tipo: (latencias en ms, bloqueos)}"""
+    conexiones = ConexionesPorHilo(ruta, perfil=perfil, checkpoint_cada=1)
+    resultados = {'venta': ([], [0]), 'historial': ([], [0]), 'exportacion': ([], [0])}
+    fin = time.perf_counter() + duracion
+
+    def operacion(tipo):
+        latencias, bloqueos = resultados[tipo]
+        numero = 0
+        while time.perf_counter() < fin:
+            numero += 1
+            inicio = time.perf_counter()
+            try:
+                with RepositorioRegistros(conexiones.obtener(), 'sqlite') as registros:
+                    if tipo == 'venta':
+                        registros.insertar({
+                            'laboratorio': 'GENFAR', 'medicamento': f'VENTA {numero}', 'cantidad': 1,
+                            'fecha': '2025-06-01', 'fecha_ingreso': '2025-06-01T10:00:00-06:00',
+                            'farmacia': 'farmacia1'
+                        })
+                        registros.commit()
+                    elif tipo == 'historial':
+                        registros.buscar_pagina('farmacia1', limite=100, contar=True)
+                    else:
+                        registros.buscar('farmacia2')
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e) and 'busy' not in str(e):
+                    raise
+                bloqueos[0] += 1
+                continue
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        conexiones.cerrar()
+
+    hilos = ([threading.Thread(target=operacion, args=('venta',)) for _ in range(CAJAS)] +
+             [threading.Thread(target=operacion, args=('historial',)) for _ in range(LECTORES)] +
+             [threading.Thread(target=operacion, args=('exportacion',))])
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados, conexiones.get_estado()
+
+
+def main():
+    """Ejecutar el benchmark e imprimir la comparación"""
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else FILAS
+    duracion = float(sys.argv[2]) if len(sys.argv) > 2 else DURACION
+
+    print(f"📊 BENCHMARK DE CONCURRENCIA SQLITE ({filas:,} registros, {duracion:.0f} s, "
+          f"{CAJAS} cajas, {LECTORES} lectores, 1 exportación)")
+    for nombre, perfil in PERFILES:
+        descriptor, ruta = tempfile.mkstemp(suffix='.db')
+        os.close(descriptor)
+        try:
+            preparar_base(ruta, perfil, filas)
+            resultados, estado = correr(ruta, perfil, duracion)
+        finally:
+            for sufijo in ('', '-wal', '-shm', '-journal'):
+                if os.path.exists(ruta + sufijo):
+                    os.remove(ruta + sufijo)
+
+        print("=" * 78)
+        print(f"{nombre} (checkpoints: {estado['checkpoints']})")
+        print(f"{'Operación':<14}{'ops/s':>10}{'p50 (ms)':>12}{'p95 (ms)':>12}{'máx (ms)':>12}{'bloqueos':>12}")
+        for tipo, (latencias, bloqueos) in resultados.items():
+            print(f"{tipo:<14}{len(latencias) / duracion:>10.1f}{percentil(latencias, 0.5):>12.1f}"
+                  f"{percentil(latencias, 0.95):>12.1f}{max(latencias, default=0):>12.1f}{bloqueos[0]:>12}")
+
+
+if __name__ == "__main__":
+    main()
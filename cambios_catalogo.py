@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Versiones del catálogo y diferencias entre ellas.
+
+Cada producto tiene una huella (hash de todos sus campos) y cada catálogo una
+versión: el hash de todas las huellas ordenadas por código. La versión depende
+solo del contenido, así que un mismo archivo da la misma versión aunque se
+cargue desde el snapshot o tras reiniciar el servidor.
+
+Se guardan las huellas de las últimas versiones publicadas. Con ellas un
+cliente que conoce una versión anterior recibe solo los productos agregados,
+modificados y eliminados, en vez de volver a descargar todo el catálogo.
+
+El historial vive en memoria: una versión de antes del último reinicio no se
+reconstruye desde los respaldos del CSV, porque la huella incluye el precio y
+las existencias de inventarioraw.xlsx vigentes al publicarla. Esos clientes
+reciben 'completo' y vuelven a descargar el catálogo.
+"""
+import hashlib
+import threading
+from collections import deque
+from datetime import datetime
+
+# Campos que forman la huella de un producto
+CAMPOS_HUELLA = ('codigo', 'nombre', 'modelo', 'laboratorio', 'precio', 'stock')
+
+# Versiones anteriores que se conservan para calcular diferencias
+MAX_VERSIONES = 10
+
+# Historial de versiones publicadas: (versión, huellas, fecha), la última al final
+_HISTORIAL = deque(maxlen=MAX_VERSIONES)
+_HISTORIAL_LOCK = threading.Lock()
+
+
+def huella_producto(producto):
+    """Calcular la huella de un producto (16 caracteres hexadecimales)"""
+    contenido = '\x1f'.join(str(producto.get(campo, '')) for campo in CAMPOS_HUELLA)
+    return hashlib.blake2b(contenido.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def calcular_huellas(productos):
+    """Calcular las huellas de un catálogo: {código: huella}"""
+    return {producto['codigo']: huella_producto(producto) for producto in productos}
+
+
+def version_catalogo(huellas):
+    """Calcular la versión de un catálogo a partir de sus huellas"""
+    resumen = hashlib.blake2b(digest_size=8)
+    for codigo in sorted(huellas):
+        resumen.update(f"{codigo}\x1f{huellas[codigo]}\n".encode('utf-8'))
+    return resumen.hexdigest()
+
+
+def diferencia(anteriores, nuevas):
+    """Comparar dos juegos de huellas y devolver los códigos agregados,
+    modificados y eliminados (ordenados)"""
+    return {
+        'agregados': sorted(codigo for codigo in nuevas if codigo not in anteriores),
+        'modificados': sorted(
+            codigo for codigo, huella in nuevas.items()
+            if codigo in anteriores and anteriores[codigo] != huella
+        ),
+        'eliminados': sorted(codigo for codigo in anteriores if codigo not in nuevas)
+    }
+
+
+def registrar_version(version, huellas):
+    """Agregar al historial la versión de un catálogo recién publicado
+
+    Devuelve la diferencia con la versión anterior o None si no había una.
+    """
+    with _HISTORIAL_LOCK:
+        if _HISTORIAL and _HISTORIAL[-1][0] == version:
+            return None
+        anterior = _HISTORIAL[-1] if _HISTORIAL else None
+        _HISTORIAL.append((version, huellas, datetime.now().isoformat()))
+
+    if anterior is None:
+        return None
+    return diferencia(anterior[1], huellas)
+
+
+def get_versiones():
+    """Obtener las versiones del historial, de la más antigua a la actual"""
+    with _HISTORIAL_LOCK:
+        return [{'version': version, 'fecha': fecha, 'productos': len(huellas)}
+                for version, huellas, fecha in _HISTORIAL]
+
+
+def _buscar_version(version):
+    """Obtener las huellas de una versión del historial o None"""
+    with _HISTORIAL_LOCK:
+        for registrada, huellas, _ in reversed(_HISTORIAL):
+            if registrada == version:
+                return huellas
+    return None
+
+
+def cambios_desde(desde, catalogo):
+    """Calcular los cambios del catálogo desde la versión 'desde'
+
+    Devuelve los productos agregados y modificados completos y los códigos
+    eliminados. Si la versión no está en el historial, 'completo' es True y
+    el cliente debe volver a descargar el catálogo entero.
+    """
+    respuesta = {
+        'version': catalogo.version,
+        'desde': desde,
+        'completo': False,
+        'agregados': [],
+        'modificados': [],
+        'eliminados': []
+    }
+
+    if desde == catalogo.version:
+        return respuesta
+
+    anteriores = _buscar_version(desde) if desde else None
+    if anteriores is None:
+        respuesta['completo'] = True
+        return respuesta
+
+    cambios = diferencia(anteriores, catalogo.huellas)
+    respuesta['agregados'] = [catalogo.productos_por_codigo[codigo] for codigo in cambios['agregados']]
+    respuesta['modificados'] = [catalogo.productos_por_codigo[codigo] for codigo in cambios['modificados']]
+    respuesta['eliminados'] = cambios['eliminados']
+    return respuesta
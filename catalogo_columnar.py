@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Representación en columnas del catálogo de inventario.
+
+En lugar de un diccionario por producto se guardan:
+- los laboratorios internados (cada nombre una sola vez) y un código por producto
+- precio y stock en arreglos NumPy
+- códigos, nombres y modelos en un solo texto contiguo con sus desplazamientos
+
+Sobre estas columnas los filtros por laboratorio, stock y precio son
+operaciones vectorizadas.
+"""
+import sys
+
+import numpy as np
+
+from indices_catalogo import normalizar_texto
+
+# Separador entre textos del buffer contiguo (no aparece en los datos)
+SEPARADOR = '\x00'
+
+
+class BufferTextos:
+    """Lista de textos guardada en un solo str con desplazamientos"""
+
+    def __init__(self, textos):
+        self.texto = SEPARADOR.join(textos) + SEPARADOR
+        longitudes = np.fromiter((len(t) + 1 for t in textos), dtype=np.int64, count=len(textos))
+        self.desplazamientos = np.zeros(len(textos) + 1, dtype=np.int64)
+        np.cumsum(longitudes, out=self.desplazamientos[1:])
+
+    def __len__(self):
+        return len(self.desplazamientos) - 1
+
+    def __getitem__(self, i):
+        inicio = self.desplazamientos[i]
+        return self.texto[inicio:self.desplazamientos[i + 1] - 1]
+
+    def buscar(self, termino):
+        """Obtener las filas (ordenadas, sin repetir) cuyo texto contiene el término"""
+        if not termino:
+            return np.arange(len(self), dtype=np.int64)
+
+        posiciones = []
+        pos = self.texto.find(termino)
+        while pos != -1:
+            posiciones.append(pos)
+            pos = self.texto.find(termino, pos + 1)
+
+        if not posiciones:
+            return np.empty(0, dtype=np.int64)
+
+        filas = np.searchsorted(self.desplazamientos, np.array(posiciones, dtype=np.int64), side='right') - 1
+        return np.unique(filas)
+
+    def nbytes(self):
+        """Memoria ocupada por el buffer y sus desplazamientos"""
+        return sys.getsizeof(self.texto) + self.desplazamientos.nbytes
+
+
+class CatalogoColumnar:
+    """Catálogo en columnas con filtros vectorizados"""
+
+    def __init__(self, productos, nombres_normalizados=None):
+        n = len(productos)
+
+        # Laboratorios internados en orden alfabético: el orden de los códigos
+        # coincide con el orden de los nombres
+        self.laboratorios = sorted({p['laboratorio'] for p in productos})
+        codigo_por_laboratorio = {lab: i for i, lab in enumerate(self.laboratorios)}
+        self.laboratorios_normalizados = [normalizar_texto(lab) for lab in self.laboratorios]
+
+        self.lab_codigos = np.fromiter(
+            (codigo_por_laboratorio[p['laboratorio']] for p in productos), dtype=np.int32, count=n)
+        self.precio = np.fromiter((p['precio'] for p in productos), dtype=np.float64, count=n)
+        self.stock = np.fromiter((p['stock'] for p in productos), dtype=np.float64, count=n)
+
+        self.codigos = BufferTextos([p['codigo'] for p in productos])
+        self.nombres = BufferTextos([p['nombre'] for p in productos])
+        self.modelos = BufferTextos([p['modelo'] for p in productos])
+        if nombres_normalizados is None:
+            nombres_normalizados = [normalizar_texto(p['nombre']) for p in productos]
+        self.nombres_normalizados = BufferTextos(nombres_normalizados)
+
+        # Posición de cada producto en el orden alfabético de nombres
+        orden = sorted(range(n), key=lambda i: productos[i]['nombre'])
+        self.rango_nombre = np.empty(n, dtype=np.int32)
+        self.rango_nombre[orden] = np.arange(n, dtype=np.int32)
+
+    def __len__(self):
+        return len(self.lab_codigos)
+
+    def codigos_laboratorio(self, laboratorio, modo='prefijo'):
+        """Obtener los códigos internos de los laboratorios que coinciden
+
+        modo 'prefijo': el laboratorio empieza con el texto buscado
+        modo 'contiene': el laboratorio contiene el texto buscado
+        """
+        buscar = normalizar_texto(laboratorio)
+        if modo == 'contiene':
+            return [i for i, lab in enumerate(self.laboratorios_normalizados) if buscar in lab]
+        return [i for i, lab in enumerate(self.laboratorios_normalizados) if lab.startswith(buscar)]
+
+    def filtrar(self, laboratorio=None, modo_laboratorio='prefijo', stock_min=None, stock_max=None,
+                precio_min=None, precio_max=None, stock_mayor_que=None, stock_menor_que=None):
+        """Obtener las filas que cumplen todos los filtros indicados
+
+        stock_min y stock_max incluyen el límite; stock_mayor_que y
+        stock_menor_que lo excluyen (el stock puede tener decimales).
+        """
+        mascara = np.ones(len(self), dtype=bool)
+
+        if laboratorio:
+            codigos = self.codigos_laboratorio(laboratorio, modo_laboratorio)
+            mascara &= np.isin(self.lab_codigos, codigos)
+        if stock_min is not None:
+            mascara &= self.stock >= stock_min
+        if stock_max is not None:
+            mascara &= self.stock <= stock_max
+        if stock_mayor_que is not None:
+            mascara &= self.stock > stock_mayor_que
+        if stock_menor_que is not None:
+            mascara &= self.stock < stock_menor_que
+        if precio_min is not None:
+            mascara &= self.precio >= precio_min
+        if precio_max is not None:
+            mascara &= self.precio <= precio_max
+
+        return np.flatnonzero(mascara)
+
+    def ordenar_por_laboratorio_y_nombre(self, filas):
+        """Ordenar filas por laboratorio y luego por nombre"""
+        return filas[np.lexsort((self.rango_nombre[filas], self.lab_codigos[filas]))]
+
+    def buscar_nombre(self, termino):
+        """Obtener las filas cuyo nombre normalizado contiene el término normalizado"""
+        return self.nombres_normalizados.buscar(normalizar_texto(termino))
+
+    def fila(self, i):
+        """Reconstruir un producto como diccionario"""
+        return {
+            'codigo': self.codigos[i],
+            'nombre': self.nombres[i],
+            'modelo': self.modelos[i],
+            'laboratorio': self.laboratorios[self.lab_codigos[i]],
+            'precio': float(self.precio[i]),
+            'stock': float(self.stock[i])
+        }
+
+    def get_laboratorios(self):
+        """Obtener los laboratorios con productos (sin vacíos ni 'Sin especificar')"""
+        # Los laboratorios internados ya están ordenados y todos tienen productos
+        return [lab for lab in self.laboratorios if lab and lab != 'Sin especificar']
+
+    def estadisticas(self, umbral_stock_bajo=10):
+        """Obtener totales del catálogo con operaciones vectorizadas"""
+        return {
+            'total_productos': len(self),
+            'total_laboratorios': len(self.get_laboratorios()),
+            'stock_bajo': int(np.count_nonzero((self.stock > 0) & (self.stock < umbral_stock_bajo))),
+            'sin_stock': int(np.count_nonzero(self.stock == 0))
+        }
+
+    def nbytes(self):
+        """Memoria aproximada ocupada por la representación en columnas"""
+        total = sum(sys.getsizeof(lab) for lab in self.laboratorios)
+        total += sum(sys.getsizeof(lab) for lab in self.laboratorios_normalizados)
+        total += self.lab_codigos.nbytes + self.precio.nbytes + self.stock.nbytes + self.rango_nombre.nbytes
+        total += self.codigos.nbytes() + self.nombres.nbytes() + self.modelos.nbytes()
+        total += self.nombres_normalizados.nbytes()
+        return total
+
+
+def tamano_productos_dict(productos):
+    """Memoria aproximada de la lista de diccionarios (cada objeto se cuenta una vez)"""
+    vistos = set()
+    total = sys.getsizeof(productos)
+    for producto in productos:
+        total += sys.getsizeof(producto)
+        for valor in producto.values():
+            if id(valor) not in vistos:
+                vistos.add(id(valor))
+                total += sys.getsizeof(valor)
+    return total
@@ -0,0 +1,444 @@
+#!/usr/bin/env python3
+"""
+Conexiones reutilizables a la base de datos.
+
+- PostgreSQL (Supabase): pool acotado y seguro entre hilos. Abrir una conexión
+  (TLS + autenticación) cuesta más que la consulta, así que las conexiones se
+  prestan y se devuelven. Las que pasaron un tiempo sin usarse se verifican
+  con 'SELECT 1' antes de prestarlas, y ninguna vive más de max_vida segundos.
+- SQLite: pool acotado (PoolSQLite) de conexiones abiertas con el perfil de
+  conectar_sqlite() (WAL, busy_timeout, synchronous=NORMAL, caché y mmap) y
+  con checkpoints periódicos del WAL. El servidor de Flask atiende cada
+  solicitud en un hilo nuevo, así que una conexión por hilo no se reutilizaría;
+  ConexionesPorHilo queda para scripts con hilos de larga vida.
+
+En ambos casos se entrega una ConexionPrestada, que se usa igual que la
+conexión de psycopg2 o sqlite3: close() la devuelve en lugar de cerrarla.
+"""
+import queue
+import sqlite3
+import threading
+import time
+
+
+def perfil_sqlite(wal=True, busy_timeout_ms=5000, cache_mb=16, mmap_mb=256):
+    """PRAGMAs con que se abre cada conexión SQLite, en orden de aplicación
+
+    Con WAL los lectores (historial, exportación, mantenimiento) no bloquean a
+    quien escribe ni al revés, y synchronous=NORMAL es seguro: un corte de luz
+    puede perder las últimas transacciones pero no corrompe la base. El WAL se
+    vuelca a la base cada ~1000 páginas (wal_autocheckpoint) y con los
+    checkpoints periódicos de ConexionesPorHilo; journal_size_limit evita que
+    el archivo -wal quede grande después.
+    """
+    perfil = [('busy_timeout', int(busy_timeout_ms))]
+    if wal:
+        perfil += [
+            ('journal_mode', 'WAL'),
+            ('synchronous', 'NORMAL'),
+            ('wal_autocheckpoint', 1000),
+            ('journal_size_limit', 64 * 1024 * 1024),
+        ]
+    perfil += [
+        ('cache_size', -int(cache_mb * 1024)),  # negativo: KiB en lugar de páginas
+        ('mmap_size', int(mmap_mb * 1024 * 1024)),
+        ('temp_store', 'MEMORY'),
+    ]
+    return perfil
+
+
+def conectar_sqlite(ruta, perfil=None, **kwargs):
+    """Abrir una conexión SQLite y aplicarle el perfil (por defecto perfil_sqlite())"""
+    conexion = sqlite3.connect(ruta, **kwargs)
+    for pragma, valor in (perfil_sqlite() if perfil is None else perfil):
+        try:
+            conexion.execute(f'PRAGMA {pragma} = {valor}').fetchall()
+        except sqlite3.Error as e:
+            # Por ejemplo, no se puede pasar a WAL si otra conexión tiene la base bloqueada
+            print(f"No se pudo aplicar PRAGMA {pragma}: {e}")
+    return conexion
+
+
+def copiar_sqlite(origen, destino):
+    """Copiar una base SQLite de forma consistente, con la API de respaldo
+
+    Copiar el archivo con shutil no sirve en modo WAL: las transacciones que
+    aún están en el archivo -wal no se copiarían. La API de respaldo copia la
+    base tal como la ve una lectura, mientras las cajas siguen escribiendo.
+    """
+    fuente = conectar_sqlite(origen)
+    copia = conectar_sqlite(destino)
+    try:
+        fuente.backup(copia)
+    finally:
+        copia.close()
+        fuente.close()
+
+
+class _Entrada:
+    """Conexión del pool con su fecha de creación y de último uso"""
+
+    __slots__ = ('conexion', 'creada', 'ultimo_uso')
+
+    def __init__(self, conexion):
+        self.conexion = conexion
+        self.creada = time.monotonic()
+        self.ultimo_uso = self.creada
+
+
+class ConexionPrestada:
+    """Conexión prestada por un pool: close() la devuelve al pool
+
+    Si no se cierra explícitamente (por ejemplo por una excepción antes de
+    close()) se devuelve cuando el objeto se libera.
+    """
+
+    def __init__(self, entrada, devolver):
+        self._entrada = entrada
+        self._devolver = devolver
+
+    def __getattr__(self, nombre):
+        if self._entrada is None:
+            raise sqlite3.ProgrammingError('La conexión ya fue devuelta al pool')
+        return getattr(self._entrada.conexion, nombre)
+
+    def close(self):
+        """Devolver la conexión (se deshace lo que no se haya confirmado)"""
+        entrada, self._entrada = self._entrada, None
+        if entrada is not None:
+            self._devolver(entrada)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.close()
+
+    def __del__(self):
+        self.close()
+
+
+def _limpiar(conexion):
+    """Dejar una conexión devuelta como recién abierta"""
+    conexion.rollback()
+    if getattr(conexion, 'autocommit', False) is True:
+        conexion.autocommit = False
+    if isinstance(conexion, sqlite3.Connection):
+        conexion.row_factory = None
+
+
+def _cerrar(conexion):
+    """Cerrar una conexión ignorando errores (puede estar rota)"""
+    try:
+        conexion.close()
+    except Exception:
+        pass
+
+
+class PoolConexiones:
+    """Pool acotado de conexiones, seguro entre hilos
+
+    conectar: función que abre una conexión nueva (p. ej. psycopg2.connect).
+    maximo: conexiones abiertas como máximo (prestadas + libres).
+    max_vida: segundos que puede vivir una conexión antes de reemplazarla.
+    espera_maxima: segundos que se espera una conexión libre antes de fallar.
+    verificar_despues: segundos sin uso tras los cuales se verifica la conexión.
+    """
+
+    def __init__(self, conectar, maximo=10, max_vida=1800, espera_maxima=10, verificar_despues=30):
+        self._conectar = conectar
+        self.maximo = maximo
+        self.max_vida = max_vida
+        self.espera_maxima = espera_maxima
+        self.verificar_despues = verificar_despues
+
+        # Pila: se presta primero la conexión usada más recientemente
+        self._libres = queue.LifoQueue()
+        self._cupos = threading.BoundedSemaphore(maximo)
+        self._lock = threading.Lock()
+        self.metricas = {
+            'prestadas': 0,
+            'creadas': 0,
+            'reutilizadas': 0,
+            'descartadas': 0,
+            'fallas_verificacion': 0,
+            'esperas_agotadas': 0,
+            'espera_total_ms': 0.0,
+            'espera_maxima_ms': 0.0,
+            'en_uso': 0
+        }
+
+    def obtener(self):
+        """Prestar una conexión (esperando como máximo espera_maxima segundos)"""
+        inicio = time.perf_counter()
+        if not self._cupos.acquire(timeout=self.espera_maxima):
+            self._contar('esperas_agotadas')
+            raise Exception(f"No hay conexiones libres en el pool ({self.maximo} en uso)")
+        espera_ms = (time.perf_counter() - inicio) * 1000
+
+        try:
+            entrada = self._tomar_libre()
+            if entrada is None:
+                entrada = _Entrada(self._conectar())
+                self._contar('creadas')
+            else:
+                self._contar('reutilizadas')
+        except Exception:
+            self._cupos.release()
+            raise
+
+        with self._lock:
+            self.metricas['prestadas'] += 1
+            self.metricas['en_uso'] += 1
+            self.metricas['espera_total_ms'] += espera_ms
+            self.metricas['espera_maxima_ms'] = max(self.metricas['espera_maxima_ms'], espera_ms)
+        return ConexionPrestada(entrada, self._devolver)
+
+    def _tomar_libre(self):
+        """Sacar una conexión libre y sana, descartando las vencidas o rotas"""
+        while True:
+            try:
+                entrada = self._libres.get_nowait()
+            except queue.Empty:
+                return None
+
+            ahora = time.monotonic()
+            if ahora - entrada.creada > self.max_vida or getattr(entrada.conexion, 'closed', False):
+                self._descartar(entrada)
+                continue
+
+            if ahora - entrada.ultimo_uso > self.verificar_despues and not self._verificar(entrada.conexion):
+                self._contar('fallas_verificacion')
+                self._descartar(entrada)
+                continue
+
+            return entrada
+
+    @staticmethod
+    def _verificar(conexion):
+        """Comprobar que la conexión sigue respondiendo"""
+        try:
+            cursor = conexion.cursor()
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+            cursor.close()
+            conexion.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _devolver(self, entrada):
+        """Recibir una conexión prestada y dejarla libre (o descartarla)"""
+        try:
+            if getattr(entrada.conexion, 'closed', False):
+                self._descartar(entrada)
+                return
+            try:
+                _limpiar(entrada.conexion)
+            except Exception:
+                self._descartar(entrada)
+                return
+            entrada.ultimo_uso = time.monotonic()
+            if entrada.ultimo_uso - entrada.creada > self.max_vida:
+                self._descartar(entrada)
+            else:
+                self._libres.put(entrada)
+        finally:
+            with self._lock:
+                self.metricas['en_uso'] -= 1
+            self._cupos.release()
+
+    def _descartar(self, entrada):
+        _cerrar(entrada.conexion)
+        self._contar('descartadas')
+
+    def _contar(self, metrica):
+        with self._lock:
+            self.metricas[metrica] += 1
+
+    def cerrar(self):
+        """Cerrar todas las conexiones libres"""
+        while True:
+            try:
+                _cerrar(self._libres.get_nowait().conexion)
+            except queue.Empty:
+                return
+
+    def get_estado(self):
+        """Obtener el tamaño del pool y sus métricas"""
+        with self._lock:
+            estado = dict(self.metricas)
+        estado.update({
+            'tipo': 'pool',
+            'maximo': self.maximo,
+            'libres': self._libres.qsize(),
+            'max_vida': self.max_vida,
+            'espera_promedio_ms': round(estado['espera_total_ms'] / estado['prestadas'], 3) if estado['prestadas'] else 0.0
+        })
+        estado['espera_total_ms'] = round(estado['espera_total_ms'], 3)
+        estado['espera_maxima_ms'] = round(estado['espera_maxima_ms'], 3)
+        return estado
+
+
+class _CheckpointsWAL:
+    """Checkpoints periódicos del WAL al devolver conexiones SQLite
+
+    Quien lo usa tiene self._lock, self.metricas (con 'checkpoints' y
+    'paginas_checkpoint'), self.checkpoint_cada y self._ultimo_checkpoint.
+    """
+
+    def _checkpoint_si_toca(self, conexion):
+        """Volcar el WAL a la base si pasaron checkpoint_cada segundos"""
+        if self.checkpoint_cada is None:
+            return
+        with self._lock:
+            if time.monotonic() - self._ultimo_checkpoint < self.checkpoint_cada:
+                return
+            self._ultimo_checkpoint = time.monotonic()
+
+        try:
+            # (ocupado, páginas en el WAL, páginas volcadas); -1 si no está en WAL
+            _, paginas, volcadas = conexion.execute('PRAGMA wal_checkpoint(PASSIVE)').fetchone()
+        except sqlite3.Error as e:
+            print(f"Error en checkpoint del WAL: {e}")
+            return
+        if paginas != -1:
+            with self._lock:
+                self.metricas['checkpoints'] += 1
+                self.metricas['paginas_checkpoint'] += volcadas
+
+
+class PoolSQLite(_CheckpointsWAL, PoolConexiones):
+    """Pool acotado de conexiones SQLite compartidas entre hilos
+
+    Cada conexión se usa en un solo hilo a la vez (la que tiene prestada),
+    así que se abren con check_same_thread=False. Al devolver una conexión se
+    hace el checkpoint del WAL si pasaron checkpoint_cada segundos, en modo
+    PASSIVE (no espera a lectores ni escritores).
+    """
+
+    def __init__(self, ruta, maximo=10, max_vida=1800, espera_maxima=10, perfil=None, checkpoint_cada=60):
+        self.ruta = ruta
+        self.perfil = perfil_sqlite() if perfil is None else perfil
+        super().__init__(
+            lambda: conectar_sqlite(ruta, self.perfil, check_same_thread=False),
+            maximo=maximo, max_vida=max_vida, espera_maxima=espera_maxima,
+            # Una conexión SQLite no se cae por estar sin uso
+            verificar_despues=max_vida
+        )
+        self.checkpoint_cada = checkpoint_cada
+        self._ultimo_checkpoint = time.monotonic()
+        self.metricas.update({'checkpoints': 0, 'paginas_checkpoint': 0})
+
+    def _devolver(self, entrada):
+        try:
+            _limpiar(entrada.conexion)
+            self._checkpoint_si_toca(entrada.conexion)
+        except Exception:
+            pass  # Si la conexión está rota, el pool la descarta al devolverla
+        super()._devolver(entrada)
+
+    def get_estado(self):
+        """Obtener el tamaño del pool, sus métricas y el perfil SQLite"""
+        estado = super().get_estado()
+        estado.update({
+            'tipo': 'pool_sqlite',
+            'perfil': dict(self.perfil),
+            'checkpoint_cada': self.checkpoint_cada
+        })
+        return estado
+
+
+class ConexionesPorHilo(_CheckpointsWAL):
+    """Una conexión SQLite por hilo, reutilizada entre usos del mismo hilo
+
+    Sirve cuando los hilos viven mucho (scripts, benchmarks); el servidor de
+    Flask crea un hilo por solicitud y usa PoolSQLite.
+
+    Si el hilo pide otra conexión mientras la suya sigue prestada, recibe una
+    conexión aparte que se cierra al devolverla, para que el close() de una no
+    deshaga lo que la otra no ha confirmado.
+
+    perfil: PRAGMAs de cada conexión (ver perfil_sqlite()).
+    checkpoint_cada: segundos entre checkpoints del WAL (None para no hacerlos);
+    lo hace la primera conexión devuelta pasado ese tiempo, en modo PASSIVE
+    (no espera a lectores ni escritores).
+    """
+
+    def __init__(self, ruta, max_vida=1800, perfil=None, checkpoint_cada=60):
+        self.ruta = ruta
+        self.max_vida = max_vida
+        self.perfil = perfil_sqlite() if perfil is None else perfil
+        self.checkpoint_cada = checkpoint_cada
+        self._ultimo_checkpoint = time.monotonic()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.metricas = {'prestadas': 0, 'creadas': 0, 'reutilizadas': 0, 'temporales': 0, 'descartadas': 0,
+                         'checkpoints': 0, 'paginas_checkpoint': 0}
+
+    def _conectar(self):
+        return conectar_sqlite(self.ruta, self.perfil)
+
+    def obtener(self):
+        """Prestar la conexión del hilo actual"""
+        entrada = getattr(self._local, 'entrada', None)
+        if getattr(self._local, 'prestada', False):
+            self._contar('temporales')
+            self._contar('prestadas')
+            return ConexionPrestada(_Entrada(self._conectar()), self._cerrar_temporal)
+
+        if entrada is not None and time.monotonic() - entrada.creada > self.max_vida:
+            _cerrar(entrada.conexion)
+            self._contar('descartadas')
+            entrada = None
+
+        if entrada is None:
+            entrada = _Entrada(self._conectar())
+            self._local.entrada = entrada
+            self._contar('creadas')
+        else:
+            self._contar('reutilizadas')
+
+        self._local.prestada = True
+        self._contar('prestadas')
+        return ConexionPrestada(entrada, self._devolver)
+
+    def _devolver(self, entrada):
+        try:
+            _limpiar(entrada.conexion)
+            entrada.ultimo_uso = time.monotonic()
+            self._checkpoint_si_toca(entrada.conexion)
+        except Exception:
+            # Conexión inutilizable: el hilo abrirá otra la próxima vez
+            _cerrar(entrada.conexion)
+            self._contar('descartadas')
+            if getattr(self._local, 'entrada', None) is entrada:
+                self._local.entrada = None
+        finally:
+            self._local.prestada = False
+
+    def _cerrar_temporal(self, entrada):
+        _cerrar(entrada.conexion)
+
+    def _contar(self, metrica):
+        with self._lock:
+            self.metricas[metrica] += 1
+
+    def cerrar(self):
+        """Cerrar la conexión del hilo actual"""
+        entrada = getattr(self._local, 'entrada', None)
+        if entrada is not None:
+            _cerrar(entrada.conexion)
+            self._local.entrada = None
+
+    def get_estado(self):
+        """Obtener las métricas de reutilización"""
+        with self._lock:
+            estado = dict(self.metricas)
+        estado.update({
+            'tipo': 'por_hilo',
+            'max_vida': self.max_vida,
+            'perfil': dict(self.perfil),
+            'checkpoint_cada': self.checkpoint_cada
+        })
+        return estado
@@ -35,6 +35,28 @@ class Config:
     DATABASE_URL = os.environ.get('DATABASE_URL')
     DATABASE = 'farmacia.db'  # Solo para SQLite
     
+    # Pool de conexiones (PostgreSQL) y vida máxima de cada conexión (ambos motores)
+    DB_POOL_MAXIMO = int(os.environ.get('DB_POOL_MAXIMO', '10'))
+    DB_POOL_ESPERA = float(os.environ.get('DB_POOL_ESPERA', '10'))
+    DB_POOL_MAX_VIDA = float(os.environ.get('DB_POOL_MAX_VIDA', '1800'))
+    DB_POOL_VERIFICAR = float(os.environ.get('DB_POOL_VERIFICAR', '30'))
+    
+    # Perfil de las conexiones SQLite (ver conexiones_db.perfil_sqlite)
+    SQLITE_WAL = os.environ.get('SQLITE_WAL', 'true').lower() == 'true'
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))
+    SQLITE_CACHE_MB = int(os.environ.get('SQLITE_CACHE_MB', '16'))
+    SQLITE_MMAP_MB = int(os.environ.get('SQLITE_MMAP_MB', '256'))
+    SQLITE_CHECKPOINT_SEGUNDOS = float(os.environ.get('SQLITE_CHECKPOINT_SEGUNDOS', '60'))
+    
+    # Escritura agrupada: los registros que llegan casi a la vez se confirman
+    # en una sola transacción (espera en milisegundos y registros por lote)
+    ESCRITURA_AGRUPADA = os.environ.get('ESCRITURA_AGRUPADA', 'false').lower() == 'true'
+    ESCRITURA_AGRUPADA_ESPERA_MS = float(os.environ.get('ESCRITURA_AGRUPADA_ESPERA_MS', '5'))
+    ESCRITURA_AGRUPADA_LOTE = int(os.environ.get('ESCRITURA_AGRUPADA_LOTE', '100'))
+    
+    # Aplicar las migraciones pendientes del esquema al arrancar cada proceso
+    MIGRAR_AL_INICIAR = os.environ.get('MIGRAR_AL_INICIAR', 'true').lower() == 'true'
+    
     # Configuración de seguridad
     SESSION_COOKIE_SECURE = os.environ.get('SESSION_COOKIE_SECURE', 'false').lower() == 'true'
     SESSION_COOKIE_HTTPONLY = True
@@ -47,6 +69,10 @@ class Config:
     MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
     ALLOWED_EXTENSIONS = {'.xlsx', '.xls', '.csv'}
     
+    # Vigilante del archivo de inventario (recarga el catálogo en segundo plano)
+    VIGILANTE_CATALOGO = os.environ.get('VIGILANTE_CATALOGO', 'true').lower() == 'true'
+    VIGILANTE_INTERVALO = float(os.environ.get('VIGILANTE_INTERVALO', '2'))
+    
     # Configuración de backup
     BACKUP_DIR = 'backups'
     MAX_BACKUPS = 10  # Mantener solo los últimos 10 backups
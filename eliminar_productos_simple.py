@@ -7,22 +7,15 @@ import csv
 from datetime import datetime
 
 # Importar funciones de la aplicación principal
-from app import get_db_connection, DATABASE_TYPE
+from app import get_repositorio, get_repositorio_inventario
+from repositorio_registros import COLUMNAS_REGISTRO
 
 def backup_antes_de_eliminar():
     """Crear backup antes de eliminar productos obsoletos"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Obtener todos los registros
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('SELECT * FROM registros')
-        else:
-            cursor.execute('SELECT * FROM registros')
-        
-        registros = cursor.fetchall()
-        conn.close()
+        with get_repositorio() as repositorio:
+            registros = repositorio.todos()
         
         # Crear backup
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -30,9 +23,7 @@ def backup_antes_de_eliminar():
         
         with open(backup_file, 'w', newline='', encoding='utf-8') as file:
             writer = csv.writer(file)
-            writer.writerow(['id', 'medicamento', 'cantidad', 'precio', 'fecha', 'fecha_ingreso', 
-                           'observaciones', 'laboratorio', 'tipo_movimiento', 'fecha_vencimiento', 
-                           'lote', 'medico', 'junta_vigilancia', 'numero_inscripcion_clinica'])
+            writer.writerow(COLUMNAS_REGISTRO)
             writer.writerows(registros)
         
         print(f"Backup creado: {backup_file}")
@@ -45,29 +36,16 @@ def backup_antes_de_eliminar():
 def eliminar_productos_obsoletos():
     """Eliminar productos obsoletos del inventario"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Obtener productos con stock 0
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('SELECT COUNT(*) FROM inventario WHERE stock = 0')
-        else:
-            cursor.execute('SELECT COUNT(*) FROM inventario WHERE stock = 0')
-        
-        productos_obsoletos = cursor.fetchone()[0]
-        
-        if productos_obsoletos == 0:
-            conn.close()
-            return True, "No hay productos obsoletos para eliminar"
-        
-        # Eliminar productos con stock 0
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('DELETE FROM inventario WHERE stock = 0')
-        else:
-            cursor.execute('DELETE FROM inventario WHERE stock = 0')
-        
-        conn.commit()
-        conn.close()
+        with get_repositorio_inventario() as inventario:
+            # Obtener productos con stock 0
+            productos_obsoletos = inventario.contar_sin_stock()
+            
+            if productos_obsoletos == 0:
+                return True, "No hay productos obsoletos para eliminar"
+            
+            # Eliminar productos con stock 0
+            inventario.eliminar_sin_stock()
+            inventario.commit()
         
         return True, f"Se eliminaron {productos_obsoletos} productos obsoletos exitosamente"
         
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Escritura agrupada (group commit) de registros.
+
+Con mucho tráfico cada guardar_registro espera su propio commit: un fsync en
+SQLite, un viaje de red en PostgreSQL. En este modo las solicitudes dejan su
+registro en una cola y esperan; un solo hilo escritor toma lo que llegue
+durante unos milisegundos (o hasta completar un lote), lo inserta en una
+transacción y confirma una vez. Cada solicitud recibe su id solo después de
+ese commit, así que una respuesta exitosa sigue significando que el registro
+quedó guardado.
+
+Si el lote falla (por ejemplo un registro inválido), sus registros se vuelven
+a insertar uno por uno y solo el que falla recibe el error.
+
+Si una solicitud se cansa de esperar, su registro se retira de la cola y
+recibe un error: no se guardará, y reintentarla no duplica la venta. Si el
+escritor ya lo había tomado, el commit está en curso y la solicitud espera a
+que termine en vez de responder sin saber si quedó guardado.
+
+Los histogramas de tamaño de lote y de espera (desde que la solicitud deja el
+registro hasta que se confirma) se exponen con get_estado().
+"""
+import queue
+import threading
+import time
+
+
+class Histograma:
+    """Conteo de observaciones por límite superior, más total y suma"""
+
+    def __init__(self, limites):
+        self.limites = tuple(limites)
+        self.conteos = [0] * (len(self.limites) + 1)
+        self.total = 0
+        self.suma = 0.0
+        self.maximo = 0.0
+
+    def observar(self, valor):
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                break
+        else:
+            i = len(self.limites)
+        self.conteos[i] += 1
+        self.total += 1
+        self.suma += valor
+        self.maximo = max(self.maximo, valor)
+
+    def resumen(self):
+        etiquetas = [f'<={limite}' for limite in self.limites] + [f'>{self.limites[-1]}']
+        return {
+            'cubetas': dict(zip(etiquetas, self.conteos)),
+            'total': self.total,
+            'promedio': round(self.suma / self.total, 3) if self.total else 0.0,
+            'maximo': round(self.maximo, 3)
+        }
+
+
+class _Pendiente:
+    """Registro en espera de commit y el resultado que recibirá quien lo dejó"""
+
+    __slots__ = ('datos', 'encolado', 'listo', 'id', 'error', 'tomado', 'cancelado')
+
+    def __init__(self, datos):
+        self.datos = datos
+        self.encolado = time.perf_counter()
+        self.listo = threading.Event()
+        self.id = None
+        self.error = None
+        # Ambos se cambian con el lock del escritor
+        self.tomado = False
+        self.cancelado = False
+
+
+class EscritorAgrupado:
+    """Hilo que inserta en un solo commit los registros llegados casi a la vez
+
+    obtener_repositorio: función que devuelve un RepositorioRegistros (con 'with').
+    espera_maxima: segundos que se esperan más registros tras el primero.
+    lote_maximo: registros por transacción como máximo.
+    """
+
+    def __init__(self, obtener_repositorio, espera_maxima=0.005, lote_maximo=100):
+        self._obtener_repositorio = obtener_repositorio
+        self.espera_maxima = espera_maxima
+        self.lote_maximo = lote_maximo
+        self._cola = queue.Queue()
+        self._lock = threading.Lock()
+        self._hilo = None
+        self.tamano_lote = Histograma((1, 2, 5, 10, 20, 50, 100))
+        self.espera_ms = Histograma((1, 2, 5, 10, 20, 50, 100, 250, 1000))
+        self.metricas = {'lotes': 0, 'registros': 0, 'lotes_fallidos': 0, 'errores': 0, 'cancelados': 0}
+
+    def iniciar(self):
+        """Iniciar el hilo escritor (una sola vez)"""
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._escribir, name='escritor-registros', daemon=True)
+                self._hilo.start()
+        return self
+
+    def insertar(self, datos, timeout=30):
+        """Dejar un registro en la cola y esperar su commit; devuelve su id
+
+        Si en timeout segundos el escritor no lo tomó, se retira de la cola y
+        se lanza una excepción: el registro no se guardó.
+        """
+        pendiente = _Pendiente(datos)
+        self._cola.put(pendiente)
+        if not pendiente.listo.wait(timeout):
+            with self._lock:
+                if not pendiente.tomado:
+                    pendiente.cancelado = True
+                    self.metricas['cancelados'] += 1
+            if pendiente.cancelado:
+                raise Exception(f"El registro no se guardó: el escritor no lo tomó en {timeout} s")
+            # Ya está en una transacción: esperar a saber si se confirmó
+            pendiente.listo.wait()
+        if pendiente.error is not None:
+            raise pendiente.error
+        return pendiente.id
+
+    def _escribir(self):
+        while True:
+            lote = []
+            try:
+                lote.append(self._cola.get())
+                limite = time.perf_counter() + self.espera_maxima
+                while len(lote) < self.lote_maximo:
+                    restante = limite - time.perf_counter()
+                    if restante <= 0:
+                        break
+                    try:
+                        lote.append(self._cola.get(timeout=restante))
+                    except queue.Empty:
+                        break
+
+                with self._lock:
+                    lote = [pendiente for pendiente in lote if not pendiente.cancelado]
+                    for pendiente in lote:
+                        pendiente.tomado = True
+                if lote:
+                    self._confirmar(lote)
+            except Exception as e:
+                # El hilo no debe morir: quien espera estos registros recibe el error
+                print(f"Error en el escritor de registros: {e}")
+                for pendiente in lote:
+                    if not pendiente.listo.is_set():
+                        pendiente.error = e
+                        pendiente.listo.set()
+
+    def _confirmar(self, lote):
+        """Insertar el lote en una transacción; si falla, cada registro por separado"""
+        try:
+            with self._obtener_repositorio() as registros:
+                ids = registros.insertar_varios([pendiente.datos for pendiente in lote])
+                registros.commit()
+            for pendiente, registro_id in zip(lote, ids):
+                pendiente.id = registro_id
+        except Exception as e:
+            print(f"Error en lote de {len(lote)} registros, se guardan por separado: {e}")
+            self._contar('lotes_fallidos')
+            for pendiente in lote:
+                try:
+                    with self._obtener_repositorio() as registros:
+                        pendiente.id = registros.insertar(pendiente.datos)
+                        registros.commit()
+                except Exception as error:
+                    pendiente.error = error
+                    self._contar('errores')
+
+        ahora = time.perf_counter()
+        with self._lock:
+            self.metricas['lotes'] += 1
+            self.metricas['registros'] += len(lote)
+            self.tamano_lote.observar(len(lote))
+            for pendiente in lote:
+                self.espera_ms.observar((ahora - pendiente.encolado) * 1000)
+        for pendiente in lote:
+            pendiente.listo.set()
+
+    def _contar(self, metrica):
+        with self._lock:
+            self.metricas[metrica] += 1
+
+    def get_estado(self):
+        """Obtener la configuración, las métricas y los histogramas"""
+        with self._lock:
+            estado = dict(self.metricas)
+            estado.update({
+                'activo': self._hilo is not None and self._hilo.is_alive(),
+                'en_cola': self._cola.qsize(),
+                'espera_maxima_ms': self.espera_maxima * 1000,
+                'lote_maximo': self.lote_maximo,
+                'tamano_lote': self.tamano_lote.resumen(),
+                'espera_ms': self.espera_ms.resumen()
+            })
+        return estado
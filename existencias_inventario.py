@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Existencias (cantidad) y precio de venta de cada producto.
+
+El CSV de inventario no trae precio ni stock; el reporte 'inventarioraw.xlsx'
+del mismo sistema sí (columnas 'Cantidad' y 'Precio de Vta'). El reporte se lee
+una sola vez por versión del archivo y se combina con el catálogo por código.
+
+Con NumPy la combinación es vectorizada (búsqueda binaria de todos los códigos
+en los códigos ordenados del reporte); sin NumPy se usa un diccionario.
+"""
+import os
+
+from openpyxl import load_workbook
+
+# NumPy es opcional: sin él la combinación se hace con un diccionario
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Reporte de existencias exportado del sistema
+XLSX_PATH = 'inventarioraw.xlsx'
+
+# Encabezados de las columnas que se usan (sin espacios ni tabulaciones)
+COLUMNA_CODIGO = 'Codigo'
+COLUMNA_CANTIDAD = 'Cantidad'
+COLUMNA_PRECIO = 'Precio de Vta'
+
+# Última lectura del reporte: {'firma': ..., 'existencias': ...}
+_CACHE = {'firma': None, 'existencias': None}
+
+
+def _numero(valor):
+    """Convertir una celda a float (0.0 si está vacía o no es numérica)"""
+    if isinstance(valor, (int, float)):
+        return float(valor)
+    try:
+        return float(str(valor).strip())
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def leer_existencias(ruta=XLSX_PATH):
+    """Leer código, cantidad y precio de venta de cada producto del reporte
+
+    Devuelve {'codigos': [...], 'stock': [...], 'precio': [...]} ordenado por
+    código (arreglos NumPy si está disponible) o None si el reporte no tiene
+    las columnas esperadas.
+    """
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.worksheets[0].iter_rows(values_only=True)
+
+        columnas = None
+        for fila in filas:
+            encabezados = [str(celda).strip() if celda is not None else '' for celda in fila]
+            if COLUMNA_CODIGO in encabezados:
+                columnas = encabezados
+                break
+
+        if columnas is None or COLUMNA_CANTIDAD not in columnas or COLUMNA_PRECIO not in columnas:
+            print(f"Reporte de existencias sin columnas '{COLUMNA_CANTIDAD}' y '{COLUMNA_PRECIO}': {ruta}")
+            return None
+
+        i_codigo = columnas.index(COLUMNA_CODIGO)
+        i_cantidad = columnas.index(COLUMNA_CANTIDAD)
+        i_precio = columnas.index(COLUMNA_PRECIO)
+
+        registros = {}
+        for fila in filas:
+            if len(fila) <= max(i_codigo, i_cantidad, i_precio) or fila[i_codigo] is None:
+                continue
+            codigo = str(fila[i_codigo]).strip()
+            # Las filas de categoría traen código y nombre en la misma celda
+            if not codigo.isdigit():
+                continue
+            registros[codigo] = (_numero(fila[i_cantidad]), _numero(fila[i_precio]))
+    finally:
+        libro.close()
+
+    codigos = sorted(registros)
+    stock = [registros[codigo][0] for codigo in codigos]
+    precio = [registros[codigo][1] for codigo in codigos]
+    if np is not None:
+        return {'codigos': np.array(codigos), 'stock': np.array(stock, dtype=np.float64),
+                'precio': np.array(precio, dtype=np.float64)}
+    return {'codigos': codigos, 'stock': stock, 'precio': precio}
+
+
+def get_existencias(ruta=XLSX_PATH, firma=None):
+    """Obtener las existencias del reporte, leyéndolo solo si cambió su firma"""
+    if firma is not None and firma == _CACHE['firma']:
+        return _CACHE['existencias']
+    if not os.path.exists(ruta):
+        return None
+
+    try:
+        existencias = leer_existencias(ruta)
+    except Exception as e:
+        print(f"Error al leer el reporte de existencias: {e}")
+        existencias = None
+
+    _CACHE.update({'firma': firma, 'existencias': existencias})
+    return existencias
+
+
+def combinar_existencias(productos, existencias):
+    """Asignar a cada producto la cantidad y el precio del reporte (por código)
+
+    Los productos que no aparecen en el reporte quedan con stock y precio 0.
+    Modifica los diccionarios recibidos y devuelve cuántos se encontraron.
+    """
+    if np is None:
+        por_codigo = dict(zip(existencias['codigos'], zip(existencias['stock'], existencias['precio'])))
+        encontrados = 0
+        for producto in productos:
+            stock, precio = por_codigo.get(producto['codigo'], (0.0, 0.0))
+            encontrados += producto['codigo'] in por_codigo
+            producto['stock'] = stock
+            producto['precio'] = precio
+        return encontrados
+
+    codigos = existencias['codigos']
+    stock = np.zeros(len(productos), dtype=np.float64)
+    precio = np.zeros(len(productos), dtype=np.float64)
+    encontrados = np.zeros(len(productos), dtype=bool)
+    if len(codigos) and productos:
+        buscados = np.array([producto['codigo'] for producto in productos])
+        posiciones = np.minimum(np.searchsorted(codigos, buscados), len(codigos) - 1)
+        encontrados = codigos[posiciones] == buscados
+        stock[encontrados] = existencias['stock'][posiciones[encontrados]]
+        precio[encontrados] = existencias['precio'][posiciones[encontrados]]
+
+    for producto, cantidad, valor in zip(productos, stock.tolist(), precio.tolist()):
+        producto['stock'] = cantidad
+        producto['precio'] = valor
+    return int(np.count_nonzero(encontrados))
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+"""
+Índices en memoria construidos sobre el catálogo de inventario.
+
+Se construyen una sola vez por cada carga del catálogo (ver inventario_simple)
+para que las consultas de la aplicación no recorran todo el inventario.
+"""
+import unicodedata
+from bisect import bisect_left
+from heapq import merge
+
+
+def normalizar_texto(texto):
+    """Normalizar un texto para búsquedas
+
+    Minúsculas (casefold), sin diacríticos ('acetaminofén' -> 'acetaminofen',
+    'ñ' -> 'n') y con los espacios colapsados. El sistema exporta la Ñ como
+    '¥' ('U¥AS'), así que también se trata como 'n'.
+    """
+    texto = (texto or '').replace('¥', 'Ñ').casefold()
+    descompuesto = unicodedata.normalize('NFKD', texto)
+    sin_diacriticos = ''.join(c for c in descompuesto if not unicodedata.combining(c))
+    return ' '.join(sin_diacriticos.split())
+
+
+def construir_indice_laboratorios(productos, claves_laboratorio=None):
+    """Construir el índice laboratorio normalizado -> productos
+
+    claves_laboratorio: laboratorio ya normalizado de cada producto (opcional).
+
+    Devuelve un diccionario con:
+    - 'por_clave': clave normalizada -> tupla de (posición, (nombre, modelo, precio, stock))
+    - 'claves': lista ordenada de claves para búsquedas por prefijo con bisect
+    """
+    por_clave = {}
+    for posicion, producto in enumerate(productos):
+        if claves_laboratorio is None:
+            clave = normalizar_texto(producto['laboratorio'])
+        else:
+            clave = claves_laboratorio[posicion]
+        por_clave.setdefault(clave, []).append((
+            posicion,
+            (producto['nombre'], producto['modelo'], producto['precio'], producto['stock'])
+        ))
+
+    return {
+        'por_clave': {clave: tuple(entradas) for clave, entradas in por_clave.items()},
+        'claves': sorted(por_clave)
+    }
+
+
+def buscar_por_laboratorio(indice, laboratorio):
+    """Obtener los productos cuyo laboratorio coincide o empieza con el buscado
+
+    El costo es proporcional a los resultados: las claves que comparten el
+    prefijo son contiguas en la lista ordenada, y los productos se devuelven
+    en el mismo orden que tienen en el catálogo.
+    """
+    buscar = normalizar_texto(laboratorio)
+    claves = indice['claves']
+    por_clave = indice['por_clave']
+
+    coincidencias = []
+    i = bisect_left(claves, buscar)
+    while i < len(claves) and claves[i].startswith(buscar):
+        coincidencias.append(por_clave[claves[i]])
+        i += 1
+
+    if not coincidencias:
+        return []
+    if len(coincidencias) == 1:
+        return [producto for _, producto in coincidencias[0]]
+
+    # Varias claves con el mismo prefijo: mezclar respetando el orden del catálogo
+    return [producto for _, producto in merge(*coincidencias)]
+
+
+def trigramas(texto):
+    """Obtener el conjunto de trigramas (subcadenas de 3 caracteres) de un texto"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def construir_indice_trigramas(textos):
+    """Construir el índice invertido trigrama -> conjunto de posiciones de los textos"""
+    indice = {}
+    for posicion, texto in enumerate(textos):
+        for trigrama in trigramas(texto):
+            indice.setdefault(trigrama, []).append(posicion)
+
+    return {trigrama: frozenset(posiciones) for trigrama, posiciones in indice.items()}
+
+
+def buscar_subcadena(indice, textos, termino):
+    """Obtener las posiciones (en orden) de los textos que contienen el término
+
+    Con términos de 3 o más caracteres se intersectan las listas de posiciones
+    de sus trigramas, empezando por la más corta, y solo los candidatos que
+    quedan se verifican con una comparación de subcadena. Así el resultado es
+    idéntico al de recorrer todos los textos.
+    """
+    if len(termino) < 3:
+        return [i for i, texto in enumerate(textos) if termino in texto]
+
+    listas = []
+    for trigrama in trigramas(termino):
+        posiciones = indice.get(trigrama)
+        if not posiciones:
+            return []
+        listas.append(posiciones)
+    listas.sort(key=len)
+
+    # La intersección de conjuntos recorre siempre el menor de los dos
+    candidatos = listas[0]
+    for posiciones in listas[1:]:
+        candidatos = candidatos & posiciones
+        if not candidatos:
+            return []
+
+    return [i for i in sorted(candidatos) if termino in textos[i]]
+
+
+def construir_indice_codigos(productos):
+    """Construir el índice de productos ordenados por código
+
+    Devuelve un diccionario con:
+    - 'codigos': códigos ordenados
+    - 'posiciones': posición en el catálogo de cada código de 'codigos'
+    Los productos de una categoría (mismo prefijo de código) quedan contiguos.
+    """
+    orden = sorted(range(len(productos)), key=lambda i: productos[i]['codigo'])
+    return {
+        'codigos': [productos[i]['codigo'] for i in orden],
+        'posiciones': orden
+    }
+
+
+def rango_por_prefijo(indice, prefijo):
+    """Obtener el rango [inicio, fin) de 'codigos' que empiezan con el prefijo"""
+    codigos = indice['codigos']
+    inicio = bisect_left(codigos, prefijo)
+    # Los códigos son numéricos: '\uffff' es mayor que cualquier continuación
+    fin = bisect_left(codigos, prefijo + '\uffff', inicio)
+    return inicio, fin
+
+
+def construir_arbol_categorias(categorias, indice_codigos):
+    """Construir el árbol de categorías a partir de las filas de categoría
+
+    Cada código de categoría tiene 2 dígitos por nivel (010101 -> 01, 0101,
+    010101) y su nombre la ruta correspondiente separada por '/'. Devuelve
+    un diccionario con:
+    - 'por_codigo': código -> nodo (codigo, nombre, ruta, nivel,
+      total_productos y códigos de subcategorias)
+    - 'raices': códigos de las categorías de primer nivel
+    """
+    por_codigo = {}
+    raices = []
+
+    for codigo, nombre in categorias:
+        partes = [parte.strip() for parte in nombre.split('/')]
+        prefijos = [codigo[:fin] for fin in range(2, len(codigo), 2)] + [codigo]
+
+        padre = None
+        for nivel, prefijo in enumerate(prefijos):
+            nodo = por_codigo.get(prefijo)
+            if nodo is None:
+                es_hoja = prefijo == codigo
+                inicio, fin = rango_por_prefijo(indice_codigos, prefijo)
+                nodo = {
+                    'codigo': prefijo,
+                    'nombre': partes[-1] if es_hoja else partes[min(nivel, len(partes) - 1)],
+                    'ruta': nombre if es_hoja else '/'.join(partes[:nivel + 1]),
+                    'nivel': nivel + 1,
+                    'total_productos': fin - inicio,
+                    'subcategorias': []
+                }
+                por_codigo[prefijo] = nodo
+                if padre is None:
+                    raices.append(prefijo)
+                else:
+                    por_codigo[padre]['subcategorias'].append(prefijo)
+            padre = prefijo
+
+    for nodo in por_codigo.values():
+        nodo['subcategorias'].sort()
+
+    return {'por_codigo': por_codigo, 'raices': sorted(raices)}
+
+
+def construir_indice_prefijos(textos, k_max=20, umbral=200):
+    """Construir el índice de autocompletado por prefijo (typeahead)
+
+    Se indexa cada texto a partir de cada una de sus palabras: 'acido folico
+    5mg' queda como 'acido folico 5mg', 'folico 5mg' y '5mg', así un prefijo
+    encuentra coincidencias al inicio del nombre o de cualquier palabra.
+
+    Las claves se guardan ordenadas (equivalente a recorrer un trie en orden):
+    los prefijos con más de 'umbral' coincidencias son los nodos con muchos
+    descendientes, y para ellos se precalculan los k_max mejores resultados;
+    el resto se resuelve con bisect sobre un rango pequeño. La relevancia es
+    la posición de la palabra donde empieza la coincidencia (0 = inicio del
+    nombre), luego el largo del nombre y luego el nombre.
+
+    Devuelve un diccionario con:
+    - 'claves': claves ordenadas
+    - 'rangos': relevancia (0 = mejor) de la entrada de cada clave
+    - 'posiciones': posición del texto de cada relevancia
+    - 'frecuentes': prefijo -> posiciones de los mejores resultados
+    - 'k_max': máximo de resultados por consulta
+    """
+    entradas = []
+    for posicion, texto in enumerate(textos):
+        palabras = texto.split()
+        for inicio in range(len(palabras)):
+            entradas.append((' '.join(palabras[inicio:]), (inicio, len(texto), texto, posicion)))
+
+    por_relevancia = sorted(range(len(entradas)), key=lambda i: entradas[i][1])
+    relevancia = [0] * len(entradas)
+    for rango, i in enumerate(por_relevancia):
+        relevancia[i] = rango
+
+    por_clave = sorted(range(len(entradas)), key=lambda i: entradas[i][0])
+    indice = {
+        'claves': [entradas[i][0] for i in por_clave],
+        'rangos': [relevancia[i] for i in por_clave],
+        'posiciones': [entradas[i][1][3] for i in por_relevancia],
+        'frecuentes': {},
+        'k_max': k_max
+    }
+
+    # Recorrer los prefijos con muchas coincidencias dividiendo su rango de
+    # claves por el siguiente carácter (los nodos "pesados" del trie)
+    claves = indice['claves']
+    pendientes = [('', 0, len(claves))]
+    while pendientes:
+        prefijo, inicio, fin = pendientes.pop()
+        if fin - inicio <= umbral:
+            continue
+        if prefijo:
+            indice['frecuentes'][prefijo] = _mejores_del_rango(indice, inicio, fin, k_max)
+
+        n = len(prefijo)
+        i = inicio
+        while i < fin and len(claves[i]) == n:
+            i += 1
+        while i < fin:
+            hijo = prefijo + claves[i][n]
+            j = bisect_left(claves, hijo + '\uffff', i, fin)
+            pendientes.append((hijo, i, j))
+            i = j
+
+    return indice
+
+
+def _mejores_del_rango(indice, inicio, fin, k):
+    """Obtener las k posiciones más relevantes (sin repetir) de un rango de claves"""
+    posiciones = indice['posiciones']
+    resultado = []
+    vistos = set()
+    for rango in sorted(indice['rangos'][inicio:fin]):
+        posicion = posiciones[rango]
+        if posicion not in vistos:
+            vistos.add(posicion)
+            resultado.append(posicion)
+            if len(resultado) == k:
+                break
+    return resultado
+
+
+def buscar_prefijo(indice, prefijo, k=10):
+    """Obtener las k posiciones más relevantes de los textos con el prefijo
+
+    Los prefijos frecuentes (por ejemplo de una sola letra) se responden con
+    los resultados precalculados; los demás recorren solo su rango de claves.
+    """
+    if not prefijo or k <= 0:
+        return []
+
+    k = min(k, indice['k_max'])
+    mejores = indice['frecuentes'].get(prefijo)
+    if mejores is not None:
+        return mejores[:k]
+
+    claves = indice['claves']
+    inicio = bisect_left(claves, prefijo)
+    fin = bisect_left(claves, prefijo + '\uffff', inicio)
+    return _mejores_del_rango(indice, inicio, fin, k)
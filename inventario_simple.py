@@ -2,20 +2,211 @@
 """
 Módulo simple para manejar inventario en memoria
 """
+import gzip
+import json
 import os
+import threading
+from datetime import datetime
+from itertools import islice
 
-# Inventario en memoria (se carga al iniciar)
-INVENTARIO_MEMORIA = []
+from indices_catalogo import (
+    normalizar_texto, construir_indice_laboratorios, buscar_por_laboratorio,
+    construir_indice_trigramas, buscar_subcadena,
+    construir_indice_codigos, rango_por_prefijo, construir_arbol_categorias,
+    construir_indice_prefijos, buscar_prefijo
+)
+
+from existencias_inventario import XLSX_PATH, get_existencias, combinar_existencias
+from cambios_catalogo import calcular_huellas, version_catalogo, registrar_version, cambios_desde
+from parser_inventario import CategoriaInventario, leer_registros
+from snapshot_catalogo import cargar_snapshot
+
+# El catálogo en columnas requiere NumPy; sin él se usan las listas de diccionarios
+try:
+    from catalogo_columnar import CatalogoColumnar, tamano_productos_dict
+except ImportError:
+    CatalogoColumnar = None
+    tamano_productos_dict = None
+
+# Archivo de inventario exportado del sistema
+CSV_PATH = 'INVENTARIO PARA TRABAJO.csv'
+
+# Longitud de los códigos de producto del sistema
+LONGITUD_CODIGO = 9
+
+# Máximo de resultados del autocompletado (/api/typeahead)
+TYPEAHEAD_K_MAX = 20
+
+# Campos de cada producto en el catálogo compacto (/api/catalogo)
+CAMPOS_CATALOGO = ('codigo', 'nombre', 'modelo', 'laboratorio', 'precio', 'stock')
+
+class CatalogoInventario:
+    """Catálogo de inventario cargado junto con todos sus índices
+
+    Se construye completo antes de publicarse y no se modifica después. Los
+    lectores toman una sola referencia al catálogo (get_catalogo()) y hacen
+    toda la consulta sobre ella, aunque mientras tanto se publique otro.
+    """
+
+    def __init__(self, productos=(), categorias=(), indice_trigramas=None,
+                 firma=None, generacion=0, origen=None, precalculados=None):
+        self.productos = list(productos)
+        self.categorias = list(categorias)
+        # Claves, huellas e índice de prefijos ya calculados (del snapshot)
+        precalculados = precalculados or {}
+
+        # Estado de la carga: firma de los archivos (ver firma_fuentes()),
+        # número de generación, fecha y origen ('snapshot' o 'csv')
+        self.firma = firma
+        self.generacion = generacion
+        self.ultima_carga = datetime.now().isoformat() if generacion else None
+        self.origen = origen
+
+        # Claves de búsqueda normalizadas (sin mayúsculas, acentos ni espacios
+        # repetidos), calculadas una sola vez por carga
+        self.nombres_busqueda = precalculados.get('nombres_busqueda')
+        if self.nombres_busqueda is None:
+            self.nombres_busqueda = [normalizar_texto(producto['nombre']) for producto in self.productos]
+        self.laboratorios_busqueda = precalculados.get('laboratorios_busqueda')
+        if self.laboratorios_busqueda is None:
+            # Cada laboratorio se normaliza una sola vez
+            claves_laboratorio = {
+                laboratorio: normalizar_texto(laboratorio)
+                for laboratorio in {producto['laboratorio'] for producto in self.productos}
+            }
+            self.laboratorios_busqueda = [claves_laboratorio[producto['laboratorio']] for producto in self.productos]
+
+        # Catálogo en columnas (None si NumPy no está disponible); la memoria
+        # ocupada se mide solo cuando se consulta
+        if CatalogoColumnar is not None:
+            self.columnar = CatalogoColumnar(self.productos, self.nombres_busqueda)
+        else:
+            self.columnar = None
+        self.memoria = {}
+
+        # Lista de laboratorios para los desplegables e índice por laboratorio
+        if self.columnar is not None:
+            laboratorios = self.columnar.get_laboratorios()
+        else:
+            laboratorios = {
+                producto['laboratorio'].strip() for producto in self.productos
+                if producto['laboratorio'] and producto['laboratorio'] != 'Sin especificar'
+            }
+        self.laboratorios = sorted(laboratorios)
+        self.indice_laboratorios = construir_indice_laboratorios(self.productos, self.laboratorios_busqueda)
+
+        # Producto por código (para lectura con escáner)
+        self.productos_por_codigo = {producto['codigo']: producto for producto in self.productos}
+
+        # Huella de cada producto y versión del catálogo (según su contenido)
+        self.huellas = precalculados.get('huellas')
+        self.version = precalculados.get('version')
+        if self.huellas is None or self.version is None:
+            self.huellas = calcular_huellas(self.productos)
+            self.version = version_catalogo(self.huellas) if self.productos else None
+
+        # Catálogo compacto comprimido con gzip; se construye al pedirlo
+        self.comprimido = None
+
+        # Productos ordenados por código y árbol de categorías
+        self.indice_codigos = construir_indice_codigos(self.productos)
+        self.arbol_categorias = construir_arbol_categorias(self.categorias, self.indice_codigos)
+
+        # Índice de trigramas de los nombres normalizados para la búsqueda por subcadena
+        if indice_trigramas is None:
+            indice_trigramas = construir_indice_trigramas(self.nombres_busqueda)
+        self.indice_trigramas = indice_trigramas
+
+        # Índice por prefijo de nombre y de palabras para el autocompletado
+        self.indice_prefijos = precalculados.get('indice_prefijos')
+        if self.indice_prefijos is None or self.indice_prefijos['k_max'] != TYPEAHEAD_K_MAX:
+            self.indice_prefijos = construir_indice_prefijos(self.nombres_busqueda, k_max=TYPEAHEAD_K_MAX)
+
+# Catálogo publicado: se reemplaza completo en cada carga (una sola asignación)
+CATALOGO = CatalogoInventario()
+
+# Solo una carga a la vez; las demás solicitudes esperan y usan su resultado
+_CARGA_LOCK = threading.Lock()
+
+# Firma del último archivo que no pasó la validación (no se reintenta)
+_FIRMA_RECHAZADA = None
+
+# Solo una compresión del catálogo a la vez
+_COMPRIMIDO_LOCK = threading.Lock()
+
+def _firma_archivo(ruta):
+    """Obtener la firma (mtime, tamaño, inodo) de un archivo o None si no existe"""
+    try:
+        st = os.stat(ruta)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+def firma_fuentes():
+    """Obtener la firma del CSV y del reporte de existencias, o None si no hay CSV"""
+    firma_csv = _firma_archivo(CSV_PATH)
+    if firma_csv is None:
+        return None
+    return (firma_csv, _firma_archivo(XLSX_PATH))
+
+def asegurar_inventario():
+    """Cargar el inventario solo si el CSV o el reporte de existencias cambiaron desde la última carga"""
+    firma = firma_fuentes()
+    if firma is None:
+        # Sin archivo: se sigue sirviendo lo último que se cargó
+        return bool(CATALOGO.productos)
+    
+    if firma == CATALOGO.firma:
+        return True
+    
+    if firma == _FIRMA_RECHAZADA:
+        # El archivo actual no es válido: se sigue sirviendo el catálogo anterior
+        return bool(CATALOGO.productos)
+    
+    with _CARGA_LOCK:
+        # Otra solicitud pudo haber recargado mientras se esperaba el lock
+        if firma_fuentes() == CATALOGO.firma:
+            return True
+        return _recargar_inventario()
+
+def firma_rechazada():
+    """Obtener la firma del último archivo rechazado por la validación"""
+    return _FIRMA_RECHAZADA
+
+def get_catalogo():
+    """Obtener el catálogo vigente (recargándolo si el archivo cambió)"""
+    asegurar_inventario()
+    return CATALOGO
+
+def get_estado_cache():
+    """Obtener el estado de la caché del catálogo"""
+    catalogo = CATALOGO
+    if not catalogo.memoria and catalogo.columnar is not None:
+        catalogo.memoria.update({
+            'dicts_bytes': tamano_productos_dict(catalogo.productos),
+            'columnar_bytes': catalogo.columnar.nbytes()
+        })
+    
+    return {
+        'generacion': catalogo.generacion,
+        'version': catalogo.version,
+        'ultima_carga': catalogo.ultima_carga,
+        'origen': catalogo.origen,
+        'total_productos': len(catalogo.productos),
+        'archivo': CSV_PATH,
+        'firma': [list(f) if f else None for f in catalogo.firma] if catalogo.firma else None,
+        'memoria': catalogo.memoria
+    }
 
 def analizar_formato_linea():
     """Analizar el formato exacto de las líneas del archivo"""
     try:
-        csv_path = 'INVENTARIO PARA TRABAJO.csv'
+        csv_path = CSV_PATH
         if not os.path.exists(csv_path):
             return {"error": "Archivo no encontrado"}
         
         with open(csv_path, 'r', encoding='utf-8-sig') as file:
-            lines = file.readlines()
+            lines = list(islice(file, 10))  # Solo las primeras 10 líneas
         
         header_found = False
         analisis = {
@@ -23,7 +214,7 @@ def analizar_formato_linea():
             'formato_detectado': None
         }
         
-        for i, line in enumerate(lines[:10]):  # Solo las primeras 10 líneas
+        for i, line in enumerate(lines):
             line_original = line.strip()
             
             if 'Codigo' in line_original and 'Nombre' in line_original:
@@ -63,179 +254,297 @@ def analizar_formato_linea():
     except Exception as e:
         return {"error": str(e)}
 
-def cargar_inventario():
-    """Cargar inventario a memoria"""
-    global INVENTARIO_MEMORIA
-    INVENTARIO_MEMORIA = []
+def _parsear_csv(csv_path):
+    """Parsear el CSV de inventario y devolver (productos, categorías)"""
+    productos = []
+    categorias = []
+    for registro in leer_registros(csv_path):
+        if isinstance(registro, CategoriaInventario):
+            categorias.append((registro.codigo, registro.nombre))
+            continue
+        
+        producto = {
+            'codigo': registro.codigo,
+            'nombre': registro.nombre,
+            'modelo': registro.modelo,
+            'laboratorio': registro.laboratorio,
+            # Valores por defecto si no hay reporte de existencias
+            'precio': 0.0,
+            'stock': 1.0
+        }
+        productos.append(producto)
+        
+        # Debug: mostrar los primeros productos
+        if len(productos) <= 3:
+            print(f"Producto cargado: {producto['nombre'][:30]}... -> Lab: {producto['laboratorio']}")
     
+    return productos, categorias
+
+def cargar_inventario(usar_snapshot=True):
+    """Cargar inventario a memoria
+
+    Si existe un snapshot binario vigente para el CSV actual se usa directamente;
+    si no, se parsea el CSV y se construyen los índices.
+    """
+    with _CARGA_LOCK:
+        return _recargar_inventario(usar_snapshot)
+
+def _recargar_inventario(usar_snapshot=True):
+    """Construir un catálogo nuevo y publicarlo (llamar con _CARGA_LOCK tomado)"""
+    global CATALOGO, _FIRMA_RECHAZADA
+    
+    firma = None
     try:
-        csv_path = 'INVENTARIO PARA TRABAJO.csv'
+        csv_path = CSV_PATH
         if not os.path.exists(csv_path):
             return False
         
-        with open(csv_path, 'r', encoding='utf-8-sig') as file:
-            lines = file.readlines()
+        # Tomar la firma antes de leer: si el archivo cambia durante la
+        # lectura, la siguiente consulta detectará la diferencia y recargará
+        firma = firma_fuentes()
         
-        header_found = False
-        for line in lines:
-            line = line.strip()
-            
-            if 'Codigo' in line and 'Nombre' in line:
-                header_found = True
-                continue
-            
-            if header_found and line and not line.startswith('"Listado') and not line.startswith('"Reportes'):
-                # Usar CSV reader para manejar comillas correctamente
-                import csv
-                from io import StringIO
-                
-                # Crear un StringIO con la línea para usar csv.reader
-                line_io = StringIO(line)
-                reader = csv.reader(line_io)
-                
-                try:
-                    parts = next(reader)  # Leer la línea como CSV
-                    
-                    if len(parts) >= 4:  # Código, Nombre, Modelo, Laboratorio
-                        codigo = parts[0].strip()
-                        nombre = parts[1].strip()
-                        modelo = parts[2].strip()
-                        laboratorio = parts[3].strip()
-                        
-                        # Solo agregar si tiene código y nombre válidos
-                        if codigo and nombre and len(codigo) > 3 and len(nombre) > 3:
-                            producto = {
-                                'codigo': codigo,
-                                'nombre': nombre,
-                                'modelo': modelo,
-                                'laboratorio': laboratorio,
-                                'precio': 0.0,
-                                'stock': 1
-                            }
-                            INVENTARIO_MEMORIA.append(producto)
-                            
-                            # Debug: mostrar los primeros productos
-                            if len(INVENTARIO_MEMORIA) <= 3:
-                                print(f"Producto cargado: {producto['nombre'][:30]}... -> Lab: {producto['laboratorio']}")
-                except Exception as e:
-                    print(f"Error procesando línea: {e}")
-                    continue
+        snapshot = cargar_snapshot(csv_path, ruta_existencias=XLSX_PATH) if usar_snapshot else None
+        if snapshot is not None:
+            productos = snapshot['productos']
+            categorias = snapshot['categorias']
+            indice_trigramas = snapshot['indice_trigramas']
+            precalculados = snapshot['precalculados']
+            origen = 'snapshot'
+        else:
+            productos, categorias = _parsear_csv(csv_path)
+            indice_trigramas = None
+            precalculados = None
+            origen = 'csv'
         
-        print(f"Inventario cargado: {len(INVENTARIO_MEMORIA)} productos")
+        # Validar antes de publicar: un archivo sin productos (incompleto o de
+        # otro formato) no reemplaza al catálogo vigente
+        if not productos:
+            print("Archivo de inventario sin productos, se conserva el catálogo anterior")
+            _FIRMA_RECHAZADA = firma
+            return False
+        
+        # Stock y precio reales del reporte de existencias (el snapshot ya los trae)
+        if origen == 'csv':
+            existencias = get_existencias(XLSX_PATH, firma[1])
+            if existencias is not None:
+                encontrados = combinar_existencias(productos, existencias)
+                print(f"Existencias de {XLSX_PATH}: {encontrados} de {len(productos)} productos")
+        
+        # El catálogo y sus índices se construyen aparte; los lectores siguen
+        # usando el anterior hasta la asignación
+        catalogo = CatalogoInventario(
+            productos, categorias, indice_trigramas,
+            firma=firma, generacion=CATALOGO.generacion + 1, origen=origen, precalculados=precalculados
+        )
+        CATALOGO = catalogo
+        
+        cambios = registrar_version(catalogo.version, catalogo.huellas)
+        print(f"Inventario cargado desde {origen}: {len(catalogo.productos)} productos (generación {catalogo.generacion}, versión {catalogo.version})")
+        if cambios is not None:
+            print(f"Cambios en el catálogo: {len(cambios['agregados'])} agregados, "
+                  f"{len(cambios['modificados'])} modificados, {len(cambios['eliminados'])} eliminados")
         return True
         
     except Exception as e:
         print(f"Error al cargar inventario: {e}")
+        _FIRMA_RECHAZADA = firma
         return False
 
-def get_laboratorios():
-    """Obtener lista de laboratorios únicos"""
-    if not INVENTARIO_MEMORIA:
-        cargar_inventario()
-    
-    laboratorios = set()
-    print(f"Analizando {len(INVENTARIO_MEMORIA)} productos para laboratorios...")
-    
-    for i, producto in enumerate(INVENTARIO_MEMORIA):
-        if producto['laboratorio'] and producto['laboratorio'] != 'Sin especificar':
-            # Normalizar el nombre del laboratorio
-            lab_normalizado = producto['laboratorio'].strip()
-            laboratorios.add(lab_normalizado)
-            if i < 5:  # Mostrar los primeros 5 para debug
-                print(f"Producto {i+1}: {producto['nombre'][:30]}... -> Laboratorio: '{producto['laboratorio']}'")
-    
-    laboratorios_lista = sorted(list(laboratorios))
-    print(f"Laboratorios encontrados: {laboratorios_lista}")
+def get_catalogo_comprimido():
+    """Obtener el catálogo completo en forma compacta y comprimido con gzip
+
+    Los productos van como listas en el orden de CAMPOS_CATALOGO. Se comprime
+    una sola vez por catálogo publicado. Devuelve (versión, bytes gzip) o None
+    si no hay catálogo cargado.
+    """
+    catalogo = get_catalogo()
+    if catalogo.version is None:
+        return None
     
-    # Debug: mostrar laboratorios que contengan "med" o "pharma"
-    laboratorios_med_pharma = [lab for lab in laboratorios_lista if 'med' in lab.lower() or 'pharma' in lab.lower()]
-    if laboratorios_med_pharma:
-        print(f"Laboratorios con 'med' o 'pharma': {laboratorios_med_pharma}")
+    with _COMPRIMIDO_LOCK:
+        if catalogo.comprimido is None:
+            contenido = {
+                'version': catalogo.version,
+                'campos': CAMPOS_CATALOGO,
+                'productos': [[producto[campo] for campo in CAMPOS_CATALOGO] for producto in catalogo.productos]
+            }
+            datos = json.dumps(contenido, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            # mtime=0: los mismos datos dan siempre los mismos bytes
+            catalogo.comprimido = gzip.compress(datos, compresslevel=9, mtime=0)
+            print(f"Catálogo comprimido: {len(datos)} bytes -> {len(catalogo.comprimido)} bytes")
     
-    return laboratorios_lista
+    return catalogo.version, catalogo.comprimido
+
+def get_cambios_catalogo(desde):
+    """Obtener los productos agregados, modificados y eliminados desde una versión"""
+    return cambios_desde(desde, get_catalogo())
+
+def get_laboratorios():
+    """Obtener lista de laboratorios únicos"""
+    return list(get_catalogo().laboratorios)
 
 def get_medicamentos_by_laboratorio(laboratorio):
-    """Obtener medicamentos por laboratorio"""
-    if not INVENTARIO_MEMORIA:
-        cargar_inventario()
-    
-    medicamentos = []
-    print(f"Buscando medicamentos para laboratorio: '{laboratorio}'")
-    print(f"Total productos en memoria: {len(INVENTARIO_MEMORIA)}")
-    
-    # Normalizar el laboratorio buscado
-    laboratorio_buscar = laboratorio.lower().strip()
-    
-    for i, producto in enumerate(INVENTARIO_MEMORIA):
-        # Normalizar el laboratorio del producto
-        laboratorio_producto = producto['laboratorio'].lower().strip()
-        
-        # Comparación más flexible
-        if laboratorio_producto == laboratorio_buscar or laboratorio_producto.startswith(laboratorio_buscar):
-            medicamentos.append((
-                producto['nombre'],
-                producto['modelo'],
-                producto['precio'],
-                producto['stock']
-            ))
-            if len(medicamentos) <= 3:  # Debug: mostrar los primeros
-                print(f"Medicamento encontrado: {producto['nombre'][:30]}... -> Lab: {producto['laboratorio']}")
+    """Obtener medicamentos por laboratorio (coincidencia exacta o por prefijo)"""
+    catalogo = get_catalogo()
     
+    medicamentos = buscar_por_laboratorio(catalogo.indice_laboratorios, laboratorio)
     print(f"Total medicamentos encontrados para '{laboratorio}': {len(medicamentos)}")
     
     # Si no se encontraron medicamentos, mostrar algunos laboratorios disponibles para debug
     if len(medicamentos) == 0:
         print("No se encontraron medicamentos. Laboratorios disponibles:")
-        laboratorios_disponibles = set()
-        for producto in INVENTARIO_MEMORIA:
-            if producto['laboratorio']:
-                laboratorios_disponibles.add(producto['laboratorio'])
-        
-        for lab in sorted(laboratorios_disponibles):
+        for lab in catalogo.laboratorios:
             if 'med' in lab.lower() or 'pharma' in lab.lower():
                 print(f"  - '{lab}' (similar a '{laboratorio}')")
     
     return medicamentos
 
+def _formatear_resultado_busqueda(producto):
+    """Dar a un producto el formato de resultado de búsqueda"""
+    return {
+        'laboratorio': producto['laboratorio'],
+        'medicamento': producto['nombre'],
+        'presentacion': producto['modelo'],
+        'precio': producto['precio'],
+        'stock': producto['stock']
+    }
+
 def buscar_productos(termino):
-    """Buscar productos por nombre"""
-    if not INVENTARIO_MEMORIA:
-        cargar_inventario()
-    
-    termino = termino.lower()
-    productos = []
-    print(f"Buscando productos con término: '{termino}'")
-    print(f"Total productos en memoria: {len(INVENTARIO_MEMORIA)}")
+    """Buscar productos por nombre usando el índice de trigramas
+
+    Los términos de menos de 3 caracteres no tienen trigramas y se buscan
+    recorriendo los nombres; un término vacío devuelve todos los productos,
+    como la búsqueda original.
+    """
+    catalogo = get_catalogo()
     
-    for i, producto in enumerate(INVENTARIO_MEMORIA):
-        nombre = producto['nombre'].lower()
-        if termino in nombre:
-            productos.append({
-                'laboratorio': producto['laboratorio'],
-                'medicamento': producto['nombre'],
-                'presentacion': producto['modelo'],
-                'precio': producto['precio'],
-                'stock': producto['stock']
-            })
-            if len(productos) <= 3:  # Debug: mostrar los primeros
-                print(f"Producto encontrado: {producto['nombre'][:30]}...")
+    termino = normalizar_texto(termino)
+    if len(termino) < 3 and catalogo.columnar is not None:
+        # Términos cortos no tienen trigramas: buscar en el buffer contiguo de nombres
+        posiciones = catalogo.columnar.buscar_nombre(termino).tolist()
+    else:
+        posiciones = buscar_subcadena(catalogo.indice_trigramas, catalogo.nombres_busqueda, termino)
+    productos = [_formatear_resultado_busqueda(catalogo.productos[i]) for i in posiciones]
     
     print(f"Total productos encontrados con '{termino}': {len(productos)}")
     return productos
 
+def buscar_productos_lineal(termino):
+    """Buscar productos por nombre recorriendo todo el catálogo
+
+    Se conserva como referencia para validar los resultados de buscar_productos().
+    """
+    termino = normalizar_texto(termino)
+    catalogo = get_catalogo()
+    return [
+        _formatear_resultado_busqueda(producto)
+        for producto, nombre in zip(catalogo.productos, catalogo.nombres_busqueda)
+        if termino in nombre
+    ]
+
+def typeahead(prefijo, k=10):
+    """Autocompletar nombres de productos por prefijo (inicio del nombre o de una palabra)
+
+    Devuelve como máximo k productos, primero los que empiezan con el prefijo.
+    """
+    catalogo = get_catalogo()
+    
+    termino = normalizar_texto(prefijo)
+    if termino and prefijo[-1:].isspace():
+        # Un espacio al final pide que la palabra esté completa
+        termino += ' '
+    
+    posiciones = buscar_prefijo(catalogo.indice_prefijos, termino, k)
+    return [catalogo.productos[i] for i in posiciones]
+
+def normalizar_codigo(codigo):
+    """Normalizar un código leído con escáner o digitado
+
+    Los códigos del sistema tienen 9 dígitos; si se digitan sin los ceros
+    a la izquierda se completan.
+    """
+    codigo = (codigo or '').strip()
+    if codigo.isdigit() and len(codigo) < LONGITUD_CODIGO:
+        codigo = codigo.zfill(LONGITUD_CODIGO)
+    return codigo
+
+def get_producto_por_codigo(codigo):
+    """Obtener un producto por su código o None si no existe"""
+    return get_catalogo().productos_por_codigo.get(normalizar_codigo(codigo))
+
+def get_productos_por_codigos(codigos):
+    """Obtener varios productos por código en una sola consulta
+
+    Devuelve {'productos': {código: producto}, 'no_encontrados': [códigos]}
+    con los códigos tal como se recibieron.
+    """
+    productos_por_codigo = get_catalogo().productos_por_codigo
+    
+    encontrados = {}
+    no_encontrados = []
+    for codigo in codigos:
+        producto = productos_por_codigo.get(normalizar_codigo(codigo))
+        if producto is None:
+            no_encontrados.append(codigo)
+        else:
+            encontrados[codigo] = producto
+    
+    return {'productos': encontrados, 'no_encontrados': no_encontrados}
+
+def _nodo_categoria(arbol, codigo, con_subcategorias=True):
+    """Copiar un nodo del árbol de categorías (con sus subcategorías anidadas)"""
+    nodo = arbol['por_codigo'][codigo]
+    resultado = {
+        'codigo': nodo['codigo'],
+        'nombre': nodo['nombre'],
+        'ruta': nodo['ruta'],
+        'nivel': nodo['nivel'],
+        'total_productos': nodo['total_productos']
+    }
+    if con_subcategorias:
+        resultado['subcategorias'] = [_nodo_categoria(arbol, hijo) for hijo in nodo['subcategorias']]
+    return resultado
+
+def get_categorias():
+    """Obtener el árbol de categorías del inventario"""
+    arbol = get_catalogo().arbol_categorias
+    return [_nodo_categoria(arbol, codigo) for codigo in arbol['raices']]
+
+def get_productos_por_categoria(codigo, desde=0, limite=None):
+    """Obtener los productos de una categoría (y sus subcategorías)
+
+    Los productos de una categoría son los de su prefijo de código: se
+    obtienen como un rango del índice ordenado por código, sin recorrer el
+    catálogo. Devuelve None si la categoría no existe.
+    """
+    catalogo = get_catalogo()
+    
+    if codigo not in catalogo.arbol_categorias['por_codigo']:
+        return None
+    
+    inicio, fin = rango_por_prefijo(catalogo.indice_codigos, codigo)
+    desde = max(desde, 0)
+    hasta = fin if limite is None else min(fin, inicio + desde + max(limite, 0))
+    posiciones = catalogo.indice_codigos['posiciones'][inicio + desde:hasta]
+    
+    return {
+        'categoria': _nodo_categoria(catalogo.arbol_categorias, codigo, con_subcategorias=False),
+        'total': fin - inicio,
+        'productos': [catalogo.productos[i] for i in posiciones]
+    }
+
 def debug_inventario():
     """Función de debug para mostrar información del inventario"""
-    if not INVENTARIO_MEMORIA:
-        cargar_inventario()
+    productos = get_catalogo().productos
     
     debug_info = {
-        'total_productos': len(INVENTARIO_MEMORIA),
+        'total_productos': len(productos),
         'primeros_productos': [],
         'laboratorios_unicos': set(),
         'laboratorios_conteo': {}
     }
     
-    for i, producto in enumerate(INVENTARIO_MEMORIA):
+    for i, producto in enumerate(productos):
         # Contar laboratorios
         lab = producto['laboratorio']
         if lab and lab != 'Sin especificar':
@@ -254,19 +563,50 @@ def debug_inventario():
     
     return debug_info
 
+def filtrar_productos(laboratorio='', stock_min=None, stock_max=None, precio_min=None, precio_max=None, limite=1000,
+                      stock_mayor_que=None, stock_menor_que=None):
+    """Filtrar productos por laboratorio (contiene), rango de stock y rango de precio
+
+    stock_min y stock_max incluyen el límite; stock_mayor_que y stock_menor_que
+    lo excluyen (el stock del reporte de existencias puede tener decimales).
+    Los resultados se ordenan por laboratorio y nombre.
+    """
+    catalogo = get_catalogo()
+    
+    if catalogo.columnar is not None:
+        filas = catalogo.columnar.filtrar(
+            laboratorio=laboratorio, modo_laboratorio='contiene',
+            stock_min=stock_min, stock_max=stock_max,
+            precio_min=precio_min, precio_max=precio_max,
+            stock_mayor_que=stock_mayor_que, stock_menor_que=stock_menor_que
+        )
+        filas = catalogo.columnar.ordenar_por_laboratorio_y_nombre(filas)[:limite]
+        return [catalogo.productos[i] for i in filas.tolist()]
+    
+    buscar = normalizar_texto(laboratorio)
+    productos = [
+        producto for producto, clave in zip(catalogo.productos, catalogo.laboratorios_busqueda)
+        if (not buscar or buscar in clave)
+        and (stock_min is None or producto['stock'] >= stock_min)
+        and (stock_max is None or producto['stock'] <= stock_max)
+        and (stock_mayor_que is None or producto['stock'] > stock_mayor_que)
+        and (stock_menor_que is None or producto['stock'] < stock_menor_que)
+        and (precio_min is None or producto['precio'] >= precio_min)
+        and (precio_max is None or producto['precio'] <= precio_max)
+    ]
+    productos.sort(key=lambda producto: (producto['laboratorio'], producto['nombre']))
+    return productos[:limite]
+
 def get_estadisticas():
     """Obtener estadísticas del inventario"""
-    if not INVENTARIO_MEMORIA:
-        cargar_inventario()
+    catalogo = get_catalogo()
     
-    laboratorios = set()
-    for producto in INVENTARIO_MEMORIA:
-        if producto['laboratorio'] and producto['laboratorio'] != 'Sin especificar':
-            laboratorios.add(producto['laboratorio'])
+    if catalogo.columnar is not None:
+        return catalogo.columnar.estadisticas()
     
     return {
-        'total_productos': len(INVENTARIO_MEMORIA),
-        'total_laboratorios': len(laboratorios),
-        'stock_bajo': 0,
-        'sin_stock': 0
-    } 
\ No newline at end of file
+        'total_productos': len(catalogo.productos),
+        'total_laboratorios': len(catalogo.laboratorios),
+        'stock_bajo': sum(1 for producto in catalogo.productos if 0 < producto['stock'] < 10),
+        'sin_stock': sum(1 for producto in catalogo.productos if producto['stock'] == 0)
+    }
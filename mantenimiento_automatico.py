@@ -1,8 +1,8 @@
-import sqlite3
 import os
-import shutil
 from datetime import datetime, timedelta
 
+from conexiones_db import conectar_sqlite, copiar_sqlite
+
 def crear_backup_automatico():
     """Crear backup automático de la base de datos"""
     try:
@@ -15,8 +15,8 @@ def crear_backup_automatico():
         fecha = datetime.now().strftime("%Y%m%d")
         backup_file = f"{backup_dir}/farmacia_backup_{fecha}.db"
         
-        # Copiar base de datos
-        shutil.copy2('farmacia.db', backup_file)
+        # Copiar base de datos (con la API de respaldo: incluye lo que está en el WAL)
+        copiar_sqlite('farmacia.db', backup_file)
         
         print(f"✅ Backup automático creado: {backup_file}")
         
@@ -50,7 +50,7 @@ def limpiar_backups_antiguos(backup_dir, dias_a_mantener):
 def verificar_integridad_bd():
     """Verificar la integridad de la base de datos"""
     try:
-        conn = sqlite3.connect('farmacia.db')
+        conn = conectar_sqlite('farmacia.db')
         cursor = conn.cursor()
         
         # Verificar integridad
@@ -70,10 +70,29 @@ def verificar_integridad_bd():
         print(f"❌ Error al verificar integridad: {e}")
         return False
 
+def checkpoint_wal():
+    """Volcar el WAL a farmacia.db y dejar el archivo -wal vacío"""
+    try:
+        conn = conectar_sqlite('farmacia.db')
+        ocupado, paginas, volcadas = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        conn.close()
+        
+        if paginas == -1:
+            print("ℹ️ La base de datos no está en modo WAL")
+        elif ocupado:
+            print(f"⚠️ Checkpoint parcial: {volcadas} de {paginas} páginas (hay lectores activos)")
+        else:
+            print(f"✅ Checkpoint del WAL: {volcadas} páginas volcadas")
+        return True
+        
+    except Exception as e:
+        print(f"❌ Error en checkpoint del WAL: {e}")
+        return False
+
 def optimizar_bd():
     """Optimizar la base de datos"""
     try:
-        conn = sqlite3.connect('farmacia.db')
+        conn = conectar_sqlite('farmacia.db')
         cursor = conn.cursor()
         
         # Analizar tablas
@@ -96,7 +115,7 @@ def optimizar_bd():
 def generar_reporte_mantenimiento():
     """Generar reporte de mantenimiento"""
     try:
-        conn = sqlite3.connect('farmacia.db')
+        conn = conectar_sqlite('farmacia.db')
         cursor = conn.cursor()
         
         # Estadísticas de la base de datos
@@ -154,6 +173,7 @@ if __name__ == "__main__":
     print("🔧 Iniciando mantenimiento automático...")
     
     # Ejecutar mantenimiento
+    checkpoint_wal()
     generar_reporte_mantenimiento()
     
     print("\n✅ Mantenimiento completado") 
\ No newline at end of file
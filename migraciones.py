@@ -0,0 +1,364 @@
+#!/usr/bin/env python3
+"""
+Migraciones versionadas del esquema de la base de datos.
+
+Cada migración tiene un número de versión y se aplica una sola vez; las
+aplicadas quedan anotadas en la tabla schema_version. Se ejecutan al
+desplegar (python migraciones.py) o al arrancar cada proceso, nunca dentro
+de una solicitud.
+
+Varios workers pueden arrancar a la vez, así que las migraciones pendientes
+se aplican en una sola transacción tomada con un bloqueo:
+- PostgreSQL: pg_advisory_xact_lock (se libera al confirmar).
+- SQLite: BEGIN IMMEDIATE (un solo escritor a la vez).
+Quien obtiene el bloqueo después vuelve a leer la versión y ya no tiene nada
+que aplicar. En ambos motores el DDL es transaccional: si una migración falla
+no queda ninguna a medias.
+"""
+import sys
+from datetime import datetime
+
+from repositorio_registros import Repositorio, ZONA_HORARIA
+
+# Clave del bloqueo de PostgreSQL (cualquier entero fijo de 64 bits)
+CLAVE_BLOQUEO = 730514021
+
+_CREAR_SCHEMA_VERSION = '''
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,
+        descripcion TEXT NOT NULL,
+        aplicada TEXT NOT NULL
+    )
+'''
+
+# Columnas que pueden faltar en tablas registros creadas por versiones
+# anteriores del sistema, con la definición con que se agregan
+COLUMNAS_AGREGABLES = {
+    'precio': 'REAL DEFAULT 0.0',
+    'observaciones': 'TEXT',
+    'tipo_movimiento': "TEXT DEFAULT 'VENTA'",
+    'fecha_vencimiento': 'TEXT',
+    'lote': 'TEXT',
+    'medico': 'TEXT',
+    'junta_vigilancia': 'TEXT',
+    'numero_inscripcion_clinica': 'TEXT',
+    'numero_factura': 'TEXT',
+    'codigo_empleado': 'TEXT',
+    'farmacia': "TEXT DEFAULT 'farmacia1'"
+}
+
+
+def columnas_tabla(repo, tabla):
+    """Nombres de las columnas de una tabla (igual en ambos motores)"""
+    cursor = repo.ejecutar(f'SELECT * FROM {tabla} LIMIT 0')
+    return [columna[0] for columna in cursor.description]
+
+
+def _crear_registros(repo):
+    clave = 'SERIAL PRIMARY KEY' if repo.motor == 'postgresql' else 'INTEGER PRIMARY KEY AUTOINCREMENT'
+    repo.ejecutar(f'''
+        CREATE TABLE IF NOT EXISTS registros (
+            id {clave},
+            medicamento TEXT NOT NULL,
+            cantidad INTEGER NOT NULL,
+            precio REAL DEFAULT 0.0,
+            fecha TEXT NOT NULL,
+            fecha_ingreso TEXT NOT NULL,
+            observaciones TEXT,
+            laboratorio TEXT NOT NULL,
+            tipo_movimiento TEXT DEFAULT 'VENTA',
+            fecha_vencimiento TEXT,
+            lote TEXT,
+            medico TEXT,
+            junta_vigilancia TEXT,
+            numero_inscripcion_clinica TEXT,
+            numero_factura TEXT,
+            codigo_empleado TEXT,
+            farmacia TEXT DEFAULT 'farmacia1'
+        )
+    ''')
+
+
+def _agregar_columnas_faltantes(repo):
+    existentes = set(columnas_tabla(repo, 'registros'))
+    for columna, definicion in COLUMNAS_AGREGABLES.items():
+        if columna not in existentes:
+            repo.ejecutar(f'ALTER TABLE registros ADD COLUMN {columna} {definicion}')
+            print(f"Columna agregada a registros: {columna}")
+
+
+# Índices de registros: (nombre, columnas). El primero sirve a /api/registros
+# y a la exportación (igualdad por farmacia, rango y orden por fecha_ingreso);
+# los demás, a las búsquedas puntuales por factura, lote y empleado.
+INDICES_REGISTROS = (
+    ('idx_registros_farmacia_fecha', 'farmacia, fecha_ingreso DESC'),
+    ('idx_registros_numero_factura', 'numero_factura'),
+    ('idx_registros_lote', 'lote'),
+    ('idx_registros_codigo_empleado', 'codigo_empleado'),
+)
+
+
+def _crear_indices_registros(repo):
+    # Sin CONCURRENTLY: no se permite dentro de la transacción de la migración
+    for nombre, columnas in INDICES_REGISTROS:
+        repo.ejecutar(f'CREATE INDEX IF NOT EXISTS {nombre} ON registros ({columnas})')
+    repo.ejecutar('ANALYZE registros')
+
+
+def _desplazamiento_zona():
+    """Desplazamiento de ZONA_HORARIA como texto ('-06:00')"""
+    minutos = int(ZONA_HORARIA.utcoffset(None).total_seconds() // 60)
+    signo = '-' if minutos < 0 else '+'
+    return f"{signo}{abs(minutos) // 60:02d}:{abs(minutos) % 60:02d}"
+
+
+def _sql_instante_sqlite(fecha_ingreso, fecha):
+    """Expresión SQLite con los segundos de instante_ingreso(fecha_ingreso, fecha)
+
+    Mismo criterio que en Python: sin desplazamiento se asume la hora local;
+    si el texto no se entiende, la medianoche local de fecha y si no, 0.
+    """
+    zona = _desplazamiento_zona()
+    return f"""COALESCE(
+        CAST(strftime('%s', CASE
+            WHEN {fecha_ingreso} GLOB '*:*[0-9][+-][0-9][0-9]:[0-9][0-9]'
+                 OR {fecha_ingreso} GLOB '*:*[0-9]Z' THEN {fecha_ingreso}
+            WHEN {fecha_ingreso} GLOB '*:*' THEN {fecha_ingreso} || '{zona}'
+            ELSE substr({fecha_ingreso}, 1, 10) || ' 00:00:00{zona}'
+        END) AS INTEGER),
+        CAST(strftime('%s', substr({fecha}, 1, 10) || ' 00:00:00{zona}') AS INTEGER),
+        0
+    )"""
+
+
+def _funcion_instante_postgresql():
+    """Función registros_instante(fecha_ingreso, fecha): instante_ingreso() en PL/pgSQL"""
+    zona = _desplazamiento_zona()
+    return f"""
+        CREATE OR REPLACE FUNCTION registros_instante(fecha_ingreso TEXT, fecha TEXT)
+        RETURNS TIMESTAMPTZ AS $$
+        DECLARE
+            instante TIMESTAMPTZ;
+        BEGIN
+            BEGIN
+                -- Hora seguida de un desplazamiento (-06:00, +0000 o Z)
+                IF fecha_ingreso ~ '[0-9]:[0-9][0-9.:]*([+-][0-9:]+|Z)$' THEN
+                    instante := fecha_ingreso::timestamptz;
+                ELSE
+                    instante := fecha_ingreso::timestamp AT TIME ZONE INTERVAL '{zona}';
+                END IF;
+            EXCEPTION WHEN others THEN
+                instante := NULL;
+            END;
+            IF instante IS NULL THEN
+                BEGIN
+                    instante := left(fecha, 10)::date::timestamp AT TIME ZONE INTERVAL '{zona}';
+                EXCEPTION WHEN others THEN
+                    instante := NULL;
+                END;
+            END IF;
+            RETURN COALESCE(instante, 'epoch'::timestamptz);
+        END
+        $$ LANGUAGE plpgsql STABLE
+    """
+
+
+def rellenar_fecha_ingreso_ts(repo):
+    """Calcular en una sola sentencia fecha_ingreso_ts de los registros que no lo tienen"""
+    if repo.motor == 'postgresql':
+        repo.ejecutar(_funcion_instante_postgresql())
+        valor = 'registros_instante(fecha_ingreso, fecha)'
+    else:
+        valor = _sql_instante_sqlite('fecha_ingreso', 'fecha')
+    return repo.ejecutar(f'UPDATE registros SET fecha_ingreso_ts = {valor} '
+                         'WHERE fecha_ingreso_ts IS NULL').rowcount
+
+
+def _agregar_fecha_ingreso_ts(repo):
+    if 'fecha_ingreso_ts' not in columnas_tabla(repo, 'registros'):
+        tipo = 'TIMESTAMPTZ' if repo.motor == 'postgresql' else 'INTEGER'
+        repo.ejecutar(f'ALTER TABLE registros ADD COLUMN fecha_ingreso_ts {tipo}')
+    print(f"fecha_ingreso_ts calculada para {rellenar_fecha_ingreso_ts(repo)} registros")
+
+    # Reemplaza al índice por el texto de fecha_ingreso (ya no se filtra por él);
+    # id desempata registros del mismo segundo
+    repo.ejecutar('DROP INDEX IF EXISTS idx_registros_farmacia_fecha')
+    repo.ejecutar('CREATE INDEX IF NOT EXISTS idx_registros_farmacia_ts '
+                  'ON registros (farmacia, fecha_ingreso_ts DESC, id DESC)')
+    repo.ejecutar('ANALYZE registros')
+
+
+def _completar_fecha_ingreso_ts(repo):
+    """Trigger que calcula fecha_ingreso_ts de los registros insertados sin él
+
+    RepositorioRegistros.insertar lo envía siempre, pero otros scripts (y las
+    pruebas) insertan solo fecha_ingreso; sin instante esos registros no
+    aparecían en los filtros por fecha ni en la paginación.
+    """
+    if repo.motor == 'postgresql':
+        repo.ejecutar(_funcion_instante_postgresql())
+        repo.ejecutar('''
+            CREATE OR REPLACE FUNCTION registros_fecha_ingreso_ts() RETURNS TRIGGER AS $$
+            BEGIN
+                NEW.fecha_ingreso_ts := registros_instante(NEW.fecha_ingreso, NEW.fecha);
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql
+        ''')
+        repo.ejecutar('DROP TRIGGER IF EXISTS registros_fecha_ingreso_ts ON registros')
+        repo.ejecutar('CREATE TRIGGER registros_fecha_ingreso_ts BEFORE INSERT ON registros '
+                      'FOR EACH ROW WHEN (NEW.fecha_ingreso_ts IS NULL) '
+                      'EXECUTE FUNCTION registros_fecha_ingreso_ts()')
+    else:
+        # SQLite no permite asignar NEW: se completa la fila recién insertada
+        repo.ejecutar(f'''
+            CREATE TRIGGER IF NOT EXISTS registros_fecha_ingreso_ts AFTER INSERT ON registros
+            WHEN new.fecha_ingreso_ts IS NULL BEGIN
+                UPDATE registros SET fecha_ingreso_ts = {_sql_instante_sqlite('new.fecha_ingreso', 'new.fecha')}
+                WHERE id = new.id;
+            END
+        ''')
+    print(f"fecha_ingreso_ts calculada para {rellenar_fecha_ingreso_ts(repo)} registros sin instante")
+
+
+def _crear_indice_medicamento(repo):
+    # Orden por medicamento de la paginación de /api/registros
+    repo.ejecutar('CREATE INDEX IF NOT EXISTS idx_registros_farmacia_medicamento '
+                  'ON registros (farmacia, medicamento, id)')
+
+
+_TRIGGERS_FTS = (
+    '''CREATE TRIGGER IF NOT EXISTS registros_fts_ai AFTER INSERT ON registros BEGIN
+           INSERT INTO registros_fts (rowid, laboratorio, medicamento)
+           VALUES (new.id, new.laboratorio, new.medicamento);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS registros_fts_ad AFTER DELETE ON registros BEGIN
+           INSERT INTO registros_fts (registros_fts, rowid, laboratorio, medicamento)
+           VALUES ('delete', old.id, old.laboratorio, old.medicamento);
+       END''',
+    '''CREATE TRIGGER IF NOT EXISTS registros_fts_au AFTER UPDATE OF laboratorio, medicamento ON registros BEGIN
+           INSERT INTO registros_fts (registros_fts, rowid, laboratorio, medicamento)
+           VALUES ('delete', old.id, old.laboratorio, old.medicamento);
+           INSERT INTO registros_fts (rowid, laboratorio, medicamento)
+           VALUES (new.id, new.laboratorio, new.medicamento);
+       END''',
+)
+
+
+def _crear_busqueda_texto(repo):
+    """Índice de texto para los filtros de laboratorio y medicamento
+
+    SQLite: tabla FTS5 con tokenizador de trigramas (busca subcadenas, igual
+    que LIKE '%x%') sobre el contenido de registros, sincronizada con
+    triggers. PostgreSQL: índices GIN de pg_trgm, que el motor mantiene solo.
+    Si el motor no lo permite (SQLite sin FTS5 o trigramas, pg_trgm sin
+    permisos) los filtros siguen funcionando con LIKE.
+    """
+    repo.ejecutar('SAVEPOINT busqueda_texto')
+    try:
+        if repo.motor == 'postgresql':
+            repo.ejecutar('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+            for columna in ('laboratorio', 'medicamento'):
+                repo.ejecutar(f'CREATE INDEX IF NOT EXISTS idx_registros_{columna}_trgm '
+                              f'ON registros USING gin ({columna} gin_trgm_ops)')
+        else:
+            repo.ejecutar("CREATE VIRTUAL TABLE IF NOT EXISTS registros_fts USING fts5("
+                          "laboratorio, medicamento, content='registros', content_rowid='id', "
+                          "tokenize='trigram')")
+            for trigger in _TRIGGERS_FTS:
+                repo.ejecutar(trigger)
+            repo.ejecutar("INSERT INTO registros_fts (registros_fts) VALUES ('rebuild')")
+    except Exception as e:
+        repo.ejecutar('ROLLBACK TO SAVEPOINT busqueda_texto')
+        print(f"Búsqueda de texto no disponible, se usará LIKE: {e}")
+    repo.ejecutar('RELEASE SAVEPOINT busqueda_texto')
+
+
+# (versión, descripción, función que recibe un Repositorio). Solo se agregan
+# al final; una migración ya publicada no se modifica.
+MIGRACIONES = [
+    (1, 'Crear tabla registros', _crear_registros),
+    (2, 'Agregar columnas faltantes a registros', _agregar_columnas_faltantes),
+    (3, 'Índices de registros por farmacia y fecha, factura, lote y empleado', _crear_indices_registros),
+    (4, 'Columna fecha_ingreso_ts con el instante nativo de fecha_ingreso', _agregar_fecha_ingreso_ts),
+    (5, 'Índice de registros por farmacia y medicamento', _crear_indice_medicamento),
+    (6, 'Búsqueda de texto en laboratorio y medicamento', _crear_busqueda_texto),
+    (7, 'Trigger que completa fecha_ingreso_ts desde fecha_ingreso', _completar_fecha_ingreso_ts),
+]
+
+VERSION_ACTUAL = MIGRACIONES[-1][0]
+
+
+def version_esquema(repo):
+    """Última versión aplicada (0 si nunca se migró la base de datos)"""
+    try:
+        fila = repo.ejecutar('SELECT MAX(version) FROM schema_version').fetchone()
+    except Exception:
+        # Sin tabla schema_version; en PostgreSQL la transacción queda abortada
+        repo.conexion.rollback()
+        return 0
+    return fila[0] or 0
+
+
+def aplicar_migraciones(conexion, motor):
+    """Aplicar las migraciones pendientes y devolver las versiones aplicadas
+
+    Si el esquema ya está al día no se ejecuta DDL ni se toma el bloqueo.
+    Los errores se propagan después de deshacer la transacción.
+    """
+    repo = Repositorio(conexion, motor)
+    if version_esquema(repo) >= VERSION_ACTUAL:
+        conexion.rollback()
+        return []
+
+    aplicadas = []
+    conexion.rollback()
+    try:
+        if motor == 'postgresql':
+            repo.ejecutar('SELECT pg_advisory_xact_lock(?)', (CLAVE_BLOQUEO,))
+        else:
+            repo.ejecutar('BEGIN IMMEDIATE')
+        repo.ejecutar(_CREAR_SCHEMA_VERSION)
+
+        # Otro proceso pudo migrar mientras se esperaba el bloqueo
+        actual = repo.ejecutar('SELECT MAX(version) FROM schema_version').fetchone()[0] or 0
+        for version, descripcion, migrar in MIGRACIONES:
+            if version <= actual:
+                continue
+            print(f"Aplicando migración {version}: {descripcion}")
+            migrar(repo)
+            repo.ejecutar(
+                'INSERT INTO schema_version (version, descripcion, aplicada) VALUES (?, ?, ?)',
+                (version, descripcion, datetime.now().isoformat())
+            )
+            aplicadas.append(version)
+        conexion.commit()
+    except Exception:
+        conexion.rollback()
+        raise
+
+    return aplicadas
+
+
+def main():
+    """Aplicar las migraciones pendientes (paso de despliegue)"""
+    from app import get_db_connection, DATABASE_TYPE
+
+    conexion = get_db_connection()
+    try:
+        aplicadas = aplicar_migraciones(conexion, DATABASE_TYPE)
+    except Exception as e:
+        print(f"❌ Error al aplicar migraciones: {e}")
+        return False
+    finally:
+        conexion.close()
+
+    if aplicadas:
+        print(f"✅ Migraciones aplicadas: {aplicadas}")
+    else:
+        print(f"✅ Esquema al día (versión {VERSION_ACTUAL})")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if main() else 1)
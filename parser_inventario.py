@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Parser único del archivo de inventario exportado del sistema (ERP).
+
+El archivo tiene este formato:
+- unas líneas de título ("Listado de Existencias", "Reportes de inventario ...")
+- la fila de encabezados: Codigo, Nombre, Modelo, Marca
+- filas de categoría: un solo campo con el código de 6 dígitos y el nombre
+  ("010101   CONVENIENCIA/ACCESORIOS DE COCINA/HOGAR")
+- filas de producto: código, nombre, modelo y marca (laboratorio)
+
+Todos los campos vienen entre comillas y rellenos con espacios y tabulaciones.
+El archivo se lee una sola vez, fila por fila, con un único csv.reader sobre
+el archivo abierto: nunca se carga completo en memoria.
+"""
+import csv
+import re
+from collections import namedtuple
+
+# Archivo de inventario exportado del sistema
+CSV_PATH = 'INVENTARIO PARA TRABAJO.csv'
+
+# Registros que produce el parser
+ProductoInventario = namedtuple('ProductoInventario', ['codigo', 'nombre', 'modelo', 'laboratorio', 'categoria'])
+CategoriaInventario = namedtuple('CategoriaInventario', ['codigo', 'nombre'])
+
+# Fila de categoría: código numérico seguido del nombre en el mismo campo
+_PATRON_CATEGORIA = re.compile(r'^(\d+)\s+(\S.*)$')
+
+
+def _es_encabezado(campos):
+    """Detectar la fila de encabezados (Codigo, Nombre, ...)"""
+    return len(campos) >= 2 and campos[0] == 'Codigo' and campos[1] == 'Nombre'
+
+
+def _es_titulo(campos):
+    """Detectar las líneas de título del reporte"""
+    return bool(campos) and (campos[0].startswith('Listado') or campos[0].startswith('Reportes'))
+
+
+def leer_registros(ruta=CSV_PATH):
+    """Recorrer el archivo y producir CategoriaInventario y ProductoInventario
+
+    Las filas anteriores a los encabezados, las líneas de título y las filas
+    sin código o nombre válidos se ignoran. Cada producto lleva el código de
+    la última categoría leída.
+    """
+    with open(ruta, 'r', encoding='utf-8-sig', newline='') as file:
+        header_found = False
+        categoria = None
+
+        for fila in csv.reader(file):
+            campos = [campo.strip() for campo in fila]
+
+            if _es_encabezado(campos):
+                header_found = True
+                continue
+
+            if not header_found or not any(campos) or _es_titulo(campos):
+                continue
+
+            if len(campos) >= 2 and not any(campos[1:]):
+                coincidencia = _PATRON_CATEGORIA.match(campos[0])
+                if coincidencia:
+                    categoria = coincidencia.group(1)
+                    yield CategoriaInventario(categoria, coincidencia.group(2).strip())
+                continue
+
+            if len(campos) < 4:
+                continue
+
+            codigo, nombre, modelo, laboratorio = campos[:4]
+
+            # Solo productos con código y nombre válidos
+            if len(codigo) > 3 and len(nombre) > 3:
+                yield ProductoInventario(codigo, nombre, modelo, laboratorio, categoria)
+
+
+def leer_productos(ruta=CSV_PATH):
+    """Recorrer solo los productos del archivo de inventario"""
+    for registro in leer_registros(ruta):
+        if isinstance(registro, ProductoInventario):
+            yield registro
+
+
+def leer_categorias(ruta=CSV_PATH):
+    """Recorrer solo las categorías del archivo de inventario"""
+    for registro in leer_registros(ruta):
+        if isinstance(registro, CategoriaInventario):
+            yield registro
@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Acceso a datos de la tabla 'registros' (y de la tabla 'inventario' heredada).
+
+Las sentencias se escriben una sola vez con parámetros '?'. Para PostgreSQL
+se traducen a '%s' la primera vez que se usan y la traducción queda guardada.
+SQLite guarda además las sentencias compiladas en cada conexión, que ahora se
+reutiliza entre solicitudes (ver conexiones_db.py). En PostgreSQL no se usa
+PREPARE del lado del servidor: el pooler de Supabase en modo transacción no
+conserva sentencias preparadas entre transacciones.
+
+Las filas se devuelven como Registro, con cada columna por nombre y tipo.
+
+fecha_ingreso se guarda como texto ISO con desplazamiento (-06:00) para
+mostrarlo, y además como instante nativo en fecha_ingreso_ts (timestamptz en
+PostgreSQL, segundos desde la época en SQLite), que es la columna por la que se
+filtra y ordena. Un trigger (migración 7) lo calcula para las filas que se
+insertan sin él.
+"""
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+
+# Columnas de la tabla registros, en el orden en que se leen
+COLUMNAS_REGISTRO = (
+    'id', 'laboratorio', 'medicamento', 'cantidad', 'precio', 'fecha', 'fecha_ingreso',
+    'observaciones', 'tipo_movimiento', 'fecha_vencimiento', 'lote', 'medico',
+    'junta_vigilancia', 'numero_inscripcion_clinica', 'numero_factura', 'codigo_empleado',
+    'farmacia'
+)
+
+# Columnas que se escriben al registrar un movimiento (todas menos el id)
+COLUMNAS_INSERCION = COLUMNAS_REGISTRO[1:]
+
+# Columnas que se pueden editar de un registro existente
+COLUMNAS_EDITABLES = (
+    'laboratorio', 'medicamento', 'cantidad', 'fecha', 'observaciones', 'fecha_vencimiento',
+    'lote', 'medico', 'junta_vigilancia', 'numero_inscripcion_clinica', 'numero_factura',
+    'codigo_empleado'
+)
+
+Registro = namedtuple('Registro', COLUMNAS_REGISTRO)
+
+# Zona horaria de las farmacias (El Salvador: UTC-6, sin horario de verano)
+ZONA_HORARIA = timezone(timedelta(hours=-6))
+
+_EPOCA = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Órdenes de la paginación: nombre -> (columna, descendente). Todos desempatan
+# por id en el mismo sentido y tienen un índice (farmacia, columna, id)
+ORDENES_REGISTROS = {
+    'fecha_desc': ('fecha_ingreso_ts', True),
+    'fecha_asc': ('fecha_ingreso_ts', False),
+    'medicamento_asc': ('medicamento', False),
+    'medicamento_desc': ('medicamento', True),
+}
+ORDEN_PREDETERMINADO = 'fecha_desc'
+
+# Orden por relevancia frente a los filtros de texto (no es una columna)
+ORDEN_RELEVANCIA = 'relevancia'
+
+# Largo mínimo de un término para buscarlo en el índice de trigramas
+LARGO_MINIMO_TEXTO = 3
+
+# Filas que se cuentan como máximo para el total de una búsqueda paginada
+MAX_CONTEO = 10000
+
+# Columnas de los INSERT: las del registro más el instante de fecha_ingreso
+_COLUMNAS_INSERT = COLUMNAS_INSERCION + ('fecha_ingreso_ts',)
+
+_SELECT_REGISTROS = f"SELECT {', '.join(COLUMNAS_REGISTRO)} FROM registros"
+
+
+@lru_cache(maxsize=None)
+def traducir(sql, motor):
+    """Adaptar una sentencia con parámetros '?' al estilo del motor"""
+    if motor != 'postgresql':
+        return sql
+    # psycopg2 usa '%s' y requiere escapar los '%' literales
+    return sql.replace('%', '%%').replace('?', '%s')
+
+
+def instante_ingreso(fecha_ingreso, fecha=None):
+    """Instante (datetime con zona) de un fecha_ingreso ISO
+
+    Sin desplazamiento se asume la hora local de las farmacias. Si el texto no
+    se entiende se usa la medianoche local de 'fecha' y, en último caso, la
+    época, para que ningún registro quede sin instante.
+    """
+    for texto, formato in ((fecha_ingreso, None), (fecha, '%Y-%m-%d')):
+        if not texto:
+            continue
+        try:
+            if formato is None:
+                instante = datetime.fromisoformat(str(texto).strip())
+            else:
+                instante = datetime.strptime(str(texto).strip()[:10], formato)
+        except ValueError:
+            continue
+        return instante if instante.tzinfo else instante.replace(tzinfo=ZONA_HORARIA)
+    return _EPOCA
+
+
+def valor_instante(instante, motor):
+    """Valor de fecha_ingreso_ts para el motor: datetime o segundos (entero)"""
+    if motor == 'postgresql':
+        return instante
+    return int(instante.timestamp())
+
+
+def inicio_dia(fecha):
+    """Medianoche local de una fecha 'YYYY-MM-DD'"""
+    return datetime.strptime(fecha, '%Y-%m-%d').replace(tzinfo=ZONA_HORARIA)
+
+
+def codificar_cursor(orden, clave):
+    """Cursor opaco (texto seguro para URL) con el orden y la clave de una fila"""
+    valor, registro_id = clave
+    if isinstance(valor, datetime):
+        valor = {'instante': valor.isoformat()}
+    datos = json.dumps([orden, valor, registro_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(datos).decode('ascii').rstrip('=')
+
+
+def decodificar_cursor(cursor):
+    """Orden y clave de un cursor de codificar_cursor(); ValueError si no es válido"""
+    try:
+        datos = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        orden, valor, registro_id = json.loads(datos)
+        if isinstance(valor, dict):
+            valor = datetime.fromisoformat(valor['instante'])
+    except Exception:
+        raise ValueError('Cursor de paginación inválido')
+    if (orden not in ORDENES_REGISTROS and orden != ORDEN_RELEVANCIA) or not isinstance(registro_id, int):
+        raise ValueError('Cursor de paginación inválido')
+    return orden, (valor, registro_id)
+
+
+def consulta_fts(terminos):
+    """Consulta FTS5 que exige cada término como subcadena de su columna"""
+    return ' AND '.join(
+        f'{columna} : "{termino.replace(chr(34), chr(34) * 2)}"' for columna, termino in terminos.items()
+    )
+
+
+def _texto(valor, defecto=''):
+    return defecto if valor is None else str(valor)
+
+
+def _fila_a_registro(fila):
+    """Convertir una fila de la base de datos en un Registro con sus tipos"""
+    valores = dict(zip(COLUMNAS_REGISTRO, fila))
+    return Registro(
+        id=int(valores['id']),
+        laboratorio=_texto(valores['laboratorio']),
+        medicamento=_texto(valores['medicamento']),
+        cantidad=int(valores['cantidad'] or 0),
+        precio=float(valores['precio'] or 0.0),
+        fecha=_texto(valores['fecha']),
+        fecha_ingreso=_texto(valores['fecha_ingreso']),
+        observaciones=_texto(valores['observaciones']),
+        tipo_movimiento=_texto(valores['tipo_movimiento'], 'VENTA') or 'VENTA',
+        fecha_vencimiento=_texto(valores['fecha_vencimiento']),
+        lote=_texto(valores['lote']),
+        medico=_texto(valores['medico']),
+        junta_vigilancia=_texto(valores['junta_vigilancia']),
+        numero_inscripcion_clinica=_texto(valores['numero_inscripcion_clinica']),
+        numero_factura=_texto(valores['numero_factura']),
+        codigo_empleado=_texto(valores['codigo_empleado']),
+        farmacia=_texto(valores['farmacia'])
+    )
+
+
+class Repositorio:
+    """Base de los repositorios: una conexión y el dialecto de su motor
+
+    Se usa como context manager; al salir se devuelve la conexión (lo que no
+    se haya confirmado con commit() se deshace).
+    """
+
+    def __init__(self, conexion, motor):
+        self.conexion = conexion
+        self.motor = motor
+
+    def ejecutar(self, sql, parametros=()):
+        """Ejecutar una sentencia escrita con parámetros '?' y devolver el cursor"""
+        cursor = self.conexion.cursor()
+        cursor.execute(traducir(sql, self.motor), parametros)
+        return cursor
+
+    def ejecutar_varios(self, sql, filas):
+        """Ejecutar una sentencia para cada fila de parámetros"""
+        cursor = self.conexion.cursor()
+        cursor.executemany(traducir(sql, self.motor), filas)
+        return cursor
+
+    def commit(self):
+        self.conexion.commit()
+
+    def cerrar(self):
+        self.conexion.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.cerrar()
+
+
+class RepositorioRegistros(Repositorio):
+    """Consultas y cambios sobre la tabla registros"""
+
+    # Si la base tiene el índice de texto (se consulta la primera vez que se usa)
+    _indice_texto = None
+
+    def _fila_insercion(self, datos):
+        """Valores de _COLUMNAS_INSERT para un registro (diccionario con las columnas)"""
+        instante = instante_ingreso(datos.get('fecha_ingreso'), datos.get('fecha'))
+        return tuple(datos.get(columna) for columna in COLUMNAS_INSERCION) + (valor_instante(instante, self.motor),)
+
+    def insertar(self, datos):
+        """Insertar un registro (diccionario con las columnas) y devolver su id"""
+        marcas = ', '.join('?' * len(_COLUMNAS_INSERT))
+        sql = f"INSERT INTO registros ({', '.join(_COLUMNAS_INSERT)}) VALUES ({marcas})"
+        parametros = self._fila_insercion(datos)
+
+        if self.motor == 'postgresql':
+            return self.ejecutar(sql + ' RETURNING id', parametros).fetchone()[0]
+        return self.ejecutar(sql, parametros).lastrowid
+
+    def insertar_varios(self, lista_datos):
+        """Insertar varios registros con una sola sentencia y devolver sus ids en orden
+
+        PostgreSQL: un INSERT con todas las filas (execute_values) y RETURNING.
+        SQLite: executemany; dentro de la transacción nadie más puede insertar,
+        así que los ids son consecutivos y terminan en last_insert_rowid().
+        """
+        columnas = ', '.join(_COLUMNAS_INSERT)
+        filas = [self._fila_insercion(datos) for datos in lista_datos]
+        if not filas:
+            return []
+
+        if self.motor == 'postgresql':
+            from psycopg2.extras import execute_values
+            cursor = self.conexion.cursor()
+            resultado = execute_values(
+                cursor, f"INSERT INTO registros ({columnas}) VALUES %s RETURNING id",
+                filas, page_size=len(filas), fetch=True
+            )
+            return [fila[0] for fila in resultado]
+
+        marcas = ', '.join('?' * len(_COLUMNAS_INSERT))
+        self.ejecutar_varios(f"INSERT INTO registros ({columnas}) VALUES ({marcas})", filas)
+        ultimo = self.ejecutar('SELECT last_insert_rowid()').fetchone()[0]
+        return list(range(ultimo - len(filas) + 1, ultimo + 1))
+
+    def obtener(self, registro_id):
+        """Obtener un registro por id o None"""
+        fila = self.ejecutar(f"{_SELECT_REGISTROS} WHERE id = ?", (registro_id,)).fetchone()
+        return _fila_a_registro(fila) if fila else None
+
+    def existe(self, registro_id):
+        """Indicar si existe un registro con ese id"""
+        return self.ejecutar('SELECT 1 FROM registros WHERE id = ?', (registro_id,)).fetchone() is not None
+
+    def actualizar(self, registro_id, datos):
+        """Actualizar las columnas editables de un registro; False si no existe"""
+        asignaciones = ', '.join(f"{columna} = ?" for columna in COLUMNAS_EDITABLES)
+        parametros = tuple(datos.get(columna) for columna in COLUMNAS_EDITABLES) + (registro_id,)
+        return self.ejecutar(f"UPDATE registros SET {asignaciones} WHERE id = ?", parametros).rowcount > 0
+
+    def eliminar(self, registro_id):
+        """Eliminar un registro; False si no existe"""
+        return self.ejecutar('DELETE FROM registros WHERE id = ?', (registro_id,)).rowcount > 0
+
+    def _filtros(self, farmacia, fecha_inicio=None, fecha_fin=None, laboratorio=None, medicamento=None):
+        """Condiciones WHERE y parámetros de los filtros de búsqueda
+
+        fecha_inicio y fecha_fin ('YYYY-MM-DD') son días locales completos: desde
+        la medianoche del primero hasta antes de la medianoche siguiente al último.
+        """
+        condiciones = ['farmacia = ?']
+        parametros = [farmacia]
+
+        if fecha_inicio:
+            condiciones.append('fecha_ingreso_ts >= ?')
+            parametros.append(valor_instante(inicio_dia(fecha_inicio), self.motor))
+        if fecha_fin:
+            condiciones.append('fecha_ingreso_ts < ?')
+            parametros.append(valor_instante(inicio_dia(fecha_fin) + timedelta(days=1), self.motor))
+
+        terminos = self._terminos_texto(laboratorio, medicamento)
+        if self.motor == 'postgresql':
+            # Con pg_trgm, ILIKE '%x%' usa los índices GIN de trigramas
+            for columna, termino in terminos.items():
+                condiciones.append(f'{columna} ILIKE ?')
+                parametros.append(f'%{termino}%')
+            return condiciones, parametros
+
+        indexados = {columna: termino for columna, termino in terminos.items()
+                     if len(termino) >= LARGO_MINIMO_TEXTO and self._texto_indexado()}
+        if indexados:
+            condiciones.append('id IN (SELECT rowid FROM registros_fts WHERE registros_fts MATCH ?)')
+            parametros.append(consulta_fts(indexados))
+        for columna, termino in terminos.items():
+            if columna not in indexados:
+                condiciones.append(f'{columna} LIKE ?')
+                parametros.append(f'%{termino}%')
+
+        return condiciones, parametros
+
+    @staticmethod
+    def _terminos_texto(laboratorio, medicamento):
+        """Filtros de texto no vacíos: {columna: término}"""
+        terminos = {'laboratorio': laboratorio, 'medicamento': medicamento}
+        return {columna: termino.strip() for columna, termino in terminos.items() if termino and termino.strip()}
+
+    def _texto_indexado(self):
+        """Indicar si la base tiene la búsqueda de texto de la migración 6"""
+        if self._indice_texto is None:
+            if self.motor == 'postgresql':
+                sql = "SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'"
+            else:
+                sql = "SELECT 1 FROM sqlite_master WHERE name = 'registros_fts'"
+            self._indice_texto = self.ejecutar(sql).fetchone() is not None
+        return self._indice_texto
+
+    def _orden(self, orden, laboratorio=None, medicamento=None, **_):
+        """Expresión de orden, sus parámetros y si es descendente
+
+        'relevancia' ordena por bm25 (SQLite) o por similitud de trigramas
+        (PostgreSQL) frente a los filtros de texto; sin filtros de texto que
+        usen el índice se ordena por fecha.
+        """
+        if orden == ORDEN_RELEVANCIA:
+            terminos = self._terminos_texto(laboratorio, medicamento)
+            if self.motor == 'postgresql' and terminos and self._texto_indexado():
+                similitud = ' + '.join(f'similarity({columna}, ?)' for columna in terminos)
+                return f'CAST({similitud} AS DOUBLE PRECISION)', list(terminos.values()), True
+
+            indexados = {columna: termino for columna, termino in terminos.items()
+                         if len(termino) >= LARGO_MINIMO_TEXTO}
+            if self.motor != 'postgresql' and indexados and self._texto_indexado():
+                # rank es menor cuanto más relevante
+                expresion = ('(SELECT rank FROM registros_fts WHERE registros_fts MATCH ? '
+                             'AND rowid = registros.id)')
+                return expresion, [consulta_fts(indexados)], False
+            orden = ORDEN_PREDETERMINADO
+
+        columna, descendente = ORDENES_REGISTROS[orden]
+        return columna, [], descendente
+
+    def buscar(self, farmacia, fecha_inicio=None, fecha_fin=None, laboratorio=None, medicamento=None,
+               limite=None):
+        """Registros de una farmacia con filtros opcionales, del más reciente al más antiguo"""
+        condiciones, parametros = self._filtros(farmacia, fecha_inicio, fecha_fin, laboratorio, medicamento)
+        sql = f"{_SELECT_REGISTROS} WHERE {' AND '.join(condiciones)} ORDER BY fecha_ingreso_ts DESC, id DESC"
+        if limite is not None:
+            sql += ' LIMIT ?'
+            parametros.append(int(limite))
+
+        return [_fila_a_registro(fila) for fila in self.ejecutar(sql, parametros).fetchall()]
+
+    def buscar_pagina(self, farmacia, orden=ORDEN_PREDETERMINADO, despues_de=None, limite=100, contar=False,
+                      **filtros):
+        """Una página de registros en el orden pedido (paginación por clave)
+
+        despues_de es la clave (valor de la columna de orden, id) de la última
+        fila de la página anterior: la página siguiente empieza justo después,
+        con una búsqueda en el índice, sin recorrer las páginas anteriores como
+        haría OFFSET.
+
+        Devuelve (registros, clave de la última fila o None si no hay más,
+        total). total es (cantidad, exacta) si contar es True: se cuentan como
+        máximo MAX_CONTEO filas, para que el conteo no cueste más que la página.
+        """
+        expresion, parametros_orden, descendente = self._orden(orden, **filtros)
+        condiciones, parametros = self._filtros(farmacia, **filtros)
+        total = None
+
+        if contar:
+            tope = self.ejecutar(
+                f"SELECT COUNT(*) FROM (SELECT 1 FROM registros WHERE {' AND '.join(condiciones)} "
+                f"LIMIT {MAX_CONTEO + 1}) AS conteo",
+                parametros
+            ).fetchone()[0]
+            total = (min(tope, MAX_CONTEO), tope <= MAX_CONTEO)
+
+        if despues_de is not None:
+            condiciones.append(f"({expresion}, id) {'<' if descendente else '>'} (?, ?)")
+            parametros.extend(parametros_orden + list(despues_de))
+
+        sentido = 'DESC' if descendente else 'ASC'
+        sql = (f"SELECT {', '.join(COLUMNAS_REGISTRO)}, {expresion} AS clave_orden FROM registros "
+               f"WHERE {' AND '.join(condiciones)} ORDER BY clave_orden {sentido}, id {sentido} LIMIT ?")
+        filas = self.ejecutar(sql, parametros_orden + parametros + [int(limite) + 1]).fetchall()
+
+        siguiente = None
+        if len(filas) > limite:
+            filas = filas[:limite]
+            siguiente = (filas[-1][-1], filas[-1][0])
+        return [_fila_a_registro(fila[:-1]) for fila in filas], siguiente, total
+
+    def todos(self):
+        """Todos los registros de todas las farmacias, por id"""
+        return [_fila_a_registro(fila) for fila in self.ejecutar(f"{_SELECT_REGISTROS} ORDER BY id").fetchall()]
+
+
+class RepositorioInventario(Repositorio):
+    """Tabla inventario heredada (el catálogo vigente se lee del CSV en memoria)"""
+
+    def contar_sin_stock(self):
+        return self.ejecutar('SELECT COUNT(*) FROM inventario WHERE stock = 0').fetchone()[0]
+
+    def eliminar_sin_stock(self):
+        return self.ejecutar('DELETE FROM inventario WHERE stock = 0').rowcount
+
+    def reemplazar(self, productos):
+        """Reemplazar el contenido por (laboratorio, medicamento, presentacion, precio, stock)"""
+        self.ejecutar('DELETE FROM inventario')
+        filas = list(productos)
+        self.ejecutar_varios(
+            'INSERT INTO inventario (laboratorio, medicamento, presentacion, precio, stock) VALUES (?, ?, ?, ?, ?)',
+            filas
+        )
+        return len(filas)
@@ -8,22 +8,16 @@ from datetime import datetime
 import tempfile
 
 # Importar funciones de la aplicación principal
-from app import get_db_connection, DATABASE_TYPE
+from app import get_repositorio, get_repositorio_inventario
+from repositorio_registros import COLUMNAS_REGISTRO
+from parser_inventario import leer_productos
 
 def backup_registros():
     """Crear backup de registros antes de sincronizar"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
         # Obtener todos los registros
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('SELECT * FROM registros')
-        else:
-            cursor.execute('SELECT * FROM registros')
-        
-        registros = cursor.fetchall()
-        conn.close()
+        with get_repositorio() as repositorio:
+            registros = repositorio.todos()
         
         # Crear backup
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -31,9 +25,7 @@ def backup_registros():
         
         with open(backup_file, 'w', newline='', encoding='utf-8') as file:
             writer = csv.writer(file)
-            writer.writerow(['id', 'medicamento', 'cantidad', 'precio', 'fecha', 'fecha_ingreso', 
-                           'observaciones', 'laboratorio', 'tipo_movimiento', 'fecha_vencimiento', 
-                           'lote', 'medico', 'junta_vigilancia', 'numero_inscripcion_clinica'])
+            writer.writerow(COLUMNAS_REGISTRO)
             writer.writerows(registros)
         
         print(f"Backup creado: {backup_file}")
@@ -49,55 +41,40 @@ def sincronizar_inventario():
         if not os.path.exists('INVENTARIO PARA TRABAJO.csv'):
             return False, "Archivo 'INVENTARIO PARA TRABAJO.csv' no encontrado"
         
-        # Leer CSV
-        inventario_csv = []
-        with open('INVENTARIO PARA TRABAJO.csv', 'r', encoding='utf-8') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                inventario_csv.append(row)
+        # Leer los productos del archivo exportado con el parser compartido
+        inventario_csv = [
+            {
+                'laboratorio': producto.laboratorio,
+                'medicamento': producto.nombre,
+                'presentacion': producto.modelo,
+                'precio': 0.0,
+                'stock': 1
+            }
+            for producto in leer_productos('INVENTARIO PARA TRABAJO.csv')
+        ]
         
         if not inventario_csv:
             return False, "El archivo CSV está vacío"
         
-        # Conectar a la base de datos
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Limpiar inventario actual
-        if DATABASE_TYPE == 'postgresql':
-            cursor.execute('DELETE FROM inventario')
-        else:
-            cursor.execute('DELETE FROM inventario')
-        
-        # Insertar nuevos datos
-        registros_insertados = 0
+        # Preparar los nuevos datos
+        productos = []
         for item in inventario_csv:
             try:
-                laboratorio = item.get('laboratorio', '')
-                medicamento = item.get('medicamento', '')
-                presentacion = item.get('presentacion', '')
-                precio = float(item.get('precio', 0))
-                stock = int(item.get('stock', 0))
-                
-                if DATABASE_TYPE == 'postgresql':
-                    cursor.execute('''
-                        INSERT INTO inventario (laboratorio, medicamento, presentacion, precio, stock)
-                        VALUES (%s, %s, %s, %s, %s)
-                    ''', (laboratorio, medicamento, presentacion, precio, stock))
-                else:
-                    cursor.execute('''
-                        INSERT INTO inventario (laboratorio, medicamento, presentacion, precio, stock)
-                        VALUES (?, ?, ?, ?, ?)
-                    ''', (laboratorio, medicamento, presentacion, precio, stock))
-                
-                registros_insertados += 1
-                
+                productos.append((
+                    item.get('laboratorio', ''),
+                    item.get('medicamento', ''),
+                    item.get('presentacion', ''),
+                    float(item.get('precio', 0)),
+                    int(item.get('stock', 0))
+                ))
             except Exception as e:
-                print(f"Error al insertar {medicamento}: {e}")
+                print(f"Error al preparar {item.get('medicamento', '')}: {e}")
                 continue
         
-        conn.commit()
-        conn.close()
+        # Reemplazar el inventario actual
+        with get_repositorio_inventario() as inventario:
+            registros_insertados = inventario.reemplazar(productos)
+            inventario.commit()
         
         return True, f"Inventario sincronizado exitosamente. {registros_insertados} registros insertados."
         
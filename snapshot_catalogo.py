@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Snapshot binario del catálogo de inventario ya procesado.
+
+El snapshot guarda los productos (con el stock y precio ya combinados del
+reporte de existencias), las categorías, el índice de trigramas y lo que más
+cuesta calcular al cargar: los nombres y laboratorios normalizados, las
+huellas y la versión del catálogo y el índice de prefijos del autocompletado.
+Un proceso nuevo (por ejemplo un arranque en frío en Vercel) lo abre con mmap
+en lugar de parsear el CSV y reconstruir esos índices.
+
+Lo demás se sigue construyendo al cargar porque es barato y se deriva de los
+productos: el catálogo en columnas de NumPy, el índice por laboratorio (con
+las claves ya normalizadas), el índice por código y el árbol de categorías.
+El CSV solo se parsea cuando el snapshot no existe, es de otra versión de
+formato o no corresponde al CSV o al reporte de existencias actuales (tamaño y
+SHA-256).
+
+Uso (paso de build/subida):
+    python snapshot_catalogo.py
+"""
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+
+# Archivo del snapshot junto al CSV de inventario
+SNAPSHOT_PATH = 'catalogo.snapshot'
+
+# Cambiar la versión cuando cambie el formato o la normalización de los índices
+VERSION_FORMATO = 5
+MAGIC = b'FCAT'
+
+# magic, versión, tamaño y SHA-256 del CSV, tamaño y SHA-256 del reporte de
+# existencias (ceros si no hay), productos, trigramas, k_max del índice de
+# prefijos, versión del catálogo
+_CABECERA = struct.Struct('<4sHQ32sQ32sIII16s')
+
+# Secciones en orden fijo; la tabla de secciones guarda (desplazamiento, longitud)
+_SECCIONES = (
+    'codigos', 'codigos_desp',
+    'nombres', 'nombres_desp',
+    'modelos', 'modelos_desp',
+    'laboratorios', 'laboratorios_desp',
+    'precio', 'stock',
+    'categorias_codigos', 'categorias_codigos_desp',
+    'categorias_nombres', 'categorias_nombres_desp',
+    'trigramas', 'trigramas_desp',
+    'posiciones', 'posiciones_desp',
+    'nombres_busqueda', 'nombres_busqueda_desp',
+    'laboratorios_busqueda', 'laboratorios_busqueda_desp',
+    'huellas_codigos', 'huellas_codigos_desp',
+    'huellas', 'huellas_desp',
+    'prefijos_claves', 'prefijos_claves_desp',
+    'prefijos_rangos', 'prefijos_posiciones',
+    'frecuentes', 'frecuentes_desp',
+    'frecuentes_posiciones', 'frecuentes_posiciones_desp'
+)
+_ENTRADA_SECCION = struct.Struct('<QQ')
+
+
+def huella_csv(ruta_csv):
+    """Obtener (tamaño, SHA-256) del CSV de inventario"""
+    sha = hashlib.sha256()
+    tamano = 0
+    with open(ruta_csv, 'rb') as file:
+        for bloque in iter(lambda: file.read(1024 * 1024), b''):
+            sha.update(bloque)
+            tamano += len(bloque)
+    return tamano, sha.digest()
+
+
+def _textos_a_bytes(textos):
+    """Unir textos en un blob UTF-8 con desplazamientos en caracteres"""
+    desplazamientos = array('I', [0])
+    total = 0
+    for texto in textos:
+        total += len(texto)
+        desplazamientos.append(total)
+    return ''.join(textos).encode('utf-8'), desplazamientos.tobytes()
+
+
+def _bytes_a_textos(blob, desplazamientos):
+    """Separar un blob UTF-8 en textos usando sus desplazamientos"""
+    texto = bytes(blob).decode('utf-8')
+    desp = desplazamientos.cast('I')
+    return [texto[desp[i]:desp[i + 1]] for i in range(len(desp) - 1)]
+
+
+def huella_existencias(ruta_existencias):
+    """Obtener (tamaño, SHA-256) del reporte de existencias o ceros si no existe"""
+    if ruta_existencias is None or not os.path.exists(ruta_existencias):
+        return 0, b'\0' * 32
+    return huella_csv(ruta_existencias)
+
+
+def _listas_a_bytes(listas):
+    """Unir listas de enteros en un arreglo con sus desplazamientos"""
+    valores = array('I')
+    desplazamientos = array('I', [0])
+    for lista in listas:
+        valores.extend(lista)
+        desplazamientos.append(len(valores))
+    return valores.tobytes(), desplazamientos.tobytes()
+
+
+def _bytes_a_listas(valores, desplazamientos):
+    """Separar un arreglo de enteros en listas usando sus desplazamientos"""
+    lista = valores.cast('I').tolist()
+    desp = desplazamientos.cast('I')
+    return [lista[desp[i]:desp[i + 1]] for i in range(len(desp) - 1)]
+
+
+def guardar_snapshot(catalogo, ruta_csv, ruta_snapshot=SNAPSHOT_PATH, ruta_existencias=None):
+    """Escribir el snapshot de un CatalogoInventario (de forma atómica)"""
+    tamano_csv, sha_csv = huella_csv(ruta_csv)
+    tamano_existencias, sha_existencias = huella_existencias(ruta_existencias)
+    productos = catalogo.productos
+    indice_trigramas = catalogo.indice_trigramas
+    prefijos = catalogo.indice_prefijos
+
+    claves = sorted(indice_trigramas)
+    posiciones, posiciones_desp = _listas_a_bytes(sorted(indice_trigramas[clave]) for clave in claves)
+
+    secciones = {}
+    for campo in ('codigo', 'nombre', 'modelo', 'laboratorio'):
+        blob, desp = _textos_a_bytes([p[campo] for p in productos])
+        secciones[campo + 's'] = blob
+        secciones[campo + 's_desp'] = desp
+    secciones['precio'] = array('d', (float(p['precio']) for p in productos)).tobytes()
+    secciones['stock'] = array('d', (float(p['stock']) for p in productos)).tobytes()
+    secciones['categorias_codigos'], secciones['categorias_codigos_desp'] = _textos_a_bytes(
+        [codigo for codigo, _ in catalogo.categorias])
+    secciones['categorias_nombres'], secciones['categorias_nombres_desp'] = _textos_a_bytes(
+        [nombre for _, nombre in catalogo.categorias])
+    secciones['trigramas'], secciones['trigramas_desp'] = _textos_a_bytes(claves)
+    secciones['posiciones'], secciones['posiciones_desp'] = posiciones, posiciones_desp
+
+    secciones['nombres_busqueda'], secciones['nombres_busqueda_desp'] = _textos_a_bytes(catalogo.nombres_busqueda)
+    secciones['laboratorios_busqueda'], secciones['laboratorios_busqueda_desp'] = _textos_a_bytes(
+        catalogo.laboratorios_busqueda)
+    secciones['huellas_codigos'], secciones['huellas_codigos_desp'] = _textos_a_bytes(list(catalogo.huellas))
+    secciones['huellas'], secciones['huellas_desp'] = _textos_a_bytes(list(catalogo.huellas.values()))
+
+    secciones['prefijos_claves'], secciones['prefijos_claves_desp'] = _textos_a_bytes(prefijos['claves'])
+    secciones['prefijos_rangos'] = array('I', prefijos['rangos']).tobytes()
+    secciones['prefijos_posiciones'] = array('I', prefijos['posiciones']).tobytes()
+    secciones['frecuentes'], secciones['frecuentes_desp'] = _textos_a_bytes(list(prefijos['frecuentes']))
+    secciones['frecuentes_posiciones'], secciones['frecuentes_posiciones_desp'] = _listas_a_bytes(
+        prefijos['frecuentes'].values())
+
+    cabecera = _CABECERA.pack(MAGIC, VERSION_FORMATO, tamano_csv, sha_csv,
+                              tamano_existencias, sha_existencias, len(productos), len(claves),
+                              prefijos['k_max'], (catalogo.version or '').encode('ascii'))
+    inicio_datos = len(cabecera) + _ENTRADA_SECCION.size * len(_SECCIONES)
+
+    tabla = b''
+    datos = b''
+    for nombre in _SECCIONES:
+        # Alinear cada sección a 8 bytes para poder leerla como arreglo
+        datos += b'\0' * (-(inicio_datos + len(datos)) % 8)
+        tabla += _ENTRADA_SECCION.pack(inicio_datos + len(datos), len(secciones[nombre]))
+        datos += secciones[nombre]
+
+    temporal = ruta_snapshot + '.tmp'
+    with open(temporal, 'wb') as file:
+        file.write(cabecera + tabla + datos)
+    os.replace(temporal, ruta_snapshot)
+    return True
+
+
+class IndiceTrigramasMapeado:
+    """Índice de trigramas leído directamente del snapshot en memoria mapeada
+
+    Las posiciones de cada trigrama se convierten a conjunto solo la primera
+    vez que se consultan.
+    """
+
+    def __init__(self, mapa, claves, posiciones, posiciones_desp):
+        self._mapa = mapa  # Mantener vivo el mmap mientras se use el índice
+        self._fila_por_clave = {clave: i for i, clave in enumerate(claves)}
+        self._posiciones = posiciones.cast('I')
+        self._desp = posiciones_desp.cast('I')
+        self._cache = {}
+
+    def __len__(self):
+        return len(self._fila_por_clave)
+
+    def __contains__(self, clave):
+        return clave in self._fila_por_clave
+
+    def __iter__(self):
+        return iter(self._fila_por_clave)
+
+    def __getitem__(self, clave):
+        conjunto = self.get(clave)
+        if conjunto is None:
+            raise KeyError(clave)
+        return conjunto
+
+    def get(self, clave, defecto=None):
+        conjunto = self._cache.get(clave)
+        if conjunto is not None:
+            return conjunto
+        fila = self._fila_por_clave.get(clave)
+        if fila is None:
+            return defecto
+        conjunto = frozenset(self._posiciones[self._desp[fila]:self._desp[fila + 1]])
+        self._cache[clave] = conjunto
+        return conjunto
+
+
+def _cerrar_mapa(mapa):
+    """Cerrar el mmap de un snapshot que no se usará"""
+    try:
+        mapa.close()
+    except BufferError:
+        # Aún hay vistas sobre el mapa; se libera cuando se liberen ellas
+        pass
+
+
+def cargar_snapshot(ruta_csv, ruta_snapshot=SNAPSHOT_PATH, ruta_existencias=None):
+    """Cargar el snapshot si existe y corresponde al CSV y al reporte de existencias actuales
+
+    Devuelve {'productos': [...], 'categorias': [...], 'indice_trigramas': ...,
+    'precalculados': {...}} o None si hay que parsear el CSV. 'precalculados'
+    se pasa tal cual a CatalogoInventario.
+
+    Quedan como vistas sobre el mmap (se leen al consultarlas) las posiciones
+    del índice de trigramas y los rangos y posiciones del índice de prefijos.
+    Los productos, las categorías y los textos normalizados se copian a
+    listas y diccionarios de Python, que es lo que usa el resto del catálogo.
+    Si el snapshot no sirve, el mmap se cierra antes de devolver None.
+    """
+    if not os.path.exists(ruta_snapshot) or not os.path.exists(ruta_csv):
+        return None
+
+    mapa = None
+    resultado = None
+    try:
+        with open(ruta_snapshot, 'rb') as file:
+            mapa = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version = struct.unpack_from('<4sH', mapa, 0)
+        if magic != MAGIC or version != VERSION_FORMATO:
+            print(f"Snapshot de catálogo con formato distinto ({version}), se usará el CSV")
+            return None
+        cabecera = _CABECERA.unpack_from(mapa, 0)
+        tamano_csv, sha_csv, tamano_existencias, sha_existencias = cabecera[2:6]
+
+        if (tamano_csv, sha_csv) != huella_csv(ruta_csv):
+            print("Snapshot de catálogo desactualizado, se usará el CSV")
+            return None
+
+        if (tamano_existencias, sha_existencias) != huella_existencias(ruta_existencias):
+            print("Snapshot de catálogo con otras existencias, se usará el CSV")
+            return None
+
+        resultado = _leer_secciones(mapa, *cabecera[6:])
+        return resultado
+
+    except Exception as e:
+        print(f"Error al leer snapshot de catálogo: {e}")
+        return None
+    finally:
+        if resultado is None and mapa is not None:
+            _cerrar_mapa(mapa)
+
+
+def _leer_secciones(mapa, total_productos, total_trigramas, k_max, version_catalogo):
+    """Leer las secciones de un snapshot ya validado (ver cargar_snapshot())"""
+    vista = memoryview(mapa)
+    secciones = {}
+    for i, nombre in enumerate(_SECCIONES):
+        desp, longitud = _ENTRADA_SECCION.unpack_from(vista, _CABECERA.size + i * _ENTRADA_SECCION.size)
+        secciones[nombre] = vista[desp:desp + longitud]
+
+    def textos(nombre):
+        return _bytes_a_textos(secciones[nombre], secciones[nombre + '_desp'])
+
+    columnas = {campo: textos(campo + 's') for campo in ('codigo', 'nombre', 'modelo', 'laboratorio')}
+    precios = secciones['precio'].cast('d')
+    stocks = secciones['stock'].cast('d')
+
+    productos = [
+        {
+            'codigo': columnas['codigo'][i],
+            'nombre': columnas['nombre'][i],
+            'modelo': columnas['modelo'][i],
+            'laboratorio': columnas['laboratorio'][i],
+            'precio': precios[i],
+            'stock': stocks[i]
+        }
+        for i in range(total_productos)
+    ]
+
+    categorias = list(zip(textos('categorias_codigos'), textos('categorias_nombres')))
+
+    claves = textos('trigramas')
+    if len(claves) != total_trigramas:
+        raise ValueError(f"El snapshot tiene {len(claves)} trigramas y la cabecera dice {total_trigramas}")
+    indice = IndiceTrigramasMapeado(mapa, claves, secciones['posiciones'], secciones['posiciones_desp'])
+
+    frecuentes = _bytes_a_listas(secciones['frecuentes_posiciones'], secciones['frecuentes_posiciones_desp'])
+    precalculados = {
+        'nombres_busqueda': textos('nombres_busqueda'),
+        'laboratorios_busqueda': textos('laboratorios_busqueda'),
+        'huellas': dict(zip(textos('huellas_codigos'), textos('huellas'))),
+        'version': version_catalogo.decode('ascii') or None,
+        'indice_prefijos': {
+            'claves': textos('prefijos_claves'),
+            # Vistas sobre el mmap: buscar_prefijo solo indexa y rebana
+            'rangos': secciones['prefijos_rangos'].cast('I'),
+            'posiciones': secciones['prefijos_posiciones'].cast('I'),
+            'frecuentes': dict(zip(textos('frecuentes'), frecuentes)),
+            'k_max': k_max
+        }
+    }
+
+    return {'productos': productos, 'categorias': categorias, 'indice_trigramas': indice,
+            'precalculados': precalculados}
+
+
+def generar_snapshot(ruta_snapshot=SNAPSHOT_PATH):
+    """Parsear el CSV de inventario y escribir su snapshot"""
+    import inventario_simple
+
+    if not inventario_simple.cargar_inventario(usar_snapshot=False):
+        print("No se pudo cargar el inventario para generar el snapshot")
+        return False
+
+    catalogo = inventario_simple.CATALOGO
+    guardar_snapshot(catalogo, inventario_simple.CSV_PATH, ruta_snapshot, inventario_simple.XLSX_PATH)
+    print(f"Snapshot generado: {ruta_snapshot} ({len(catalogo.productos)} productos)")
+    return True
+
+
+if __name__ == "__main__":
+    generar_snapshot()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Script de prueba de los endpoints de la aplicación con el cliente de pruebas
+de Flask (sin levantar el servidor)
+"""
+
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+
+# La aplicación no debe migrar farmacia.db ni vigilar el inventario
+os.environ['MIGRAR_AL_INICIAR'] = 'false'
+os.environ['VIGILANTE_CATALOGO'] = 'false'
+
+import app as aplicacion
+import inventario_simple
+from conexiones_db import PoolSQLite
+from migraciones import aplicar_migraciones
+
+
+def _producto(codigo, nombre, stock):
+    return {'codigo': codigo, 'nombre': nombre, 'modelo': 'CAJA', 'laboratorio': 'GENFAR',
+            'precio': 1.0, 'stock': stock}
+
+
+def _publicar(productos):
+    """Publicar un catálogo de prueba y devolver el vigente para restaurarlo"""
+    anterior = inventario_simple.CATALOGO
+    inventario_simple.CATALOGO = inventario_simple.CatalogoInventario(
+        productos, firma=inventario_simple.firma_fuentes(), generacion=anterior.generacion + 1, origen='prueba'
+    )
+    return anterior
+
+
+def test_inventario_filtros_stock():
+    """Verificar que sin_stock es exactamente 0 y stock_bajo es 0 < stock < 10"""
+    print("\n🔍 Probando filtros de stock de /api/inventario...")
+    anterior = _publicar([
+        _producto('010101001', 'NEGATIVO', -3.0),
+        _producto('010101002', 'CERO', 0.0),
+        _producto('010101003', 'MEDIO', 0.5),
+        _producto('010101004', 'CASI DIEZ', 9.5),
+        _producto('010101005', 'DIEZ', 10.0),
+    ])
+    try:
+        cliente = aplicacion.app.test_client()
+
+        def nombres(consulta):
+            return [p['medicamento'] for p in cliente.get(f'/api/inventario?{consulta}').get_json()]
+
+        assert nombres('sin_stock=true') == ['CERO']
+        assert nombres('stock_bajo=true') == ['CASI DIEZ', 'MEDIO']
+        assert nombres('stock_bajo=true&sin_stock=true') == []
+    finally:
+        inventario_simple.CATALOGO = anterior
+
+    print("✅ Filtros de stock correctos")
+
+
+def test_typeahead_limite():
+    """Verificar que /api/typeahead respeta k: nada con k <= 0 y como máximo TYPEAHEAD_K_MAX"""
+    print("\n🔍 Probando límite de /api/typeahead...")
+    cliente = aplicacion.app.test_client()
+    for consulta in ('q=acido%20f&k=0', 'q=ac&k=-5'):
+        assert cliente.get(f'/api/typeahead?{consulta}').get_json() == [], consulta
+    assert len(cliente.get('/api/typeahead?q=ac&k=1').get_json()) == 1
+    assert len(cliente.get('/api/typeahead?q=ac&k=999').get_json()) == inventario_simple.TYPEAHEAD_K_MAX
+
+    print("✅ Límite de autocompletado correcto")
+
+
+def test_importar_app_sin_vigilante():
+    """Verificar que importar app desde un script no inicia el vigilante del catálogo"""
+    print("\n🔍 Probando que importar app no inicia el vigilante...")
+    entorno = dict(os.environ, VIGILANTE_CATALOGO='true', MIGRAR_AL_INICIAR='false')
+    codigo = 'import app, vigilante_catalogo; print(vigilante_catalogo.vigilante_activo())'
+    salida = subprocess.run([sys.executable, '-c', codigo], env=entorno, capture_output=True, text=True, timeout=120)
+    assert salida.returncode == 0, salida.stderr
+    assert salida.stdout.strip().splitlines()[-1] == 'False', salida.stdout
+
+    print("✅ El vigilante solo arranca al atender solicitudes")
+
+
+def test_conexion_sqlite_entre_hilos():
+    """Verificar que solicitudes atendidas en hilos distintos reutilizan la conexión SQLite"""
+    print("\n🔍 Probando reutilización de conexiones SQLite entre solicitudes...")
+    descriptor, ruta = tempfile.mkstemp(suffix='.db')
+    os.close(descriptor)
+    anterior = aplicacion.POOL_DB
+    try:
+        conn = sqlite3.connect(ruta)
+        aplicar_migraciones(conn, 'sqlite')
+        conn.close()
+        aplicacion.POOL_DB = PoolSQLite(ruta, maximo=2)
+        cliente = aplicacion.app.test_client()
+
+        # Como el servidor de Flask: cada solicitud en un hilo nuevo
+        respuestas = []
+        for _ in range(2):
+            hilo = threading.Thread(target=lambda: respuestas.append(cliente.get('/api/registros').status_code))
+            hilo.start()
+            hilo.join()
+
+        estado = aplicacion.POOL_DB.get_estado()
+        assert respuestas == [200, 200], respuestas
+        assert estado['creadas'] == 1 and estado['reutilizadas'] == 1 and estado['en_uso'] == 0, estado
+        aplicacion.POOL_DB.cerrar()
+    finally:
+        aplicacion.POOL_DB = anterior
+        for sufijo in ('', '-wal', '-shm'):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+
+    print("✅ Una conexión para dos solicitudes en hilos distintos")
+
+
+def main():
+    """Función principal de pruebas"""
+    print("🧪 INICIANDO PRUEBAS DE LA API")
+    print("=" * 50)
+
+    tests = [
+        test_inventario_filtros_stock,
+        test_typeahead_limite,
+        test_importar_app_sin_vigilante,
+        test_conexion_sqlite_entre_hilos
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Prueba {test.__name__} falló: {e}")
+        except Exception as e:
+            print(f"❌ Error en prueba {test.__name__}: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📈 RESULTADOS: {passed}/{len(tests)} pruebas pasaron")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,496 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar el pool de conexiones, la reutilización de
+conexiones SQLite por hilo, el repositorio de registros y las migraciones
+"""
+
+import os
+import sqlite3
+import tempfile
+import threading
+
+from conexiones_db import PoolConexiones, PoolSQLite, ConexionesPorHilo, copiar_sqlite
+from repositorio_registros import (
+    RepositorioRegistros, Registro, traducir, ORDENES_REGISTROS, codificar_cursor, decodificar_cursor,
+    instante_ingreso, valor_instante
+)
+from escritura_agrupada import EscritorAgrupado
+from migraciones import aplicar_migraciones, columnas_tabla, VERSION_ACTUAL
+
+
+def _ruta_temporal():
+    """Crear una base de datos SQLite temporal con una tabla de prueba"""
+    descriptor, ruta = tempfile.mkstemp(suffix='.db')
+    os.close(descriptor)
+    conn = sqlite3.connect(ruta)
+    conn.execute('CREATE TABLE registros (id INTEGER PRIMARY KEY, medicamento TEXT)')
+    conn.commit()
+    conn.close()
+    return ruta
+
+
+def _borrar(ruta):
+    """Eliminar una base temporal con sus archivos -wal y -shm"""
+    for sufijo in ('', '-wal', '-shm'):
+        if os.path.exists(ruta + sufijo):
+            os.remove(ruta + sufijo)
+
+
+def test_pool_reutiliza_y_acota():
+    """Verificar reutilización, límite de conexiones y espera agotada"""
+    print("🔍 Probando pool de conexiones...")
+    ruta = _ruta_temporal()
+    try:
+        pool = PoolConexiones(lambda: sqlite3.connect(ruta, check_same_thread=False), maximo=2, espera_maxima=0.05)
+
+        primera = pool.obtener()
+        subyacente = primera._entrada.conexion
+        primera.execute("INSERT INTO registros (medicamento) VALUES ('sin confirmar')")
+        primera.close()
+
+        segunda = pool.obtener()
+        assert segunda._entrada.conexion is subyacente, "La conexión debe reutilizarse"
+        assert segunda.execute('SELECT COUNT(*) FROM registros').fetchone()[0] == 0, "close() deshace lo no confirmado"
+
+        tercera = pool.obtener()
+        try:
+            pool.obtener()
+            assert False, "El pool no debe pasar de su máximo"
+        except Exception as e:
+            assert 'No hay conexiones libres' in str(e)
+
+        # Al devolver una conexión, quien espera la recibe
+        hilo = threading.Timer(0.01, tercera.close)
+        pool.espera_maxima = 2
+        hilo.start()
+        cuarta = pool.obtener()
+        hilo.join()
+        cuarta.close()
+        segunda.close()
+
+        estado = pool.get_estado()
+        assert estado['creadas'] == 2 and estado['reutilizadas'] == 2, estado
+        assert estado['esperas_agotadas'] == 1 and estado['en_uso'] == 0, estado
+        assert estado['espera_maxima_ms'] > 0
+        pool.cerrar()
+    finally:
+        _borrar(ruta)
+
+    print(f"✅ Pool: {estado['creadas']} creadas, {estado['reutilizadas']} reutilizadas")
+
+
+def test_pool_vida_y_verificacion():
+    """Verificar que se reemplazan las conexiones vencidas o rotas"""
+    print("\n🔍 Probando vida máxima y verificación del pool...")
+    ruta = _ruta_temporal()
+    try:
+        pool = PoolConexiones(lambda: sqlite3.connect(ruta, check_same_thread=False), max_vida=0)
+        conn = pool.obtener()
+        conn.close()
+        assert pool.get_estado()['descartadas'] == 1, "Una conexión vencida no vuelve al pool"
+
+        pool = PoolConexiones(lambda: sqlite3.connect(ruta, check_same_thread=False), verificar_despues=0)
+        conn = pool.obtener()
+        subyacente = conn._entrada.conexion
+        conn.close()
+        subyacente.close()  # la conexión se cae mientras está libre
+
+        conn = pool.obtener()
+        assert conn._entrada.conexion is not subyacente
+        assert conn.execute('SELECT 1').fetchone() == (1,)
+        conn.close()
+        assert pool.get_estado()['fallas_verificacion'] == 1
+        pool.cerrar()
+    finally:
+        _borrar(ruta)
+
+    print("✅ Conexiones vencidas y rotas reemplazadas")
+
+
+def test_conexiones_por_hilo():
+    """Verificar que cada hilo reutiliza su conexión SQLite"""
+    print("\n🔍 Probando conexiones SQLite por hilo...")
+    ruta = _ruta_temporal()
+    try:
+        conexiones = ConexionesPorHilo(ruta)
+
+        conn = conexiones.obtener()
+        subyacente = conn._entrada.conexion
+        conn.execute("INSERT INTO registros (medicamento) VALUES ('A')")
+        conn.commit()
+        conn.close()
+
+        conn = conexiones.obtener()
+        assert conn._entrada.conexion is subyacente, "El hilo debe reutilizar su conexión"
+
+        # Una segunda conexión pedida mientras la primera sigue prestada es aparte
+        anidada = conexiones.obtener()
+        assert anidada._entrada.conexion is not subyacente
+        anidada.close()
+        conn.close()
+
+        otras = []
+        hilo = threading.Thread(target=lambda: otras.append(conexiones.obtener()._entrada.conexion))
+        hilo.start()
+        hilo.join()
+        assert otras[0] is not subyacente, "Cada hilo tiene su propia conexión"
+
+        estado = conexiones.get_estado()
+        assert estado['creadas'] == 2 and estado['reutilizadas'] == 1 and estado['temporales'] == 1, estado
+        conexiones.cerrar()
+    finally:
+        _borrar(ruta)
+
+    print(f"✅ {estado['prestadas']} préstamos con {estado['creadas']} conexiones")
+
+
+def test_perfil_sqlite():
+    """Verificar WAL, PRAGMAs, checkpoints y copia consistente"""
+    print("\n🔍 Probando perfil de conexiones SQLite...")
+    ruta = _ruta_temporal()
+    copia = ruta + '.copia'
+    try:
+        conexiones = PoolSQLite(ruta, checkpoint_cada=0)
+        conn = conexiones.obtener()
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+        assert conn.execute('PRAGMA synchronous').fetchone()[0] == 1  # NORMAL
+        assert conn.execute('PRAGMA busy_timeout').fetchone()[0] == 5000
+        conn.execute("INSERT INTO registros (medicamento) VALUES ('EN EL WAL')")
+        conn.commit()
+
+        # La copia incluye lo confirmado aunque siga en el archivo -wal
+        copiar_sqlite(ruta, copia)
+        otra = sqlite3.connect(copia)
+        assert otra.execute('SELECT medicamento FROM registros').fetchall() == [('EN EL WAL',)]
+        otra.close()
+
+        conn.close()
+        estado = conexiones.get_estado()
+        assert estado['checkpoints'] == 1 and estado['perfil']['journal_mode'] == 'WAL', estado
+        conexiones.cerrar()
+    finally:
+        _borrar(ruta)
+        _borrar(copia)
+
+    print(f"✅ WAL con {estado['paginas_checkpoint']} páginas volcadas")
+
+
+def test_repositorio_registros():
+    """Verificar las operaciones del repositorio de registros sobre SQLite"""
+    print("\n🔍 Probando repositorio de registros...")
+    ruta = _ruta_temporal()
+    try:
+        conn = sqlite3.connect(ruta)
+        conn.execute('DROP TABLE registros')
+        aplicar_migraciones(conn, 'sqlite')
+        conn.close()
+
+        conexiones = ConexionesPorHilo(ruta)
+        with RepositorioRegistros(conexiones.obtener(), 'sqlite') as registros:
+            for dia in (1, 2, 3):
+                registros.insertar({
+                    'laboratorio': 'GENFAR', 'medicamento': f'MED {dia}', 'cantidad': dia,
+                    'fecha': f'2025-01-0{dia}', 'fecha_ingreso': f'2025-01-0{dia}T10:00:00-06:00',
+                    'tipo_movimiento': None, 'farmacia': 'farmacia1'
+                })
+            registros.commit()
+
+        with RepositorioRegistros(conexiones.obtener(), 'sqlite') as registros:
+            encontrados = registros.buscar('farmacia1', fecha_inicio='2025-01-02', medicamento='MED')
+            assert [r.cantidad for r in encontrados] == [3, 2], "Filtrados y del más reciente al más antiguo"
+
+            # El día local termina a medianoche de -06:00, aunque en UTC ya sea el siguiente
+            limite = registros.insertar({
+                'laboratorio': 'GENFAR', 'medicamento': 'TARDE', 'cantidad': 1, 'fecha': '2025-01-02',
+                'fecha_ingreso': '2025-01-03T05:30:00+00:00', 'farmacia': 'farmacia1'
+            })
+            del_dia = registros.buscar('farmacia1', fecha_inicio='2025-01-02', fecha_fin='2025-01-02')
+            assert [r.id for r in del_dia] == [limite, 2], del_dia
+            assert registros.eliminar(limite)
+
+            registro = encontrados[0]
+            assert isinstance(registro, Registro) and registro.tipo_movimiento == 'VENTA' and registro.lote == ''
+
+            assert registros.actualizar(registro.id, {'laboratorio': 'MK', 'medicamento': 'X', 'cantidad': 7, 'fecha': 'hoy'})
+            assert registros.obtener(registro.id).cantidad == 7
+            assert registros.eliminar(registro.id) and not registros.existe(registro.id)
+            assert not registros.eliminar(registro.id)
+            registros.commit()
+            assert len(registros.todos()) == 2
+
+            # Un lote se inserta de una vez y devuelve los ids en el orden recibido
+            lote = [{'laboratorio': 'MK', 'medicamento': f'LOTE {i}', 'cantidad': i, 'fecha': '2025-01-04',
+                     'fecha_ingreso': '2025-01-04T10:00:00-06:00', 'farmacia': 'farmacia1'} for i in range(3)]
+            ids = registros.insertar_varios(lote)
+            registros.commit()
+            assert [registros.obtener(i).medicamento for i in ids] == ['LOTE 0', 'LOTE 1', 'LOTE 2'], ids
+        conexiones.cerrar()
+    finally:
+        _borrar(ruta)
+
+    assert traducir("SELECT * FROM registros WHERE lote LIKE '%A' AND id = ?", 'postgresql') == \
+        "SELECT * FROM registros WHERE lote LIKE '%%A' AND id = %s"
+
+    print("✅ Repositorio de registros correcto")
+
+
+def test_migraciones():
+    """Verificar que las migraciones completan una tabla antigua una sola vez"""
+    print("\n🔍 Probando migraciones del esquema...")
+    ruta = _ruta_temporal()
+    try:
+        # Tabla de una versión anterior, sin las columnas agregadas después
+        conn = sqlite3.connect(ruta)
+        conn.execute('DROP TABLE registros')
+        conn.execute('''
+            CREATE TABLE registros (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, laboratorio TEXT NOT NULL, medicamento TEXT NOT NULL,
+                cantidad INTEGER NOT NULL, fecha TEXT NOT NULL, fecha_ingreso TEXT NOT NULL, observaciones TEXT
+            )
+        ''')
+        conn.execute("INSERT INTO registros (laboratorio, medicamento, cantidad, fecha, fecha_ingreso) "
+                     "VALUES ('GENFAR', 'MED', 1, '2025-01-02', '2025-01-02T23:30:00-06:00')")
+        conn.commit()
+        aplicadas = aplicar_migraciones(conn, 'sqlite')
+        assert aplicadas == list(range(1, VERSION_ACTUAL + 1)), aplicadas
+
+        columnas = columnas_tabla(RepositorioRegistros(conn, 'sqlite'), 'registros')
+        assert 'numero_factura' in columnas and 'farmacia' in columnas, columnas
+        assert conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] == VERSION_ACTUAL
+        assert conn.execute('SELECT fecha_ingreso_ts FROM registros').fetchone()[0] == 1735882200
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT * FROM registros WHERE farmacia = 'farmacia1' "
+                            "ORDER BY fecha_ingreso_ts DESC, id DESC LIMIT 10").fetchall()
+        assert 'idx_registros_farmacia_ts' in plan[0][3] and len(plan) == 1, plan
+
+        # Un INSERT sin fecha_ingreso_ts lo recibe del trigger, igual que con instante_ingreso()
+        for fecha_ingreso, fecha in (('2025-06-01T10:00:00.123456-06:00', '2025-06-01'),
+                                     ('2025-06-01 10:00:00', '2025-06-01'),
+                                     ('2025-06-01T16:00:00Z', '2025-06-01'),
+                                     ('2025-06-01', '2025-06-01'),
+                                     ('no es una fecha', '2025-06-02'),
+                                     ('', '')):
+            cursor = conn.execute("INSERT INTO registros (laboratorio, medicamento, cantidad, fecha, fecha_ingreso) "
+                                  "VALUES ('GENFAR', 'MED', 1, ?, ?)", (fecha, fecha_ingreso))
+            calculado = conn.execute('SELECT fecha_ingreso_ts FROM registros WHERE id = ?',
+                                     (cursor.lastrowid,)).fetchone()[0]
+            esperado = valor_instante(instante_ingreso(fecha_ingreso, fecha), 'sqlite')
+            assert calculado == esperado, (fecha_ingreso, calculado, esperado)
+        conn.commit()
+
+        # Con el esquema al día no se vuelve a migrar (ni a tomar el bloqueo)
+        sentencias = []
+        conn.set_trace_callback(sentencias.append)
+        assert aplicar_migraciones(conn, 'sqlite') == []
+        assert sentencias == ['SELECT MAX(version) FROM schema_version'], sentencias
+        conn.close()
+    finally:
+        _borrar(ruta)
+
+    print(f"✅ Esquema en la versión {VERSION_ACTUAL}")
+
+
+def test_paginacion_registros():
+    """Verificar que las páginas por clave recorren todo sin repetir ni saltar"""
+    print("\n🔍 Probando paginación de registros...")
+    ruta = _ruta_temporal()
+    try:
+        conn = sqlite3.connect(ruta)
+        conn.execute('DROP TABLE registros')
+        aplicar_migraciones(conn, 'sqlite')
+        registros = RepositorioRegistros(conn, 'sqlite')
+        for i in range(25):
+            # Varios registros en el mismo segundo: el id desempata
+            registros.insertar({
+                'laboratorio': 'GENFAR', 'medicamento': f'MED {i % 4}', 'cantidad': i, 'fecha': '2025-01-01',
+                'fecha_ingreso': f'2025-01-01T10:00:{i // 3:02d}-06:00', 'farmacia': 'farmacia1'
+            })
+        registros.commit()
+
+        for orden in ORDENES_REGISTROS:
+            vistos, clave, total = [], None, None
+            while True:
+                pagina, clave, conteo = registros.buscar_pagina(
+                    'farmacia1', orden=orden, despues_de=clave, limite=7, contar=clave is None
+                )
+                total = total or conteo
+                vistos.extend(r.id for r in pagina)
+                if clave is None:
+                    break
+                assert decodificar_cursor(codificar_cursor(orden, clave)) == (orden, clave)
+
+            assert total == (25, True) and sorted(vistos) == list(range(1, 26)), (orden, vistos)
+            if orden == 'fecha_desc':
+                assert vistos == list(range(25, 0, -1)), vistos
+
+        plan = conn.execute("EXPLAIN QUERY PLAN SELECT id FROM registros WHERE farmacia = 'farmacia1' "
+                            "AND (fecha_ingreso_ts, id) < (1, 1) ORDER BY fecha_ingreso_ts DESC, id DESC").fetchall()
+        assert 'idx_registros_farmacia_ts' in plan[0][3] and len(plan) == 1, plan
+        conn.close()
+    finally:
+        _borrar(ruta)
+
+    try:
+        decodificar_cursor('no-es-un-cursor')
+        assert False, "Un cursor inválido debe rechazarse"
+    except ValueError:
+        pass
+
+    print("✅ Páginas completas en todos los órdenes")
+
+
+def test_busqueda_texto():
+    """Verificar la búsqueda de texto y su sincronización con registros"""
+    print("\n🔍 Probando búsqueda de texto en registros...")
+    ruta = _ruta_temporal()
+    try:
+        conn = sqlite3.connect(ruta)
+        conn.execute('DROP TABLE registros')
+        aplicar_migraciones(conn, 'sqlite')
+        registros = RepositorioRegistros(conn, 'sqlite')
+        nombres = ['ACETAMINOFEN 500MG', 'ACETAMINOFEN JARABE', 'IBUPROFENO 400MG', 'AMOXICILINA 500MG']
+        ids = [registros.insertar({
+            'laboratorio': 'GENFAR' if i % 2 else 'MK', 'medicamento': nombre, 'cantidad': 1,
+            'fecha': '2025-01-01', 'fecha_ingreso': '2025-01-01T10:00:00-06:00', 'farmacia': 'farmacia1'
+        }) for i, nombre in enumerate(nombres)]
+        registros.commit()
+
+        def buscar(**filtros):
+            return {r.medicamento for r in registros.buscar('farmacia1', **filtros)}
+
+        assert buscar(medicamento='minofen') == {'ACETAMINOFEN 500MG', 'ACETAMINOFEN JARABE'}
+        assert buscar(medicamento='500mg', laboratorio='mk') == {'ACETAMINOFEN 500MG'}, "Índice y LIKE combinados"
+        assert buscar(medicamento='IB') == {'IBUPROFENO 400MG'}, "Términos cortos usan LIKE"
+
+        # Los triggers mantienen el índice al editar y eliminar
+        registros.actualizar(ids[2], {'laboratorio': 'GENFAR', 'medicamento': 'NAPROXENO', 'cantidad': 1,
+                                      'fecha': '2025-01-01'})
+        registros.eliminar(ids[3])
+        assert buscar(medicamento='profeno') == set() and buscar(medicamento='naprox') == {'NAPROXENO'}
+        assert buscar(medicamento='500MG') == {'ACETAMINOFEN 500MG'}
+
+        pagina, siguiente, total = registros.buscar_pagina('farmacia1', orden='relevancia', limite=1,
+                                                           contar=True, medicamento='acetaminofen')
+        pagina2, _, _ = registros.buscar_pagina('farmacia1', orden='relevancia', despues_de=siguiente,
+                                                limite=1, medicamento='acetaminofen')
+        assert total == (2, True) and {pagina[0].id, pagina2[0].id} == {ids[0], ids[1]}
+
+        plan = conn.execute('EXPLAIN QUERY PLAN SELECT id FROM registros WHERE id IN '
+                            "(SELECT rowid FROM registros_fts WHERE registros_fts MATCH 'medicamento : \"abc\"')")
+        assert any('registros_fts' in fila[3] for fila in plan)
+        conn.close()
+    finally:
+        _borrar(ruta)
+
+    print("✅ Búsqueda de texto sincronizada")
+
+
+def test_escritura_agrupada():
+    """Verificar que los registros concurrentes se confirman juntos y por separado si fallan"""
+    print("\n🔍 Probando escritura agrupada...")
+    ruta = _ruta_temporal()
+    try:
+        conn = sqlite3.connect(ruta)
+        conn.execute('DROP TABLE registros')
+        aplicar_migraciones(conn, 'sqlite')
+        conn.close()
+
+        conexiones = ConexionesPorHilo(ruta)
+        escritor = EscritorAgrupado(lambda: RepositorioRegistros(conexiones.obtener(), 'sqlite'),
+                                    espera_maxima=0.05).iniciar()
+        inicio = threading.Barrier(20)
+        resultados = {}
+
+        def guardar(i):
+            datos = {'laboratorio': 'GENFAR', 'medicamento': None if i == 7 else f'MED {i}', 'cantidad': 1,
+                     'fecha': '2025-01-01', 'fecha_ingreso': '2025-01-01T10:00:00-06:00', 'farmacia': 'farmacia1'}
+            inicio.wait()
+            try:
+                resultados[i] = escritor.insertar(datos, timeout=5)
+            except Exception as e:
+                resultados[i] = e
+
+        hilos = [threading.Thread(target=guardar, args=(i,)) for i in range(20)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        # Solo el registro inválido falla; los demás quedan guardados con su id
+        assert isinstance(resultados.pop(7), sqlite3.IntegrityError)
+        assert len(set(resultados.values())) == 19
+        conn = sqlite3.connect(ruta)
+        guardados = dict(conn.execute('SELECT id, medicamento FROM registros').fetchall())
+        conn.close()
+        assert all(guardados[registro_id] == f'MED {i}' for i, registro_id in resultados.items())
+
+        estado = escritor.get_estado()
+        assert estado['registros'] == 20 and estado['errores'] == 1 and estado['lotes'] < 20, estado
+        assert estado['tamano_lote']['total'] == estado['lotes'] and estado['espera_ms']['total'] == 20
+
+        # Un registro que el escritor no tomó a tiempo se retira de la cola y no se guarda
+        detenido = EscritorAgrupado(lambda: RepositorioRegistros(conexiones.obtener(), 'sqlite'))
+        try:
+            detenido.insertar({'laboratorio': 'GENFAR', 'medicamento': 'CANCELADO', 'cantidad': 1,
+                               'fecha': '2025-01-01', 'fecha_ingreso': '2025-01-01T10:00:00-06:00'}, timeout=0.05)
+            assert False, "Debe fallar al vencer el tiempo de espera"
+        except Exception as e:
+            assert 'no se guardó' in str(e), e
+
+        # Un error fuera del lote no detiene el hilo escritor
+        confirmar = detenido._confirmar
+        fallas = [RuntimeError('falla inesperada')]
+
+        def confirmar_con_falla(lote):
+            if fallas:
+                raise fallas.pop()
+            confirmar(lote)
+
+        detenido._confirmar = confirmar_con_falla
+        detenido.iniciar()
+        datos = {'laboratorio': 'GENFAR', 'medicamento': 'DESPUES', 'cantidad': 1,
+                 'fecha': '2025-01-01', 'fecha_ingreso': '2025-01-01T10:00:00-06:00'}
+        try:
+            detenido.insertar(datos, timeout=5)
+            assert False, "El lote con la falla debe devolver el error"
+        except RuntimeError:
+            pass
+        assert detenido.insertar(datos, timeout=5)
+        estado_detenido = detenido.get_estado()
+        assert estado_detenido['activo'] and estado_detenido['cancelados'] == 1, estado_detenido
+
+        conn = sqlite3.connect(ruta)
+        medicamentos = [fila[0] for fila in conn.execute('SELECT medicamento FROM registros')]
+        conn.close()
+        assert 'CANCELADO' not in medicamentos and medicamentos.count('DESPUES') == 1, medicamentos
+    finally:
+        _borrar(ruta)
+
+    print(f"✅ 20 registros en {estado['lotes']} commits")
+
+
+def main():
+    """Función principal de pruebas"""
+    print("🧪 INICIANDO PRUEBAS DE CONEXIONES")
+    print("=" * 50)
+
+    pruebas = [
+        test_pool_reutiliza_y_acota,
+        test_pool_vida_y_verificacion,
+        test_conexiones_por_hilo,
+        test_perfil_sqlite,
+        test_repositorio_registros,
+        test_migraciones,
+        test_paginacion_registros,
+        test_busqueda_texto,
+        test_escritura_agrupada
+    ]
+
+    for prueba in pruebas:
+        prueba()
+
+    print("\n" + "=" * 50)
+    print("🎉 TODAS LAS PRUEBAS DE CONEXIONES PASARON")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+Script de prueba para verificar que los índices del catálogo devuelven
+los mismos resultados que el recorrido completo del inventario
+"""
+
+import gzip
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+
+import inventario_simple
+from cambios_catalogo import cambios_desde, registrar_version
+from existencias_inventario import XLSX_PATH, combinar_existencias, leer_existencias
+from indices_catalogo import buscar_prefijo, normalizar_texto
+from parser_inventario import CategoriaInventario, ProductoInventario, leer_registros
+from snapshot_catalogo import cargar_snapshot, guardar_snapshot
+
+
+def _cargar():
+    """Cargar el catálogo desde el CSV del repositorio"""
+    assert inventario_simple.asegurar_inventario(), "No se pudo cargar el inventario"
+    assert inventario_simple.CATALOGO.productos, "El inventario está vacío"
+
+
+def test_parser_inventario():
+    """Verificar los registros del parser compartido del archivo de inventario"""
+    print("🔍 Probando parser de inventario...")
+    registros = list(leer_registros(inventario_simple.CSV_PATH))
+    categorias = [r for r in registros if isinstance(r, CategoriaInventario)]
+    productos = [r for r in registros if isinstance(r, ProductoInventario)]
+
+    assert categorias and productos, "El parser no produjo registros"
+    assert registros[0] == categorias[0], "La primera fila después del encabezado es una categoría"
+    assert all(p.categoria and p.codigo.startswith(p.categoria) for p in productos)
+    assert all(p.codigo != 'Codigo' and len(p.nombre) > 3 for p in productos)
+
+    print(f"✅ {len(categorias)} categorías y {len(productos)} productos")
+
+
+def test_medicamentos_por_laboratorio():
+    """Comparar el índice por laboratorio con el recorrido lineal"""
+    print("🔍 Probando índice por laboratorio...")
+    _cargar()
+
+    productos = inventario_simple.CATALOGO.productos
+    claves = [normalizar_texto(p['laboratorio']) for p in productos]
+
+    def lineal(laboratorio):
+        buscar = normalizar_texto(laboratorio)
+        return [
+            (p['nombre'], p['modelo'], p['precio'], p['stock'])
+            for p, clave in zip(productos, claves)
+            if clave.startswith(buscar)
+        ]
+
+    laboratorios = inventario_simple.get_laboratorios() + ['', 'MED', 'b', ' roemmers ', 'zzz']
+    for laboratorio in laboratorios:
+        assert inventario_simple.get_medicamentos_by_laboratorio(laboratorio) == lineal(laboratorio), laboratorio
+
+    print(f"✅ {len(laboratorios)} laboratorios coinciden")
+
+
+def test_busqueda_trigramas():
+    """Comparar la búsqueda con índice de trigramas con el recorrido lineal"""
+    print("\n🔍 Probando búsqueda por trigramas...")
+    _cargar()
+
+    random.seed(7)
+    nombres = [p['nombre'] for p in inventario_simple.CATALOGO.productos]
+    terminos = ['a', 'ac', 'aceta', 'tabletas', 'mg x 10', 'zzz', '  ', 'niÑos', 'Acetaminofén', 'PAÑALES  x']
+    for _ in range(300):
+        nombre = random.choice(nombres)
+        inicio = random.randrange(len(nombre))
+        terminos.append(nombre[inicio:inicio + random.randint(1, 15)])
+
+    for termino in terminos:
+        assert inventario_simple.buscar_productos(termino) == inventario_simple.buscar_productos_lineal(termino), termino
+
+    # Las consultas con acentos, mayúsculas o espacios de más encuentran lo mismo
+    assert inventario_simple.buscar_productos('ACETAMINOFÉN') == inventario_simple.buscar_productos('acetaminofen')
+    assert inventario_simple.buscar_productos('  aceite   de ') == inventario_simple.buscar_productos('aceite de')
+    assert inventario_simple.buscar_productos('gravol niños'), "La Ñ exportada como '¥' debe coincidir"
+
+    # Sin trigramas (vacío o 1-2 caracteres) se recorre el catálogo, como la búsqueda original
+    productos = inventario_simple.CATALOGO.productos
+    assert len(inventario_simple.buscar_productos('')) == len(productos)
+    for termino in ('a', 'ac', 'x1'):
+        original = [p['nombre'] for p in productos if termino in p['nombre'].lower()]
+        encontrados = [p['medicamento'] for p in inventario_simple.buscar_productos(termino)]
+        assert original and set(original) <= set(encontrados), termino
+
+    print(f"✅ {len(terminos)} búsquedas coinciden")
+
+
+def test_typeahead():
+    """Comparar el autocompletado por prefijo con un recorrido lineal ordenado"""
+    print("\n🔍 Probando autocompletado...")
+    _cargar()
+
+    nombres = [normalizar_texto(p['nombre']) for p in inventario_simple.CATALOGO.productos]
+
+    def lineal(prefijo, k):
+        candidatos = []
+        for posicion, nombre in enumerate(nombres):
+            palabras = nombre.split()
+            for inicio in range(len(palabras)):
+                if ' '.join(palabras[inicio:]).startswith(prefijo):
+                    candidatos.append((inicio, len(nombre), nombre, posicion))
+                    break
+        return [inventario_simple.CATALOGO.productos[c[3]] for c in sorted(candidatos)[:k]]
+
+    random.seed(11)
+    prefijos = ['a', 'b', 'ta', 'x 1', 'acido f', 'zzz']
+    for _ in range(200):
+        palabras = random.choice(nombres).split()
+        resto = ' '.join(palabras[random.randrange(len(palabras)):])
+        prefijos.append(resto[:random.randint(1, 12)].strip())
+
+    for prefijo in prefijos:
+        assert inventario_simple.typeahead(prefijo, 10) == lineal(prefijo, 10), prefijo
+    assert len(inventario_simple.typeahead('a', 500)) == 20, "El resultado debe estar acotado"
+    for prefijo in ('a', 'ac', 'acido f'):
+        assert inventario_simple.typeahead(prefijo, 0) == []
+        assert inventario_simple.typeahead(prefijo, -5) == []
+
+    print(f"✅ {len(prefijos)} prefijos coinciden")
+
+
+def test_categorias():
+    """Comparar los productos por categoría con el recorrido lineal"""
+    print("\n🔍 Probando árbol de categorías...")
+    _cargar()
+
+    categorias = inventario_simple.get_categorias()
+    assert categorias, "No se encontraron categorías"
+    assert sum(c['total_productos'] for c in categorias) == len(inventario_simple.CATALOGO.productos)
+
+    codigos = list(inventario_simple.CATALOGO.arbol_categorias['por_codigo'])
+    for codigo in codigos:
+        lineal = sorted(
+            (p for p in inventario_simple.CATALOGO.productos if p['codigo'].startswith(codigo)),
+            key=lambda p: p['codigo']
+        )
+        assert inventario_simple.get_productos_por_categoria(codigo)['productos'] == lineal, codigo
+
+    pagina = inventario_simple.get_productos_por_categoria(codigos[0], desde=2, limite=3)
+    assert pagina['productos'] == inventario_simple.get_productos_por_categoria(codigos[0])['productos'][2:5]
+    assert inventario_simple.get_productos_por_categoria('99') is None
+
+    print(f"✅ {len(codigos)} categorías coinciden")
+
+
+def test_producto_por_codigo():
+    """Verificar la búsqueda de productos por código"""
+    print("\n🔍 Probando búsqueda por código...")
+    _cargar()
+
+    for producto in inventario_simple.CATALOGO.productos:
+        assert inventario_simple.get_producto_por_codigo(producto['codigo']) is producto
+
+    primero = inventario_simple.CATALOGO.productos[0]
+    assert inventario_simple.get_producto_por_codigo(' ' + primero['codigo'].lstrip('0') + ' ') is primero
+    assert inventario_simple.get_producto_por_codigo('999999999') is None
+
+    lote = inventario_simple.get_productos_por_codigos([primero['codigo'], 'x'])
+    assert lote['productos'] == {primero['codigo']: primero}
+    assert lote['no_encontrados'] == ['x']
+
+    print(f"✅ {len(inventario_simple.CATALOGO.productos)} códigos encontrados")
+
+
+def test_recarga_concurrente():
+    """Verificar que solicitudes concurrentes hacen una sola recarga del catálogo"""
+    print("\n🔍 Probando recarga concurrente...")
+    _cargar()
+
+    # Publicar un catálogo vacío sin firma para forzar la recarga
+    generacion = inventario_simple.CATALOGO.generacion
+    inventario_simple.CATALOGO = inventario_simple.CatalogoInventario(generacion=generacion)
+
+    resultados = []
+    hilos = [
+        threading.Thread(target=lambda: resultados.append(inventario_simple.get_catalogo()))
+        for _ in range(8)
+    ]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(resultados) == 8
+    assert all(catalogo is inventario_simple.CATALOGO for catalogo in resultados)
+    assert inventario_simple.CATALOGO.generacion == generacion + 1, "Se recargó más de una vez"
+    assert inventario_simple.CATALOGO.productos
+
+    print("✅ Una sola recarga para 8 solicitudes concurrentes")
+
+
+def test_catalogo_columnar():
+    """Comparar los filtros del catálogo en columnas con los de la lista de diccionarios"""
+    print("\n🔍 Probando catálogo en columnas...")
+    _cargar()
+
+    catalogo = inventario_simple.CATALOGO
+    columnar = catalogo.columnar
+    if columnar is None:
+        print("⚠️ NumPy no está instalado, se omite la prueba")
+        return
+
+    for i in (0, len(columnar) // 2, len(columnar) - 1):
+        assert columnar.fila(i) == catalogo.productos[i]
+
+    filtros = [
+        {'laboratorio': 'roem'},
+        {'laboratorio': 'pharma', 'stock_min': 1},
+        {'stock_max': 0},
+        {'stock_mayor_que': 0, 'stock_menor_que': 10},
+        {'precio_min': 0.0, 'precio_max': 10.0}
+    ]
+    for filtro in filtros:
+        vectorizado = inventario_simple.filtrar_productos(**filtro)
+        try:
+            catalogo.columnar = None
+            lineal = inventario_simple.filtrar_productos(**filtro)
+        finally:
+            catalogo.columnar = columnar
+        assert vectorizado == lineal, filtro
+
+    # Con stock fraccionario los límites exclusivos no dejan fuera 0.5 ni 9.5
+    stock = columnar.stock.copy()
+    try:
+        columnar.stock[:3] = (0.5, 9.5, 10.0)
+        filas = columnar.filtrar(stock_mayor_que=0, stock_menor_que=10).tolist()
+        assert 0 in filas and 1 in filas and 2 not in filas, filas[:3]
+    finally:
+        columnar.stock[:] = stock
+
+    memoria = inventario_simple.get_estado_cache()['memoria']
+    print(f"✅ Filtros coinciden (dicts: {memoria['dicts_bytes']} bytes, columnas: {memoria['columnar_bytes']} bytes)")
+
+
+def test_cambios_catalogo():
+    """Verificar versiones del catálogo y diferencias entre ellas"""
+    print("🔍 Probando cambios del catálogo...")
+    _cargar()
+    actual = inventario_simple.CATALOGO
+
+    # La versión depende solo del contenido, no del orden ni de la carga
+    copia = inventario_simple.CatalogoInventario(list(reversed(actual.productos)), actual.categorias)
+    assert copia.version == actual.version
+
+    productos = [dict(p) for p in actual.productos]
+    eliminado = productos.pop(10)['codigo']
+    productos[20]['precio'] = 12.5
+    productos.append(dict(productos[0], codigo='999999999', nombre='PRODUCTO NUEVO'))
+    nuevo = inventario_simple.CatalogoInventario(productos, actual.categorias)
+    assert nuevo.version != actual.version
+
+    registrar_version(actual.version, actual.huellas)
+    registrar_version(nuevo.version, nuevo.huellas)
+
+    cambios = cambios_desde(actual.version, nuevo)
+    assert not cambios['completo']
+    assert [p['codigo'] for p in cambios['agregados']] == ['999999999']
+    assert cambios['modificados'] == [productos[20]]
+    assert cambios['eliminados'] == [eliminado]
+
+    assert cambios_desde(nuevo.version, nuevo)['agregados'] == []
+    assert cambios_desde('desconocida', nuevo)['completo']
+
+    print(f"✅ Versión {actual.version}: 1 agregado, 1 modificado, 1 eliminado")
+
+
+def test_catalogo_comprimido():
+    """Verificar el catálogo compacto comprimido para el navegador"""
+    print("🔍 Probando catálogo comprimido...")
+    _cargar()
+
+    version, comprimido = inventario_simple.get_catalogo_comprimido()
+    assert version == inventario_simple.CATALOGO.version
+    assert inventario_simple.get_catalogo_comprimido()[1] is comprimido, "Se debe comprimir una sola vez"
+
+    datos = json.loads(gzip.decompress(comprimido))
+    productos = [dict(zip(datos['campos'], fila)) for fila in datos['productos']]
+    assert datos['version'] == version
+    assert productos == inventario_simple.CATALOGO.productos
+
+    print(f"✅ {len(productos)} productos en {len(comprimido)} bytes")
+
+
+def test_existencias():
+    """Verificar el stock y precio combinados del reporte de existencias"""
+    print("🔍 Probando existencias...")
+    _cargar()
+
+    existencias = leer_existencias(XLSX_PATH)
+    por_codigo = dict(zip(existencias['codigos'], zip(existencias['stock'], existencias['precio'])))
+    for producto in inventario_simple.CATALOGO.productos:
+        assert (producto['stock'], producto['precio']) == por_codigo.get(producto['codigo'], (0.0, 0.0)), producto
+
+    productos = [{'codigo': '999999999', 'precio': 5.0, 'stock': 3.0}, dict(inventario_simple.CATALOGO.productos[0])]
+    assert combinar_existencias(productos, existencias) == 1
+    assert (productos[0]['stock'], productos[0]['precio']) == (0.0, 0.0), "Sin existencias queda en 0"
+
+    print(f"✅ {len(inventario_simple.CATALOGO.productos)} productos con stock y precio del reporte")
+
+
+def _mapeos_abiertos(ruta):
+    """Contar los mapeos de 'ruta' en este proceso (0 si no hay /proc)"""
+    if not os.path.exists('/proc/self/maps'):
+        return 0
+    ruta = os.path.realpath(ruta)
+    with open('/proc/self/maps') as file:
+        return len({linea.split()[0] for linea in file if linea.rstrip().endswith(ruta)})
+
+
+def test_snapshot_catalogo():
+    """Verificar que el catálogo del snapshot es igual al del CSV y que se invalida"""
+    print("\n🔍 Probando snapshot del catálogo...")
+    assert inventario_simple.cargar_inventario(usar_snapshot=False)
+    original = inventario_simple.CATALOGO
+
+    directorio = tempfile.mkdtemp()
+    try:
+        ruta_csv = os.path.join(directorio, 'inventario.csv')
+        ruta_snapshot = os.path.join(directorio, 'catalogo.snapshot')
+        shutil.copyfile(inventario_simple.CSV_PATH, ruta_csv)
+        guardar_snapshot(original, ruta_csv, ruta_snapshot, XLSX_PATH)
+
+        snapshot = cargar_snapshot(ruta_csv, ruta_snapshot, XLSX_PATH)
+        assert snapshot is not None, "El snapshot recién escrito debe cargarse"
+        cargado = inventario_simple.CatalogoInventario(
+            snapshot['productos'], snapshot['categorias'], snapshot['indice_trigramas'],
+            precalculados=snapshot['precalculados']
+        )
+        for atributo in ('productos', 'categorias', 'nombres_busqueda', 'laboratorios_busqueda',
+                         'huellas', 'version', 'indice_laboratorios', 'arbol_categorias'):
+            assert getattr(cargado, atributo) == getattr(original, atributo), atributo
+        # Los arreglos del índice de prefijos son vistas sobre el mmap, no listas
+        for clave, valor in original.indice_prefijos.items():
+            cargado_valor = cargado.indice_prefijos[clave]
+            if clave in ('rangos', 'posiciones'):
+                assert isinstance(cargado_valor, memoryview), clave
+                cargado_valor = cargado_valor.tolist()
+            assert cargado_valor == valor, clave
+        assert buscar_prefijo(cargado.indice_prefijos, 'ac', 5) == buscar_prefijo(original.indice_prefijos, 'ac', 5)
+        assert sorted(cargado.indice_trigramas) == sorted(original.indice_trigramas)
+        assert all(cargado.indice_trigramas[clave] == original.indice_trigramas[clave]
+                   for clave in original.indice_trigramas)
+
+        # Otro reporte de existencias, otro formato o un CSV modificado invalidan el snapshot
+        mapeos = _mapeos_abiertos(ruta_snapshot)
+        assert cargar_snapshot(ruta_csv, ruta_snapshot, None) is None
+        assert _mapeos_abiertos(ruta_snapshot) == mapeos, "Un snapshot rechazado no debe quedar mapeado"
+        with open(ruta_snapshot, 'r+b') as file:
+            contenido = bytearray(file.read())
+            contenido[4] ^= 0xFF
+            file.seek(0)
+            file.write(contenido)
+        assert cargar_snapshot(ruta_csv, ruta_snapshot, XLSX_PATH) is None
+        guardar_snapshot(original, ruta_csv, ruta_snapshot, XLSX_PATH)
+        with open(ruta_csv, 'ab') as file:
+            file.write(b'\n')
+        assert cargar_snapshot(ruta_csv, ruta_snapshot, XLSX_PATH) is None
+    finally:
+        shutil.rmtree(directorio)
+
+    print(f"✅ Snapshot equivalente al CSV ({len(original.productos)} productos)")
+
+
+def main():
+    """Función principal de pruebas"""
+    print("🧪 INICIANDO PRUEBAS DE ÍNDICES DEL CATÁLOGO")
+    print("=" * 50)
+
+    tests = [
+        test_parser_inventario,
+        test_medicamentos_por_laboratorio,
+        test_busqueda_trigramas,
+        test_typeahead,
+        test_categorias,
+        test_producto_por_codigo,
+        test_recarga_concurrente,
+        test_catalogo_columnar,
+        test_cambios_catalogo,
+        test_catalogo_comprimido,
+        test_existencias,
+        test_snapshot_catalogo
+    ]
+
+    passed = 0
+    for test in tests:
+        try:
+            test()
+            passed += 1
+        except AssertionError as e:
+            print(f"❌ Prueba {test.__name__} falló: {e}")
+        except Exception as e:
+            print(f"❌ Error en prueba {test.__name__}: {e}")
+
+    print("\n" + "=" * 50)
+    print(f"📈 RESULTADOS: {passed}/{len(tests)} pruebas pasaron")
+
+
+if __name__ == "__main__":
+    main()
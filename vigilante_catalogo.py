@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Vigilante del archivo de inventario en segundo plano.
+
+Un hilo detecta cuando se reemplaza 'INVENTARIO PARA TRABAJO.csv' o el
+reporte de existencias 'inventarioraw.xlsx' (con inotify si el paquete
+inotify_simple está instalado, si no consultando la firma de los archivos cada
+cierto intervalo), construye el catálogo nuevo con todos sus índices y lo
+publica. Así ninguna solicitud paga el costo de volver a parsear
+el archivo. Tras cada actualización se regenera el snapshot binario.
+
+No se inicia en Vercel: allí cada instancia es efímera y el archivo no cambia.
+"""
+import os
+import threading
+import time
+from datetime import datetime
+
+import inventario_simple
+from snapshot_catalogo import guardar_snapshot
+
+# inotify es opcional (solo Linux); sin él se consulta la firma periódicamente
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+    flags = None
+
+# Tiempo que la firma del archivo debe mantenerse igual antes de cargarlo
+ESPERA_ESTABLE = 0.5
+ESPERA_ESTABLE_MAXIMA = 10.0
+
+_HILO = None
+_HILO_LOCK = threading.Lock()
+_DESPERTAR = threading.Event()
+
+# Estado del vigilante y último evento registrado
+ESTADO = {
+    'activo': False,
+    'modo': None,  # 'inotify' o 'sondeo'
+    'intervalo': None,
+    'ultimo_evento': None
+}
+
+
+def iniciar_vigilante(intervalo=2.0):
+    """Iniciar el hilo vigilante (una sola vez por proceso)"""
+    global _HILO
+
+    if os.environ.get('VERCEL'):
+        print("Vigilante de catálogo desactivado en Vercel")
+        return False
+
+    with _HILO_LOCK:
+        if _HILO is not None and _HILO.is_alive():
+            return True
+
+        _HILO = threading.Thread(target=_vigilar, args=(intervalo,), name='vigilante-catalogo', daemon=True)
+        _HILO.start()
+        return True
+
+
+def vigilante_activo():
+    """Indicar si el hilo vigilante está corriendo"""
+    return _HILO is not None and _HILO.is_alive()
+
+
+def notificar_cambio():
+    """Avisar al vigilante que el archivo cambió (no espera la recarga)"""
+    _DESPERTAR.set()
+
+
+def get_estado():
+    """Obtener el estado del vigilante y su último evento"""
+    return dict(ESTADO, activo=vigilante_activo())
+
+
+def _crear_inotify():
+    """Vigilar el directorio del CSV (el archivo se reemplaza, no se edita)"""
+    if INotify is None:
+        return None
+    try:
+        inotify = INotify()
+        directorio = os.path.dirname(os.path.abspath(inventario_simple.CSV_PATH))
+        inotify.add_watch(directorio, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+        return inotify
+    except OSError as e:
+        print(f"No se pudo usar inotify, se usará sondeo: {e}")
+        return None
+
+
+def _esperar_evento(inotify, intervalo):
+    """Esperar un evento de inotify, un aviso de notificar_cambio() o el intervalo"""
+    if inotify is None:
+        _DESPERTAR.wait(intervalo)
+    else:
+        # inotify despierta apenas cambia el directorio; el intervalo sigue
+        # sirviendo para atender los avisos de notificar_cambio()
+        inotify.read(timeout=int(intervalo * 1000))
+    _DESPERTAR.clear()
+
+
+def _esperar_archivo_estable():
+    """Esperar a que el archivo termine de escribirse (firma sin cambios)"""
+    limite = time.monotonic() + ESPERA_ESTABLE_MAXIMA
+    firma = inventario_simple.firma_fuentes()
+    while time.monotonic() < limite:
+        time.sleep(ESPERA_ESTABLE)
+        nueva = inventario_simple.firma_fuentes()
+        if nueva == firma:
+            return firma
+        firma = nueva
+    return firma
+
+
+def _vigilar(intervalo):
+    """Bucle del hilo vigilante"""
+    inotify = _crear_inotify()
+    ESTADO.update({'modo': 'inotify' if inotify is not None else 'sondeo', 'intervalo': intervalo})
+    print(f"Vigilante de catálogo iniciado ({ESTADO['modo']}, cada {intervalo}s)")
+
+    while True:
+        try:
+            firma = inventario_simple.firma_fuentes()
+            if firma is not None and firma not in (inventario_simple.CATALOGO.firma, inventario_simple.firma_rechazada()):
+                if _esperar_archivo_estable() is not None:
+                    actualizar_catalogo()
+        except Exception as e:
+            print(f"Error en vigilante de catálogo: {e}")
+
+        _esperar_evento(inotify, intervalo)
+
+
+def actualizar_catalogo():
+    """Construir y publicar el catálogo si el archivo cambió, y registrar el evento"""
+    anterior = inventario_simple.CATALOGO
+    inicio = time.perf_counter()
+    exito = inventario_simple.asegurar_inventario()
+    duracion_ms = round((time.perf_counter() - inicio) * 1000, 1)
+
+    if not exito:
+        _registrar_evento({'exito': False, 'duracion_ms': duracion_ms})
+        return False
+
+    catalogo = inventario_simple.CATALOGO
+    if catalogo is anterior:
+        # Otra solicitud ya lo recargó o el archivo nuevo fue rechazado
+        return True
+
+    _registrar_evento({
+        'exito': True,
+        'generacion': catalogo.generacion,
+        'version': catalogo.version,
+        'origen': catalogo.origen,
+        'productos': len(catalogo.productos),
+        'laboratorios': len(catalogo.laboratorios),
+        'categorias': len(catalogo.categorias),
+        'duracion_ms': duracion_ms
+    })
+
+    # El snapshot se regenera aquí, fuera de las solicitudes
+    if catalogo.origen == 'csv':
+        try:
+            guardar_snapshot(catalogo, inventario_simple.CSV_PATH, ruta_existencias=inventario_simple.XLSX_PATH)
+        except Exception as e:
+            print(f"Error al generar snapshot del catálogo: {e}")
+
+    return True
+
+
+def _registrar_evento(evento):
+    """Guardar el último evento y escribirlo en el log"""
+    evento['fecha'] = datetime.now().isoformat()
+    ESTADO['ultimo_evento'] = evento
+
+    if evento['exito']:
+        print(f"Catálogo actualizado en segundo plano: {evento['productos']} productos, "
+              f"{evento['laboratorios']} laboratorios, {evento['categorias']} categorías "
+              f"(generación {evento['generacion']}, {evento['origen']}, {evento['duracion_ms']} ms)")
+    else:
+        print(f"El archivo de inventario cambió pero no se pudo cargar; se conserva el catálogo anterior "
+              f"({evento['duracion_ms']} ms)")